@@ -1,13 +1,18 @@
+import os
 import textwrap
-import time
 
 import py_trees
 
 from playground.behavior_trees import (
     create_assistant_action_on_thread,
     create_assistant_condition,
+    wait_for_next_tick,
 )
 from playground.assistants_api import api
+from playground.sandbox_manager import current_sandbox
+
+# Solve the challenge in a sandbox of its own, so several challenges can run at once
+current_sandbox.set(f"coding_challenge_{os.getpid()}")
 
 # Create the root node (sequence)
 root = py_trees.composites.Sequence("RootSequence", memory=True)
@@ -116,6 +121,6 @@ tree = py_trees.trees.BehaviourTree(root)
 
 while True:
     tree.tick()
-    time.sleep(20)  # Simulate time between ticks
+    wait_for_next_tick(20)  # Tick again as soon as an action completes
     if root.status == py_trees.common.Status.SUCCESS:
         break
@@ -1,11 +1,11 @@
 import textwrap
-import time
 
 import py_trees
 
 from playground.behavior_trees import (
     create_assistant_action_on_thread,
     create_assistant_condition,
+    wait_for_next_tick,
 )
 from playground.assistants_api import api
 
@@ -114,6 +114,6 @@ tree = py_trees.trees.BehaviourTree(root)
 
 while True:
     tree.tick()
-    time.sleep(20)  # Simulate time between ticks
+    wait_for_next_tick(20)  # Tick again as soon as an action completes
     if root.status == py_trees.common.Status.SUCCESS:
         break
@@ -1,10 +1,9 @@
-import time
-
 import py_trees
 
 from playground.behavior_trees import (
     create_assistant_action,
     create_assistant_condition,
+    wait_for_next_tick,
 )
 
 search_term = "GPT Agents"
@@ -104,4 +103,4 @@ tree = py_trees.trees.BehaviourTree(root)
 for i in range(1000):
     print(f"Tick {i + 1}")
     tree.tick()
-    time.sleep(30)  # Simulate time between ticks
+    wait_for_next_tick(30)  # Tick again as soon as an action completes
@@ -1,9 +1,8 @@
-import time
-
 import py_trees
 
 from playground.behavior_trees import (
     create_assistant_action,
+    wait_for_next_tick,
 )
 
 search_term = "GPT Agents"
@@ -94,4 +93,4 @@ tree = py_trees.trees.BehaviourTree(root)
 for i in range(1000):
     print(f"Tick {i + 1}")
     tree.tick()
-    time.sleep(30)  # Simulate time between ticks
+    wait_for_next_tick(30)  # Tick again as soon as an action completes
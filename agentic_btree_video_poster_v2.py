@@ -1,9 +1,8 @@
-import time
-
 import py_trees
 
 from playground.behavior_trees import (
     create_assistant_action,
+    wait_for_next_tick,
 )
 
 search_term = "GPT Agents"
@@ -93,4 +92,4 @@ tree = py_trees.trees.BehaviourTree(root)
 # Tick the tree to run it
 while True:
     tree.tick()
-    time.sleep(30)  # Simulate time between ticks
+    wait_for_next_tick(30)  # Tick again as soon as an action completes
@@ -1,3 +1,4 @@
+import contextvars
 import queue
 import re
 import threading
@@ -9,7 +10,12 @@ import gradio as gr
 from playground.actions_manager import ActionsManager
 from playground.assistants_api import api
 from playground.assistants_panel import assistants_panel
-from playground.assistants_utils import EventHandler, get_tools
+from playground.assistants_utils import (
+    STREAM_DONE,
+    EventHandler,
+    get_tools,
+    iter_stream_text,
+)
 from playground.btree_runner_panel import btree_runner_panel
 from playground.environment_manager import EnvironmentManager
 from playground.logging import Logger
@@ -136,30 +142,30 @@ def run(history, assistant_id, artifacts):
         return
 
     def stream_worker(assistant_id, thread_id, event_handler):
-        with api.run_stream(
-            thread_id=thread_id,
-            assistant_id=assistant_id,
-            event_handler=event_handler,
-        ) as stream:
-            for text in stream.text_deltas:
-                output_queue.put(("text", text))
+        try:
+            with api.run_stream(
+                thread_id=thread_id,
+                assistant_id=assistant_id,
+                event_handler=event_handler,
+            ) as stream:
+                for text in stream.text_deltas:
+                    output_queue.put(("text", text))
+        finally:
+            output_queue.put(STREAM_DONE)
 
     # Start the initial stream
     thread_id = current_thread.id
+    # Tool calls run in the caller's context so they see e.g. its current_sandbox
     initial_thread = threading.Thread(
-        target=stream_worker, args=(assistant.id, thread_id, eh)
+        target=contextvars.copy_context().run,
+        args=(stream_worker, assistant.id, thread_id, eh),
     )
     initial_thread.start()
     history[-1][1] = ""
-    while initial_thread.is_alive() or not output_queue.empty():
-        try:
-            item_type, item_value = output_queue.get(timeout=0.1)
-            if item_type == "text":
-                history[-1][1] += item_value
-            yield history
-
-        except queue.Empty:
-            pass
+    # Deltas are coalesced so the whole history is sent once per batch, not per token
+    for text in iter_stream_text(output_queue):
+        history[-1][1] += text
+        yield history
     # history[-1][1] = wrap_latex_with_markdown(history[-1][1])
     yield history
 
@@ -192,9 +198,17 @@ def main_interface():
     )
     parser.add_argument("--show-error", action="store_true", help="Show error messages")
     parser.add_argument("--debug", action="store_true", help="Debug mode")
+    parser.add_argument(
+        "--watch-actions",
+        action="store_true",
+        help="Hot-reload assistant actions when their files change",
+    )
 
     args = parser.parse_args()
 
+    if args.watch_actions:
+        actions_manager.start_watching()
+
     # Custom CSS
     custom_css = """
     :root {
@@ -0,0 +1,163 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from playground.actions_manager import SingletonMeta
+
+ACTION_CACHE_DB = "action_cache.db"
+
+
+class ActionResultCache(metaclass=SingletonMeta):
+    """
+    SQLite backed memo cache for deterministic agent actions.
+
+    Entries are keyed on the qualified action name plus its canonicalized JSON
+    arguments, expire after the action's TTL and are evicted least recently used first once
+    the cache holds more than max_entries results.
+    """
+
+    def __init__(self, db_path=ACTION_CACHE_DB, max_entries=1000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self.connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS action_results (
+                    key TEXT PRIMARY KEY,
+                    action_name TEXT NOT NULL,
+                    result BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_action_results_last_access "
+                "ON action_results (last_access)"
+            )
+
+    @contextmanager
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(action_name, args, kwargs, function=None):
+        """Build the cache key from the action name and canonical JSON arguments.
+
+        With the function, its arguments are bound to its signature first so
+        positional, keyword and defaulted arguments of one call share a key.
+        """
+        arguments = {"args": list(args), "kwargs": kwargs}
+        if function is not None:
+            try:
+                bound = inspect.signature(function).bind(*args, **kwargs)
+            except (TypeError, ValueError):
+                pass  # the call fails anyway, key it as given
+            else:
+                bound.apply_defaults()
+                arguments = bound.arguments
+        arguments = json.dumps(
+            arguments, sort_keys=True, separators=(",", ":"), default=str
+        )
+        digest = hashlib.sha256(arguments.encode("utf-8")).hexdigest()
+        return f"{action_name}:{digest}"
+
+    def get(self, key):
+        """Return (True, result) on a fresh hit, otherwise (False, None)."""
+        now = time.time()
+        with self._lock, self.connect() as conn:
+            row = conn.execute(
+                "SELECT result, expires_at FROM action_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                if row is not None:
+                    conn.execute("DELETE FROM action_results WHERE key = ?", (key,))
+                self.misses += 1
+                return False, None
+            conn.execute(
+                "UPDATE action_results SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        return True, pickle.loads(row[0])
+
+    def set(self, key, action_name, result, ttl=None):
+        """Store a result, evicting the least recently used entries past max_entries."""
+        try:
+            blob = pickle.dumps(result)
+        except Exception as e:
+            print(f"Unable to cache result of {action_name}: {str(e)}")
+            return
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._lock, self.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO action_results "
+                "(key, action_name, result, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, action_name, blob, now, expires_at, now),
+            )
+            conn.execute(
+                "DELETE FROM action_results WHERE key IN ("
+                "SELECT key FROM action_results ORDER BY last_access DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def call(self, action_name, function, args, kwargs, ttl=None, cache_if=None):
+        """Return the cached result of an action call, calling it on a miss.
+
+        Results for which cache_if(result) is false, e.g. error messages, are
+        returned without being stored.
+        """
+        key = self.make_key(action_name, args, kwargs, function)
+        hit, result = self.get(key)
+        if hit:
+            return result
+        result = function(*args, **kwargs)
+        if cache_if is None or cache_if(result):
+            self.set(key, action_name, result, ttl=ttl)
+        return result
+
+    def clear(self, action_name=None):
+        """Remove all cached results, or only those of one action."""
+        with self._lock, self.connect() as conn:
+            if action_name is None:
+                conn.execute("DELETE FROM action_results")
+            else:
+                conn.execute(
+                    "DELETE FROM action_results WHERE action_name = ?", (action_name,)
+                )
+
+    def stats(self):
+        """Return the hit and miss counters and the number of stored entries."""
+        with self._lock, self.connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM action_results").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+def qualified_name(function):
+    """Name results of a function are cached under, unique across action files.
+
+    ActionsManager loads every action file under the same module name, so the
+    file the function is defined in tells actions apart, not __module__.
+    """
+    function = inspect.unwrap(function)
+    code = getattr(function, "__code__", None)
+    if code is None:
+        return f"{function.__module__}.{function.__qualname__}"
+    return f"{os.path.abspath(code.co_filename)}:{function.__qualname__}"
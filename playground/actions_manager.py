@@ -1,10 +1,46 @@
 import ast
 import functools
+import hashlib
 import importlib.util
 import inspect
+import json
 import os
 import threading
 
+ACTIONS_CACHE_VERSION = 3
+# What the dispatcher does with an action that outlives its timeout
+ON_TIMEOUT_POLICIES = ("abandon", "cancel")
+
+_action_context = threading.local()
+
+
+class ActionTimeoutError(Exception):
+    """Raised by the dispatcher when an action does not finish within its timeout."""
+
+    def __init__(self, action_name, timeout, on_timeout):
+        super().__init__(f"Action {action_name} timed out after {timeout} seconds.")
+        self.action_name = action_name
+        self.timeout = timeout
+        self.on_timeout = on_timeout
+
+
+def run_cancellable(function, cancel_event, *args, **kwargs):
+    """Run a function with cancel_event as the cancellation token of the calling thread."""
+    _action_context.cancel_event = cancel_event
+    try:
+        return function(*args, **kwargs)
+    finally:
+        _action_context.cancel_event = None
+
+
+def action_cancelled():
+    """Return True if the dispatcher cancelled the action running on this thread.
+
+    Long running actions should check this periodically and stop early.
+    """
+    cancel_event = getattr(_action_context, "cancel_event", None)
+    return cancel_event is not None and cancel_event.is_set()
+
 
 def handle_semantic_function_call(prompt, agent):
     system, user = parse_prompt(prompt)
@@ -41,7 +77,28 @@ def parse_prompt(prompt):
     return parsed_contents["System"], parsed_contents["User"]
 
 
-def agent_action(func):
+def agent_action(
+    func=None,
+    *,
+    concurrent=True,
+    timeout=None,
+    on_timeout="abandon",
+    cache=None,
+    cache_if=None,
+):
+    # Support both @agent_action and @agent_action(concurrent=False, ...)
+    if func is None:
+        return functools.partial(
+            agent_action,
+            concurrent=concurrent,
+            timeout=timeout,
+            on_timeout=on_timeout,
+            cache=cache,
+            cache_if=cache_if,
+        )
+    if on_timeout not in ON_TIMEOUT_POLICIES:
+        raise ValueError(f"Unknown on_timeout policy: {on_timeout}")
+
     @functools.wraps(func)
     def wrapper(*args, _caller_agent=None, **kwargs):
         # Check if _prompt_template is set and format the prompt
@@ -56,6 +113,14 @@ def agent_action(func):
             # For demonstration, let's print it or you can return it
             print(prompt)  # or return prompt if that's your intent
             return handle_semantic_function_call(prompt, _caller_agent)
+        elif cache:
+            # cache=True keeps results until evicted, a number is a TTL in seconds
+            from playground.action_cache import ActionResultCache, qualified_name
+
+            ttl = None if cache is True else cache
+            return ActionResultCache().call(
+                qualified_name(func), func, args, kwargs, ttl=ttl, cache_if=cache_if
+            )
         else:
             return func(*args, **kwargs)
 
@@ -108,6 +173,12 @@ def agent_action(func):
         wrapper._prompt_template = prompt_template
 
     wrapper._agent_action = func_spec
+    # Actions with shared side effects opt out of running alongside other tool calls
+    wrapper._concurrent = concurrent
+    # Seconds the dispatcher waits before returning a timeout error to the run
+    wrapper._timeout = timeout
+    wrapper._on_timeout = on_timeout
+    wrapper._cache = cache
     return wrapper
 
 
@@ -127,17 +198,103 @@ class SingletonMeta(type):
         return cls._instances[cls]
 
 
+class LazyFunction:
+    """Callable proxy for an action that imports its module on the first call."""
+
+    def __init__(self, actions_manager, module_path, function_name):
+        self.actions_manager = actions_manager
+        self.module_path = module_path
+        self.function_name = function_name
+        self.__name__ = function_name
+        self._function = None
+
+    def load(self):
+        """Resolve the underlying function, loading its module if needed."""
+        if self._function is None:
+            self._function = self.actions_manager.load_function(
+                self.module_path, self.function_name
+            )
+        return self._function
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<LazyFunction {self.function_name} from {self.module_path}>"
+
+
+class ActionsWatcher(threading.Thread):
+    """Polls the actions folder and hot-reloads changed action files."""
+
+    def __init__(self, actions_manager, interval=2):
+        super().__init__(daemon=True)
+        self.actions_manager = actions_manager
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.actions_manager.reload_changed_actions()
+            except Exception as e:
+                print(f"Error reloading actions: {str(e)}")
+
+    def stop(self):
+        self._stop_event.set()
+
+
 class ActionsManager(metaclass=SingletonMeta):
-    def __init__(self):
+    def __init__(self, actions_folder=None, cache_path=None):
         self.actions = []  # Initialize an empty list to store actions
-        self.actions_folder = os.path.join(
+        self.actions_by_name = {}  # Name -> action index for constant-time lookups
+        self.action_names_by_group = {}  # Group -> action names index
+        self.actions_by_file = {}  # Actions registered from each action file
+        self.manual_actions = []  # Actions registered through add_action
+        self.file_entries = {}  # Registry cache entries, keyed by file path
+        self.file_mtimes = {}  # Last seen mtime of every action file
+        self.version = 0  # Bumped every time the registry changes
+        self.modules = {}  # Action modules loaded so far, keyed by file path
+        self.watcher = None
+        self._listeners = []
+        self._modules_lock = threading.RLock()
+        self._registry_lock = threading.RLock()
+        self.actions_folder = actions_folder or os.path.join(
             os.path.dirname(__file__), "assistant_actions"
         )
+        # The registry cache lives next to the bytecode cache so it is never committed
+        self.cache_path = cache_path or os.path.join(
+            self.actions_folder, "__pycache__", "actions_registry.json"
+        )
         self.collect_and_update_actions()
 
     def add_action(self, action):
         """Manually add a function specification."""
-        self.actions.append(action)
+        with self._registry_lock:
+            self.manual_actions.append(action)
+            self.publish_actions(self.actions_by_file)
+
+    def publish_actions(self, actions_by_file):
+        """Swap in a fully built registry so readers never see a partial one."""
+        actions = []
+        for file_actions in actions_by_file.values():
+            actions.extend(file_actions)
+        actions.extend(self.manual_actions)
+
+        # The first action with a name wins, as with the original linear scan
+        actions_by_name = {}
+        action_names_by_group = {}
+        for action in actions:
+            if action["name"] in actions_by_name:
+                continue
+            actions_by_name[action["name"]] = action
+            group = action.get("group", "Ungrouped")
+            action_names_by_group.setdefault(group, []).append(action["name"])
+
+        self.actions_by_file = actions_by_file
+        self.actions_by_name = actions_by_name
+        self.action_names_by_group = action_names_by_group
+        self.actions = actions
+        self.version += 1
 
     def get_actions(self):
         """Retrieve all stored function specifications."""
@@ -145,31 +302,226 @@ class ActionsManager(metaclass=SingletonMeta):
 
     def get_action(self, action_name):
         """Retrieve a specific stored function specification."""
-        for action in self.actions:
-            if action["name"] == action_name:
-                return action
-        return None
+        return self.actions_by_name.get(action_name)
+
+    def get_actions_by_names(self, action_names):
+        """Retrieve the stored actions for the given names, skipping unknown names."""
+        actions_by_name = self.actions_by_name
+        return [
+            actions_by_name[action_name]
+            for action_name in action_names
+            if action_name in actions_by_name
+        ]
 
     def get_action_names(self):
         """Retrieve the names of all stored actions."""
-        return [action["name"] for action in self.actions]
+        return list(self.actions_by_name)
 
-    def collect_and_update_actions(self):
-        """Collect and update actions with function pointers from Python files in the specified folder."""
-        self.actions = []  # Reset actions list to ensure it's fresh on each call
+    def get_action_names_by_group(self, group):
+        """Retrieve the names of the stored actions in a group."""
+        return list(self.action_names_by_group.get(group, []))
+
+    def add_change_listener(self, listener):
+        """Register a callback invoked with a change event after every reload."""
+        self._listeners.append(listener)
+
+    def remove_change_listener(self, listener):
+        """Unregister a callback added with add_change_listener."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def list_action_files(self):
+        """List the Python files in the actions folder."""
+        action_files = []
         for root, dirs, files in os.walk(self.actions_folder):
             for file in files:
                 if file.endswith(".py"):
-                    full_path = os.path.join(root, file)
-                    with open(full_path, "r", encoding="utf-8") as f:
-                        file_contents = f.read()
-                    self.actions.extend(
-                        self.inspect_file_for_decorated_actions(
-                            file_contents, full_path
-                        )
-                    )
-
-    def inspect_file_for_decorated_actions(self, file_contents, full_path):
+                    action_files.append(os.path.join(root, file))
+        return action_files
+
+    def collect_and_update_actions(self):
+        """Collect and update actions with function pointers from Python files in the specified folder."""
+        with self._registry_lock:
+            cache = self.load_cache()
+            actions_by_file = {}
+            file_entries = {}
+            file_mtimes = {}
+            for full_path in self.list_action_files():
+                file_mtimes[full_path] = os.stat(full_path).st_mtime
+                actions, entry = self.collect_file_actions(
+                    full_path, cache.get(full_path)
+                )
+                actions_by_file[full_path] = actions
+                if entry is not None:
+                    file_entries[full_path] = entry
+            self.file_entries = file_entries
+            self.file_mtimes = file_mtimes
+            self.publish_actions(actions_by_file)
+            if file_entries != cache:
+                self.save_cache(file_entries)
+
+    def reload_changed_actions(self):
+        """Re-register only the actions of added, changed or removed files.
+
+        Returns the change event, or None if nothing changed.
+        """
+        with self._registry_lock:
+            file_mtimes = {
+                full_path: os.stat(full_path).st_mtime
+                for full_path in self.list_action_files()
+            }
+            changed = [
+                full_path
+                for full_path, mtime in file_mtimes.items()
+                if self.file_mtimes.get(full_path) != mtime
+            ]
+            removed = [
+                full_path
+                for full_path in self.file_mtimes
+                if full_path not in file_mtimes
+            ]
+            if not changed and not removed:
+                return None
+
+            previous_names = set(self.actions_by_name)
+            previous_actions = {
+                action["name"]: action["agent_action"] for action in self.actions
+            }
+            actions_by_file = dict(self.actions_by_file)
+            file_entries = dict(self.file_entries)
+            for full_path in removed + changed:
+                actions_by_file.pop(full_path, None)
+                with self._modules_lock:
+                    self.modules.pop(full_path, None)
+            for full_path in removed:
+                file_entries.pop(full_path, None)
+            for full_path in changed:
+                actions, entry = self.collect_file_actions(
+                    full_path, file_entries.pop(full_path, None)
+                )
+                actions_by_file[full_path] = actions
+                if entry is not None:
+                    file_entries[full_path] = entry
+
+            self.file_entries = file_entries
+            self.file_mtimes = file_mtimes
+            self.publish_actions(actions_by_file)
+            self.save_cache(file_entries)
+
+            names = set(self.actions_by_name)
+            event = {
+                "version": self.version,
+                "added": sorted(names - previous_names),
+                "removed": sorted(previous_names - names),
+                "updated": sorted(
+                    name
+                    for name in names & previous_names
+                    if self.actions_by_name[name]["agent_action"]
+                    != previous_actions.get(name)
+                ),
+                "files": sorted(changed + removed),
+            }
+
+        for listener in list(self._listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"Error in actions change listener: {str(e)}")
+        return event
+
+    def start_watching(self, interval=2):
+        """Start a background watcher that hot-reloads the actions folder."""
+        if self.watcher is None or not self.watcher.is_alive():
+            self.watcher = ActionsWatcher(self, interval=interval)
+            self.watcher.start()
+        return self.watcher
+
+    def stop_watching(self):
+        """Stop the background watcher if it is running."""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher.join()
+            self.watcher = None
+
+    def collect_file_actions(self, full_path, cached_entry=None):
+        """Collect the actions of a single file, reusing the cached entry when the file is unchanged.
+
+        Returns the actions and the cache entry for the file, which is None if
+        the file should not be cached.
+        """
+        stat = os.stat(full_path)
+        if cached_entry and cached_entry["mtime"] == stat.st_mtime:
+            return self.actions_from_cache(cached_entry, full_path), cached_entry
+
+        with open(full_path, "r", encoding="utf-8") as f:
+            file_contents = f.read()
+        content_hash = hashlib.sha256(file_contents.encode("utf-8")).hexdigest()
+        if cached_entry and cached_entry["sha256"] == content_hash:
+            # Touched but not edited, only the mtime needs refreshing
+            actions = self.actions_from_cache(cached_entry, full_path)
+            return actions, dict(cached_entry, mtime=stat.st_mtime)
+
+        try:
+            decorated_actions = self.inspect_file_for_decorated_actions(
+                file_contents, full_path, raise_errors=True
+            )
+        except Exception as e:
+            # Leave failed files out of the cache so they are retried next start
+            print(f"Error loading actions from {full_path}: {str(e)}")
+            return [], None
+
+        return decorated_actions, {
+            "mtime": stat.st_mtime,
+            "sha256": content_hash,
+            "actions": [
+                {
+                    "name": action["name"],
+                    "group": action["group"],
+                    "agent_action": action["agent_action"],
+                    "prompt_template": action["prompt_template"],
+                    "concurrent": action["concurrent"],
+                    "timeout": action["timeout"],
+                    "on_timeout": action["on_timeout"],
+                }
+                for action in decorated_actions
+            ],
+        }
+
+    def actions_from_cache(self, cached_entry, full_path):
+        """Rebuild registry actions from a cache entry without importing the module."""
+        return [
+            dict(
+                cached_action,
+                pointer=LazyFunction(self, full_path, cached_action["name"]),
+            )
+            for cached_action in cached_entry["actions"]
+        ]
+
+    def load_cache(self):
+        """Load the on-disk action registry cache, ignoring stale or unreadable files."""
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != ACTIONS_CACHE_VERSION:
+            return {}
+        return data.get("files", {})
+
+    def save_cache(self, files):
+        """Atomically write the action registry cache to disk."""
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": ACTIONS_CACHE_VERSION, "files": files}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Unable to write actions cache {self.cache_path}: {str(e)}")
+
+    def inspect_file_for_decorated_actions(
+        self, file_contents, full_path, raise_errors=False
+    ):
         """Inspect file contents for functions decorated with `agent_action` and load them."""
         tree = ast.parse(file_contents)
         decorated_actions = []
@@ -177,6 +529,8 @@ class ActionsManager(metaclass=SingletonMeta):
         for node in ast.walk(tree):
             if isinstance(node, ast.FunctionDef):
                 for decorator in node.decorator_list:
+                    if isinstance(decorator, ast.Call):
+                        decorator = decorator.func
                     if (
                         isinstance(decorator, ast.Name)
                         and decorator.id == "agent_action"
@@ -184,7 +538,7 @@ class ActionsManager(metaclass=SingletonMeta):
                         isinstance(decorator, ast.Attribute)
                         and decorator.attr == "agent_action"
                     ):
-                        # Dynamically load the function and update the action with its pointer
+                        # Load the module once to read the spec; the pointer stays lazy
                         try:
                             function_pointer = self.load_function(full_path, node.name)
                             decorated_actions.append(
@@ -193,22 +547,42 @@ class ActionsManager(metaclass=SingletonMeta):
                                     "group": os.path.splitext(
                                         os.path.basename(full_path)
                                     )[0],
-                                    "pointer": function_pointer,
+                                    "pointer": LazyFunction(self, full_path, node.name),
                                     "agent_action": getattr(
                                         function_pointer, "_agent_action", None
                                     ),
                                     "prompt_template": getattr(
                                         function_pointer, "_prompt_template", None
                                     ),
+                                    "concurrent": getattr(
+                                        function_pointer, "_concurrent", True
+                                    ),
+                                    "timeout": getattr(
+                                        function_pointer, "_timeout", None
+                                    ),
+                                    "on_timeout": getattr(
+                                        function_pointer, "_on_timeout", "abandon"
+                                    ),
                                 }
                             )
                         except Exception as e:
+                            if raise_errors:
+                                raise
                             print(f"Error loading function {node.name}: {str(e)}")
         return decorated_actions
 
+    def load_module(self, module_path):
+        """Load an action module once and share it between all of its actions."""
+        with self._modules_lock:
+            if module_path not in self.modules:
+                spec = importlib.util.spec_from_file_location(
+                    "module.name", module_path
+                )
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                self.modules[module_path] = module
+            return self.modules[module_path]
+
     def load_function(self, module_path, function_name):
         """Dynamically load a function from a given module path."""
-        spec = importlib.util.spec_from_file_location("module.name", module_path)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        return getattr(module, function_name)
+        return getattr(self.load_module(module_path), function_name)
@@ -1,9 +1,29 @@
 from playground.actions_manager import agent_action
-from playground.environment_manager import EnvironmentManager
+from playground.resource_limits import ResourceLimits
+from playground.sandbox_manager import current_environment
 
+# Limits of code run by the assistants, so runaway code cannot starve the server.
+# The wall clock limits end runs before the action timeouts cancel them.
+CODE_LIMITS = ResourceLimits(
+    cpu_seconds=120, memory_mb=4096, open_files=512, wall_seconds=240
+)
+SHELL_LIMITS = ResourceLimits(
+    cpu_seconds=300, memory_mb=4096, open_files=1024, wall_seconds=540
+)
 
-@agent_action
-def run_python_code(code, filename=None):
+
+def parse_bool(value):
+    # Actions are advertised with string parameters, so "false" arrives truthy
+    return str(value).strip().lower() in ("true", "1", "yes")
+
+
+def print_output(stream_name, text):
+    # Streams the output to the Logs tab while the code runs
+    print(text, end="", flush=True)
+
+
+@agent_action(timeout=300, on_timeout="cancel")
+def run_python_code(code, filename=None, screenshots=False):
     """
     Execute the provided Python code in a virtual environment.
 
@@ -11,15 +31,24 @@ def run_python_code(code, filename=None):
         code (str): The Python code to be executed.
         filename (str, optional): The name of the file containing the code. If provided,
                                   the code will be executed from this file. Defaults to None.
+        screenshots (bool, optional): Capture screenshots of the screen while the code
+                                      runs, e.g. for games or GUI apps. Defaults to False.
 
     Returns:
-        tuple: A tuple containing two elements:
+        tuple: A tuple containing three elements:
             - code_output (str): The standard output produced by the code execution.
             - code_errors (str): Any errors encountered during the code execution.
+            - stats (dict): The exit reason, wall time, CPU time and peak memory.
     """
-    env_manager = EnvironmentManager()
-    code_output, code_errors = env_manager.run_ode(code, filename=filename)
-    return code_output, code_errors
+    with current_environment() as env_manager:
+        return env_manager.run_code(
+            code,
+            filename=filename,
+            screenshots=parse_bool(screenshots),
+            on_output=print_output,
+            limits=CODE_LIMITS,
+            return_stats=True,
+        )
 
 
 @agent_action
@@ -35,22 +64,28 @@ def run_app_file(filename):
             - initial_output (str): The initial output produced by the web application execution.
             - initial_errors (str): Any errors encountered during the initial web application execution.
     """
-    env_manager = EnvironmentManager()
-    code_output, code_errors = env_manager.run_app_file(filename=filename)
+    with current_environment() as env_manager:
+        code_output, code_errors = env_manager.run_app_file(filename=filename)
     return code_output, code_errors
 
 
-@agent_action
+@agent_action(timeout=600, on_timeout="cancel")
 def run_shell_command(command):
-    """Runs the given shell command in a virtual environment."""
-    env_manager = EnvironmentManager()
-    shell_output, shell_errors = env_manager.run_shell_command(command)
-    return shell_output, shell_errors
+    """
+    Runs the given shell command in a virtual environment.
 
+    Returns the output, the errors and the exit reason, wall time, CPU time and
+    peak memory of the command.
+    """
+    with current_environment() as env_manager:
+        return env_manager.run_shell_command(
+            command, on_output=print_output, limits=SHELL_LIMITS, return_stats=True
+        )
 
-@agent_action
+
+@agent_action(concurrent=False)
 def install_package(package):
     """Installs the given package in a virtual environment."""
-    env_manager = EnvironmentManager()
-    env_manager.install_package(package)
+    with current_environment() as env_manager:
+        env_manager.install_package(package)
     return f"Installed package: {package}"
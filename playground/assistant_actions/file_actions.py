@@ -2,9 +2,10 @@ import os
 
 from playground.actions_manager import agent_action
 from playground.global_values import GlobalValues
+from playground.sandbox_manager import current_code_folder
 
 
-@agent_action
+@agent_action(concurrent=False)
 def copy_file(source, destination):
     """
     Copy a file from the source to the destination.
@@ -37,7 +38,7 @@ def list_files(extension=None):
     return files
 
 
-@agent_action
+@agent_action(concurrent=False)
 def save_file(filename, content):
     """
     Save content to a file.
@@ -51,7 +52,7 @@ def save_file(filename, content):
     return f"File '{filename}' saved successfully."
 
 
-@agent_action
+@agent_action(concurrent=False)
 def save_code_file(filename, code):
     """
     Save code to a file.
@@ -59,9 +60,10 @@ def save_code_file(filename, code):
     :param filename: The name of the file including extension.
     :param code: The code to save in the file.
     """
-    file_path = os.path.join(GlobalValues.CODING_ENVIRONMENT_FOLDER, filename)
-    with open(file_path, "w", encoding="utf-8") as file:
-        file.write(code)
+    with current_code_folder() as code_folder:
+        file_path = os.path.join(code_folder, filename)
+        with open(file_path, "w", encoding="utf-8") as file:
+            file.write(code)
     return f"File '{filename}' saved successfully."
 
 
@@ -92,18 +94,19 @@ def load_code_file(filename):
     :param filename: The name of the file including extension.
     :return: The code from the file.
     """
-    file_path = os.path.join(GlobalValues.CODING_ENVIRONMENT_FOLDER, filename)
-    if not os.path.exists(file_path):
-        print(f"File '{filename}' does not exist.")
-        return None
+    with current_code_folder() as code_folder:
+        file_path = os.path.join(code_folder, filename)
+        if not os.path.exists(file_path):
+            print(f"File '{filename}' does not exist.")
+            return None
 
-    with open(file_path, "r", encoding="utf-8") as file:
-        content = file.read()
+        with open(file_path, "r", encoding="utf-8") as file:
+            content = file.read()
     print(f"File '{filename}' loaded successfully.")
     return content
 
 
-@agent_action
+@agent_action(concurrent=False)
 def delete_file(filename):
     """
     Delete a file.
@@ -118,22 +121,23 @@ def delete_file(filename):
         return f"File '{filename}' does not exist."
 
 
-@agent_action
+@agent_action(concurrent=False)
 def delete_code_file(filename):
     """
     Delete a code file.
 
     :param filename: The name of the file including extension.
     """
-    file_path = os.path.join(GlobalValues.CODING_ENVIRONMENT_FOLDER, filename)
-    if os.path.exists(file_path):
-        os.remove(file_path)
-        return f"File '{filename}' deleted successfully."
-    else:
-        return f"File '{filename}' does not exist."
+    with current_code_folder() as code_folder:
+        file_path = os.path.join(code_folder, filename)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            return f"File '{filename}' deleted successfully."
+        else:
+            return f"File '{filename}' does not exist."
 
 
-@agent_action
+@agent_action(concurrent=False)
 def create_folder(foldername):
     """
     Create a folder.
@@ -148,19 +152,20 @@ def create_folder(foldername):
         return f"Folder '{foldername}' already exists."
 
 
-@agent_action
+@agent_action(concurrent=False)
 def create_code_folder(foldername):
     """
     Create a folder in the coding environment folder.
 
     :param foldername: The name of the folder to create.
     """
-    folder_path = os.path.join(GlobalValues.CODING_ENVIRONMENT_FOLDER, foldername)
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
-        return f"Folder '{foldername}' created successfully."
-    else:
-        return f"Folder '{foldername}' already exists."
+    with current_code_folder() as code_folder:
+        folder_path = os.path.join(code_folder, foldername)
+        if not os.path.exists(folder_path):
+            os.makedirs(folder_path)
+            return f"Folder '{foldername}' created successfully."
+        else:
+            return f"Folder '{foldername}' already exists."
 
 
 @agent_action
@@ -170,11 +175,12 @@ def list_code_files():
 
     :return: A list of file names.
     """
-    files = os.listdir(GlobalValues.CODING_ENVIRONMENT_FOLDER)
+    with current_code_folder() as code_folder:
+        files = os.listdir(code_folder)
     return files
 
 
-@agent_action
+@agent_action(concurrent=False)
 def set_working_folder(foldername):
     """
     Set the working folder for file operations.
@@ -185,7 +191,7 @@ def set_working_folder(foldername):
     return f"Working folder set to '{foldername}'."
 
 
-@agent_action
+@agent_action(concurrent=False)
 def set_working_code_folder(foldername):
     """
     Set the working folder for the code environment operations.
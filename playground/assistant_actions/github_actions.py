@@ -9,7 +9,12 @@ from playground.actions_manager import agent_action
 from playground.global_values import GlobalValues
 
 
-@agent_action
+def is_readme(result):
+    # Error messages are returned rather than raised, keep them out of the cache
+    return not result.startswith(("Invalid GitHub", "Failed to"))
+
+
+@agent_action(cache=3600, cache_if=is_readme)
 def download_github_readme(repo_url):
     """
     Download the README file from a GitHub repository's default branch.
@@ -86,7 +86,7 @@ def get_direction_stops(origin_name, destination_name, min_distance_km):
     return waypoints
 
 
-@agent_action
+@agent_action(cache=3600)
 def get_places(lat, long, place_type="restaurant", num_results=10):
     """
     Get a list of places near the specified latitude and longitude.
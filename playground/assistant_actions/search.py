@@ -14,7 +14,7 @@ def search_wikipedia(query):
     return search_results
 
 
-@agent_action
+@agent_action(cache=86400)
 def get_wikipedia_summary(page_id):
     """
     Gets the summary of the Wikipedia page
@@ -4,7 +4,9 @@ import urllib.parse
 import requests
 from youtube_transcript_api import YouTubeTranscriptApi
 
-from playground.actions_manager import agent_action
+from playground.actions_manager import action_cancelled, agent_action
+
+TRANSCRIPT_ERROR = "Error retrieving transcript"
 
 
 class YoutubeSearch:
@@ -39,6 +41,8 @@ class YoutubeSearch:
         url = f"{BASE_URL}/results?search_query={encoded_search}&sp={self.filter}"
         response = requests.get(url).text
         while "ytInitialData" not in response:
+            if action_cancelled():
+                raise TimeoutError("YouTube search was cancelled.")
             response = requests.get(url).text
         results = self._parse_html(response)
         if self.max_results is not None and len(results) > self.max_results:
@@ -115,7 +119,7 @@ class YoutubeSearch:
         return result
 
 
-@agent_action
+@agent_action(timeout=60, on_timeout="cancel")
 def search_youtube_videos(query: str, max_results=5, publish_time="this year"):
     """
     Search for YouTube videos based on a query and filter by publish time.
@@ -141,7 +145,7 @@ def search_youtube_videos(query: str, max_results=5, publish_time="this year"):
 search_cache = []
 
 
-@agent_action
+@agent_action(timeout=60, on_timeout="cancel")
 def search_new_youtube_videos(query: str, max_results=5):
     """Searches for new videos on YouTube based on the query string and returns the video titles and IDs."""
     global search_cache
@@ -156,7 +160,12 @@ def search_new_youtube_videos(query: str, max_results=5):
     return new_videos
 
 
-@agent_action
+def all_transcripts_found(transcripts):
+    # A failed video is retried on the next call rather than cached for a day
+    return not any(text.startswith(TRANSCRIPT_ERROR) for text in transcripts.values())
+
+
+@agent_action(cache=86400, cache_if=all_transcripts_found)
 def download_transcripts(video_ids):
     """Downloads the transcripts for the given video IDs."""
     if isinstance(video_ids, str):
@@ -170,5 +179,5 @@ def download_transcripts(video_ids):
             )
             transcripts[video_id] = transcript_text
         except Exception as e:
-            transcripts[video_id] = f"Error retrieving transcript: {str(e)}"
+            transcripts[video_id] = f"{TRANSCRIPT_ERROR}: {str(e)}"
     return transcripts
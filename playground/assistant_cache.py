@@ -0,0 +1,114 @@
+import threading
+import time
+
+
+class AssistantList:
+    """List of assistants that quacks like the page returned by assistants.list."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+
+class AssistantCache:
+    """
+    TTL cache of assistant metadata indexed by id and by lowercase name.
+
+    Entries are refreshed by the responses of create, update and retrieve calls
+    and dropped on delete, so only stale entries go back to the API.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._assistants_by_id = {}  # id -> (assistant, cached_at)
+        self._listing = None  # ids in list order, None until listed
+        self._listed_at = 0
+        self._ids_by_name = None  # lowercase name -> id, rebuilt after changes
+
+    def is_fresh(self, cached_at):
+        return self.ttl is None or time.monotonic() - cached_at < self.ttl
+
+    def get(self, assistant_id):
+        """Return the cached assistant with the given id, or None if missing or stale."""
+        with self._lock:
+            entry = self._assistants_by_id.get(assistant_id)
+        if entry is None or not self.is_fresh(entry[1]):
+            return None
+        return entry[0]
+
+    def put(self, assistant):
+        """Cache an assistant, adding it to the front of the listing if it is new."""
+        with self._lock:
+            self._assistants_by_id[assistant.id] = (assistant, time.monotonic())
+            if self._listing is not None and assistant.id not in self._listing:
+                # The API lists the newest assistants first
+                self._listing.insert(0, assistant.id)
+            self._ids_by_name = None
+
+    def put_all(self, assistants):
+        """Replace the cached listing with a freshly listed set of assistants."""
+        now = time.monotonic()
+        with self._lock:
+            self._assistants_by_id = {
+                assistant.id: (assistant, now) for assistant in assistants
+            }
+            self._listing = [assistant.id for assistant in assistants]
+            self._listed_at = now
+            self._ids_by_name = None
+
+    def all(self, allow_stale=False):
+        """Return the cached listing, or None if it was never loaded or is stale."""
+        with self._lock:
+            if self._listing is None:
+                return None
+            if not allow_stale and not self.is_fresh(self._listed_at):
+                return None
+            return [
+                self._assistants_by_id[assistant_id][0]
+                for assistant_id in self._listing
+                if assistant_id in self._assistants_by_id
+            ]
+
+    def find_by_name(self, name):
+        """Find a listed assistant by name, preferring an exact case-insensitive match.
+
+        Falls back to the first listed assistant whose name starts with the given
+        name. Returns None if the listing is not cached.
+        """
+        assistants = self.all()
+        if assistants is None:
+            return None
+        name = name.lower()
+        with self._lock:
+            if self._ids_by_name is None:
+                self._ids_by_name = {}
+                for assistant in assistants:
+                    if assistant.name:
+                        self._ids_by_name.setdefault(
+                            assistant.name.lower(), assistant.id
+                        )
+            assistant_id = self._ids_by_name.get(name)
+        if assistant_id is not None:
+            return self.get(assistant_id)
+        for assistant in assistants:
+            if assistant.name and assistant.name.lower().startswith(name):
+                return assistant
+        return None
+
+    def invalidate(self, assistant_id=None):
+        """Drop one assistant, or everything when no id is given."""
+        with self._lock:
+            self._ids_by_name = None
+            if assistant_id is None:
+                self._assistants_by_id = {}
+                self._listing = None
+                return
+            self._assistants_by_id.pop(assistant_id, None)
+            if self._listing is not None and assistant_id in self._listing:
+                self._listing.remove(assistant_id)
@@ -0,0 +1,93 @@
+import threading
+
+SAVE_PENDING = "Saving..."
+SAVE_DONE = "Saved"
+
+
+class AssistantUpdateDebouncer:
+    """
+    Coalesces assistant edits and pushes them after an idle window.
+
+    Edits are merged per assistant id and diffed against the last state pushed
+    to (or loaded from) the API, so only fields that actually changed are sent.
+    """
+
+    def __init__(self, push, idle_seconds=1.5):
+        self.push = push  # push(assistant_id, changed_fields)
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._pending = {}  # id -> fields waiting for the idle window
+        self._pushed = {}  # id -> last known remote state
+        self._timers = {}
+        self._status = {}
+
+    def seed(self, assistant_id, fields):
+        """Record the remote state of an assistant, e.g. right after loading it."""
+        with self._lock:
+            self._pushed[assistant_id] = dict(fields)
+            self._pending.pop(assistant_id, None)
+            timer = self._timers.pop(assistant_id, None)
+            if timer is not None:
+                timer.cancel()
+
+    def submit(self, assistant_id, fields):
+        """Queue an edit and restart the idle timer for the assistant."""
+        with self._lock:
+            pending = self._pending.setdefault(assistant_id, {})
+            pending.update(fields)
+            if not self._diff(assistant_id, pending):
+                # Edits were reverted or match what is already saved
+                self._pending.pop(assistant_id, None)
+                timer = self._timers.pop(assistant_id, None)
+                if timer is not None:
+                    timer.cancel()
+                return self._status.get(assistant_id, "")
+            timer = self._timers.pop(assistant_id, None)
+            if timer is not None:
+                timer.cancel()
+            timer = threading.Timer(self.idle_seconds, self.flush, args=(assistant_id,))
+            timer.daemon = True
+            self._timers[assistant_id] = timer
+            self._status[assistant_id] = SAVE_PENDING
+            timer.start()
+            return SAVE_PENDING
+
+    def flush(self, assistant_id):
+        """Push the changed fields of an assistant now."""
+        with self._lock:
+            self._timers.pop(assistant_id, None)
+            pending = self._pending.pop(assistant_id, None)
+            changed = self._diff(assistant_id, pending or {})
+            if not changed:
+                return
+        try:
+            self.push(assistant_id, changed)
+        except Exception as e:
+            print(f"Error updating assistant {assistant_id}: {str(e)}")
+            with self._lock:
+                self._status[assistant_id] = f"Error saving: {str(e)}"
+            return
+        with self._lock:
+            self._pushed.setdefault(assistant_id, {}).update(changed)
+            if assistant_id not in self._pending:
+                self._status[assistant_id] = SAVE_DONE
+
+    def flush_all(self):
+        """Push every pending edit, e.g. before shutting down."""
+        with self._lock:
+            assistant_ids = list(self._pending)
+        for assistant_id in assistant_ids:
+            self.flush(assistant_id)
+
+    def status(self, assistant_id):
+        """Return the save status text for an assistant."""
+        with self._lock:
+            return self._status.get(assistant_id, "")
+
+    def _diff(self, assistant_id, fields):
+        pushed = self._pushed.get(assistant_id, {})
+        return {
+            field: value
+            for field, value in fields.items()
+            if field not in pushed or pushed[field] != value
+        }
@@ -1,23 +1,84 @@
+import asyncio
+import contextvars
 import queue
 import threading
+import time
 
 from dotenv import load_dotenv
 
-from playground.assistants_utils import EventHandler
-from playground.llms import get_llm_client
+from playground.assistant_cache import AssistantCache, AssistantList
+from playground.assistants_utils import (
+    STREAM_DONE,
+    AsyncEventHandler,
+    EventHandler,
+    iter_stream_text,
+    usage_to_dict,
+)
+from playground.llms import get_async_llm_client, get_llm_client
+from playground.retry_policy import (
+    RETRYABLE_RUN_ERROR_CODES,
+    RetryPolicy,
+    TransientRunError,
+)
 
 
 load_dotenv()
 
 
+def run_attempt_error(eh, error):
+    """Error of a run attempt, including runs that failed with a retryable code."""
+    if error is None and eh.run_error is not None:
+        if eh.run_error.code in RETRYABLE_RUN_ERROR_CODES:
+            error = TransientRunError(eh.run_error.message)
+    return error
+
+
+def rerun_delay(retry_policy, eh, error, attempt):
+    """Seconds to wait before running a failed attempt again, None to give up."""
+    # Tool calls may have side effects, so runs that made some are not rerun
+    if (
+        error is None
+        or eh.tool_call_count > 0
+        or not retry_policy.should_retry(error, attempt)
+    ):
+        return None
+    delay = retry_policy.delay(attempt, error)
+    print(f"Run attempt {attempt} failed: {str(error)}, retrying in {delay:.1f}s")
+    return delay
+
+
+def run_message(thread, eh, reply, error, attempts):
+    """Reply of an assistant run with the statistics of its handler."""
+    if error is not None:
+        reply += f"Run cancelled with error: {str(error)}"
+    message = {
+        "text": reply,
+        "files": [],
+        "thread_id": thread.id,
+        "tool_calls": eh.tool_call_count,
+        "usage": usage_to_dict(eh.usage),
+        "attempts": attempts,
+    }
+    while len(eh.images) > 0:
+        message["files"].append(eh.images.pop())
+    return message
+
+
 class AssistantsAPI:
-    def __init__(self):
+    def __init__(self, assistant_cache_ttl=300, retry_policy=None):
         self.client = get_llm_client()
         self.actions_manager = None
+        # Transient run failures are retried with backoff before giving up
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Assistant metadata cache, kept in sync by create/update/delete
+        self.assistant_cache = AssistantCache(ttl=assistant_cache_ttl)
 
     def create_thread(self):
         return self.client.beta.threads.create()
 
+    def retrieve_thread(self, thread_id):
+        return self.client.beta.threads.retrieve(thread_id)
+
     def create_thread_message(self, thread_id, role, content, attachments=None):
         return self.client.beta.threads.messages.create(
             thread_id=thread_id,
@@ -46,34 +107,75 @@ class AssistantsAPI:
             temperature=temperature,
             top_p=top_p,
         )
+        self.assistant_cache.put(assistant)
 
         return assistant
 
-    def run_stream(self, thread_id, assistant_id, event_handler):
+    def run_stream(self, thread_id, assistant_id, event_handler, **run_options):
+        # run_options are passed on to the run, e.g. truncation_strategy
         return self.client.beta.threads.runs.stream(
             thread_id=thread_id,
             assistant_id=assistant_id,
             event_handler=event_handler,
+            **run_options,
         )
 
-    def list_assistants(self):
-        assistants = self.client.beta.assistants.list(limit=100)
-        return assistants
+    def list_assistants(self, refresh=False):
+        assistants = None if refresh else self.assistant_cache.all()
+        if assistants is None:
+            assistants = self.client.beta.assistants.list(limit=100).data
+            self.assistant_cache.put_all(assistants)
+        return AssistantList(assistants)
 
     def get_assistant_by_name(self, name):
-        assistants = self.list_assistants()
-        for assistant in assistants.data:
-            if assistant.name and assistant.name.lower().startswith(name.lower()):
-                return assistant
-        return None
+        return self.resolve_assistants([name])[name]
+
+    def resolve_assistant_ids(self, names):
+        """Map assistant names to ids with a single listing, None if not found."""
+        assistants = self.resolve_assistants(names)
+        return {
+            name: assistant.id if assistant is not None else None
+            for name, assistant in assistants.items()
+        }
+
+    def resolve_assistants(self, names):
+        """Find assistants by name, relisting once if the cache misses any.
 
-    def retrieve_assistant(self, assistant_id):
+        Assistants created elsewhere, e.g. in another process, are only in the
+        cached listing once it expires, so a miss refreshes it.
+        """
+        self.list_assistants()  # make sure the cached listing is fresh
+        assistants = {name: self.assistant_cache.find_by_name(name) for name in names}
+        missing = [name for name, assistant in assistants.items() if assistant is None]
+        if missing:
+            self.list_assistants(refresh=True)
+            for name in missing:
+                assistants[name] = self.assistant_cache.find_by_name(name)
+        return assistants
+
+    def retrieve_assistant(self, assistant_id, refresh=False):
+        assistant = None if refresh else self.assistant_cache.get(assistant_id)
+        if assistant is not None:
+            return assistant
         try:
             assistant = self.client.beta.assistants.retrieve(assistant_id)
+            self.assistant_cache.put(assistant)
             return assistant
         except Exception:
             return None
 
+    def verify_assistant_in_background(self, assistant_id):
+        """Re-fetch an assistant off the request path and drop it from the cache if gone."""
+
+        def verify():
+            if self.retrieve_assistant(assistant_id, refresh=True) is None:
+                print(f"Assistant {assistant_id} could not be verified.")
+                self.assistant_cache.invalidate(assistant_id)
+
+        verify_thread = threading.Thread(target=verify, daemon=True)
+        verify_thread.start()
+        return verify_thread
+
     def update_assistant(
         self,
         assistant_name,
@@ -96,9 +198,17 @@ class AssistantsAPI:
             temperature=assistant_temperature,
             top_p=assistant_top_p,
         )
+        self.assistant_cache.put(assistant)
+        return assistant
+
+    def update_assistant_fields(self, assistant_id, **fields):
+        """Update only the given fields of an assistant."""
+        assistant = self.client.beta.assistants.update(assistant_id, **fields)
+        self.assistant_cache.put(assistant)
         return assistant
 
     def delete_assistant(self, assistant_id):
+        self.assistant_cache.invalidate(assistant_id)
         self.client.beta.assistants.delete(assistant_id)
 
     def upload_file(self, file, purpose="assistants"):
@@ -120,61 +230,182 @@ class AssistantsAPI:
         thread = self.create_thread()
         return self.call_assistant_with_thread(thread, assistant_id, message)
 
-    def call_assistant_with_thread(self, thread, assistant_id, message):
+    def call_assistant_with_thread(self, thread, assistant_id, message, **run_options):
         assistant = self.retrieve_assistant(assistant_id)
-        output_queue = queue.Queue()
-        eh = EventHandler(output_queue)
-        thread_id = thread.id
 
         if assistant is None:
             msg = "Assistant not found."
             return msg
-        prompt = message
         self.create_thread_message(thread.id, "user", message)
 
+        # Only the run is retried, the message is already on the thread
+        attempt = 1
+        while True:
+            eh, reply, error = self.stream_run(thread.id, assistant.id, run_options)
+            error = run_attempt_error(eh, error)
+            delay = rerun_delay(self.retry_policy, eh, error, attempt)
+            if delay is None:
+                break
+            time.sleep(delay)
+            attempt += 1
+
+        return run_message(thread, eh, reply, error, attempt)
+
+    def stream_run(self, thread_id, assistant_id, run_options):
+        """Run the assistant on a thread once, returns (handler, reply, error)."""
+        output_queue = queue.Queue()
+        eh = EventHandler(output_queue)
+        errors = []
+
         def stream_worker(assistant_id, thread_id, event_handler):
             try:
                 with self.run_stream(
                     thread_id=thread_id,
                     assistant_id=assistant_id,
                     event_handler=event_handler,
+                    **run_options,
                 ) as stream:
                     for text in stream.text_deltas:
                         output_queue.put(("text", text))
             except Exception as e:
-                error_msg = f"Run cancelled with error: {str(e)}"
-                print(error_msg)
-                output_queue.put(("text", error_msg))
+                print(f"Run cancelled with error: {str(e)}")
+                errors.append(e)
+            finally:
+                output_queue.put(STREAM_DONE)
 
-        # Start the initial stream
-        thread_id = thread.id
+        # Start the initial stream, tool calls run in the caller's context so they
+        # see e.g. its current_sandbox
         initial_thread = threading.Thread(
-            target=stream_worker, args=(assistant.id, thread_id, eh)
+            target=contextvars.copy_context().run,
+            args=(stream_worker, assistant_id, thread_id, eh),
         )
         initial_thread.start()
-        reply = ""
-        while initial_thread.is_alive() or not output_queue.empty():
-            try:
-                item_type, item_value = output_queue.get(timeout=0.1)
-                if item_type == "text":
-                    reply += item_value
-                    # history[-1][1] = wrap_latex_with_markdown(history[-1][1])
-                # yield history
-
-            except queue.Empty:
-                pass
-        # history[-1][1] = wrap_latex_with_markdown(history[-1][1])
-        # yield history
+        # Nobody renders partial replies here, so there is no need to batch deltas
+        reply = "".join(iter_stream_text(output_queue, batch_interval=0))
         # Final flush of images
         initial_thread.join()
+        return eh, reply, errors[0] if errors else None
+
+
+class AsyncAssistantsAPI:
+    """
+    Async counterpart of AssistantsAPI built on the async client.
+
+    Runs are driven on the event loop instead of a dedicated thread per run, so
+    one process can drive many concurrent assistant runs.
+    """
+
+    def __init__(self, assistant_cache_ttl=300, retry_policy=None):
+        self.client = get_async_llm_client()
+        # Same retries and assistant metadata cache as AssistantsAPI
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.assistant_cache = AssistantCache(ttl=assistant_cache_ttl)
 
-        message = {"text": reply, "files": []}
-        while len(eh.images) > 0:
-            # history.append((None, (eh.images.pop(),)))
-            # yield history
-            message["files"].append(eh.images.pop())
+    async def create_thread(self):
+        return await self.client.beta.threads.create()
 
-        return message
+    async def create_thread_message(self, thread_id, role, content, attachments=None):
+        return await self.client.beta.threads.messages.create(
+            thread_id=thread_id,
+            role=role,
+            content=content,
+            attachments=attachments,
+        )
+
+    def run_stream(self, thread_id, assistant_id, event_handler, **run_options):
+        # Returns an async context manager, use with `async with`
+        return self.client.beta.threads.runs.stream(
+            thread_id=thread_id,
+            assistant_id=assistant_id,
+            event_handler=event_handler,
+            **run_options,
+        )
+
+    async def list_assistants(self, refresh=False):
+        assistants = None if refresh else self.assistant_cache.all()
+        if assistants is None:
+            assistants = (await self.client.beta.assistants.list(limit=100)).data
+            self.assistant_cache.put_all(assistants)
+        return AssistantList(assistants)
+
+    async def get_assistant_by_name(self, name):
+        return (await self.resolve_assistants([name]))[name]
+
+    async def resolve_assistants(self, names):
+        """Find assistants by name, relisting once if the cache misses any."""
+        await self.list_assistants()
+        assistants = {name: self.assistant_cache.find_by_name(name) for name in names}
+        missing = [name for name, assistant in assistants.items() if assistant is None]
+        if missing:
+            await self.list_assistants(refresh=True)
+            for name in missing:
+                assistants[name] = self.assistant_cache.find_by_name(name)
+        return assistants
+
+    async def retrieve_assistant(self, assistant_id, refresh=False):
+        assistant = None if refresh else self.assistant_cache.get(assistant_id)
+        if assistant is not None:
+            return assistant
+        try:
+            assistant = await self.client.beta.assistants.retrieve(assistant_id)
+            self.assistant_cache.put(assistant)
+            return assistant
+        except Exception:
+            return None
+
+    async def call_assistant(self, assistant_id, message):
+        thread = await self.create_thread()
+        return await self.call_assistant_with_thread(thread, assistant_id, message)
+
+    async def call_assistant_with_thread(
+        self, thread, assistant_id, message, **run_options
+    ):
+        assistant = await self.retrieve_assistant(assistant_id)
+        if assistant is None:
+            msg = "Assistant not found."
+            return msg
+        await self.create_thread_message(thread.id, "user", message)
+
+        # Only the run is retried, the message is already on the thread
+        attempt = 1
+        while True:
+            eh, reply, error = await self.stream_run(
+                thread.id, assistant.id, run_options
+            )
+            error = run_attempt_error(eh, error)
+            delay = rerun_delay(self.retry_policy, eh, error, attempt)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        return run_message(thread, eh, reply, error, attempt)
+
+    async def stream_run(self, thread_id, assistant_id, run_options):
+        """Run the assistant on a thread once, returns (handler, reply, error)."""
+        output_queue = asyncio.Queue()
+        eh = AsyncEventHandler(output_queue, self.client)
+        error = None
+        try:
+            async with self.run_stream(
+                thread_id=thread_id,
+                assistant_id=assistant_id,
+                event_handler=eh,
+                **run_options,
+            ) as stream:
+                async for text in stream.text_deltas:
+                    await output_queue.put(("text", text))
+        except Exception as e:
+            print(f"Run cancelled with error: {str(e)}")
+            error = e
+
+        # Tool output streams share the queue, so drain it in arrival order
+        reply = ""
+        while not output_queue.empty():
+            item_type, item_value = output_queue.get_nowait()
+            if item_type == "text":
+                reply += item_value
+        return eh, reply, error
 
 
 api = AssistantsAPI()
@@ -1,7 +1,6 @@
-import time
-
 import gradio as gr
 
+from playground.assistant_updates import AssistantUpdateDebouncer
 from playground.assistants_api import api
 from playground.assistants_utils import (
     get_actions_by_name,
@@ -10,17 +9,46 @@ from playground.assistants_utils import (
 )
 
 
-def assistants_panel(actions_manager):
-    available_actions = actions_manager.get_actions()
-
-    def list_assistants():
-        assistant_choices = api.list_assistants()
-        assistant_options = {a.name: a.id for a in assistant_choices.data}
+def assistants_panel(actions_manager, verify_new_assistants=False):
+    def assistant_options_of(assistants):
+        assistant_options = {a.name: a.id for a in assistants}
         assistant_options["Create New Assistant"] = "new"
         return assistant_options
 
+    def list_assistants():
+        return assistant_options_of(api.list_assistants().data)
+
     assistant_options = list_assistants()
 
+    def assistant_fields(
+        assistant_name,
+        assistant_instructions,
+        assistant_model,
+        assistant_tools,
+        assistant_actions,
+        assistant_resformat,
+        assistant_temperature,
+        assistant_top_p,
+    ):
+        tools = get_tools_by_name(assistant_tools or [])
+        actions = get_actions_by_name(
+            assistant_actions or [], actions_manager.get_actions()
+        )
+        return {
+            "name": assistant_name,
+            "instructions": assistant_instructions,
+            "model": assistant_model,
+            "tools": tools + actions,
+            "response_format": assistant_resformat,
+            "temperature": assistant_temperature,
+            "top_p": assistant_top_p,
+        }
+
+    # Edits are pushed once the controls have been idle, and only changed fields
+    update_debouncer = AssistantUpdateDebouncer(
+        lambda assistant_id, fields: api.update_assistant_fields(assistant_id, **fields)
+    )
+
     def update_assistant(
         assistant_name,
         assistant_id,
@@ -33,19 +61,23 @@ def assistants_panel(actions_manager):
         assistant_top_p,
     ):
         if assistant_id is not None and len(assistant_id) > 5:
-            tools = get_tools_by_name(assistant_tools)
-            actions = get_actions_by_name(assistant_actions, available_actions)
-            api.update_assistant(
+            fields = assistant_fields(
                 assistant_name,
-                assistant_id,
                 assistant_instructions,
                 assistant_model,
-                tools,
-                actions,
+                assistant_tools,
+                assistant_actions,
                 assistant_resformat,
                 assistant_temperature,
                 assistant_top_p,
             )
+            return update_debouncer.submit(assistant_id, fields)
+        return ""
+
+    def save_status(assistant_id):
+        if assistant_id is not None and len(assistant_id) > 5:
+            return update_debouncer.status(assistant_id)
+        return ""
 
     def create_assistant(
         assistant_name_new,
@@ -65,8 +97,7 @@ def assistants_panel(actions_manager):
         ]
         actions = [
             action["agent_action"]
-            for action in available_actions
-            if action["name"] in assistant_actions_new
+            for action in actions_manager.get_actions_by_names(assistant_actions_new)
         ]
         format = "auto"  # "type" if assistant_resformat_new == "JSON object" else "auto"  TODO: fix this
         new_assistant = api.create_assistant(
@@ -79,7 +110,7 @@ def assistants_panel(actions_manager):
             assistant_temperature_new,
             assistant_top_p_new,
         )
-        return new_assistant.id
+        return new_assistant
 
     def get_assistant_details(assistant_key):
         assistant_options = list_assistants()
@@ -99,6 +130,22 @@ def assistants_panel(actions_manager):
                 tools, actions = get_tools(assistant.tools)
             format = "type" if assistant.response_format == "JSON object" else "auto"
 
+            # Loading an assistant fires every control's change event, seeding the
+            # debouncer with the loaded state keeps those from becoming updates
+            update_debouncer.seed(
+                assistant.id,
+                assistant_fields(
+                    assistant.name,
+                    assistant.instructions,
+                    assistant.model,
+                    tools,
+                    actions,
+                    format,
+                    assistant.temperature,
+                    assistant.top_p,
+                ),
+            )
+
             return (
                 assistant.name,
                 assistant.id,
@@ -127,7 +174,7 @@ def assistants_panel(actions_manager):
                 gr.update(visible=True),
             )
 
-    action_choices = sorted([action["name"] for action in available_actions])
+    action_choices = sorted(actions_manager.get_action_names())
     assistant_selected = gr.Dropdown(
         label="Select Assistant",
         choices=assistant_options.keys(),
@@ -221,6 +268,7 @@ def assistants_panel(actions_manager):
             assistant_top_p = gr.Slider(
                 label="Top P", minimum=0, maximum=1, step=0.01, value=1
             )
+        save_status_text = gr.Markdown("")
         delete_button = gr.Button("🗑️")
 
     assistant_selected.change(
@@ -263,7 +311,12 @@ def assistants_panel(actions_manager):
     ]
 
     for control in controls:
-        control.change(fn=update_assistant, inputs=controls, outputs=[])
+        control.change(fn=update_assistant, inputs=controls, outputs=save_status_text)
+
+    save_status_timer = gr.Timer(1)
+    save_status_timer.tick(
+        fn=save_status, inputs=assistant_id, outputs=save_status_text
+    )
 
     def create_and_select_assistant(
         assistant_name_new,
@@ -275,7 +328,7 @@ def assistants_panel(actions_manager):
         assistant_temperature_new,
         assistant_top_p_new,
     ):
-        new_assistant_id = create_assistant(
+        new_assistant = create_assistant(
             assistant_name_new,
             assistant_instructions_new,
             assistant_model_new,
@@ -285,10 +338,16 @@ def assistants_panel(actions_manager):
             assistant_temperature_new,
             assistant_top_p_new,
         )
-        time.sleep(2)  # wait for assistant to be created
-        assistant_options = list_assistants()
+        # The dropdown comes from the cached listing plus the created assistant,
+        # even if the listing went stale, rather than waiting on a new listing
+        cached = api.assistant_cache.all(allow_stale=True) or []
+        assistant_options = assistant_options_of(
+            [new_assistant] + [a for a in cached if a.id != new_assistant.id]
+        )
+        if verify_new_assistants:
+            api.verify_assistant_in_background(new_assistant.id)
         return (
-            gr.update(choices=list(assistant_options.keys()), value=new_assistant_id),
+            gr.update(choices=list(assistant_options.keys()), value=new_assistant.name),
             gr.update(visible=False),
             gr.update(visible=True),
             gr.update(visible=False),
@@ -329,6 +388,25 @@ def assistants_panel(actions_manager):
         ],
     )
 
+    def refresh_action_choices(known_version):
+        # The actions watcher bumps the registry version on every hot reload
+        if known_version == actions_manager.version:
+            return gr.update(), gr.update(), known_version
+        choices = sorted(actions_manager.get_action_names())
+        return (
+            gr.update(choices=choices),
+            gr.update(choices=choices),
+            actions_manager.version,
+        )
+
+    actions_version = gr.State(actions_manager.version)
+    actions_timer = gr.Timer(5, active=actions_manager.watcher is not None)
+    actions_timer.tick(
+        fn=refresh_action_choices,
+        inputs=actions_version,
+        outputs=[assistant_actions_new, assistant_actions, actions_version],
+    )
+
     delete_button.click(
         fn=delete_and_select_assistant,
         inputs=[assistant_id],
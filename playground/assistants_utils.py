@@ -1,11 +1,21 @@
+import asyncio
+import contextvars
 import datetime
 import json
 import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from openai import AssistantEventHandler
+from openai import AssistantEventHandler, AsyncAssistantEventHandler
 from typing_extensions import override
 
-from playground.actions_manager import ActionsManager
+from playground.actions_manager import (
+    ActionsManager,
+    ActionTimeoutError,
+    run_cancellable,
+)
 from playground.global_values import GlobalValues
 from playground.llms import get_llm_client
 
@@ -40,12 +50,52 @@ def get_tools_by_name(tools):
 
 
 def get_actions_by_name(actions, available_actions):
-    action_list = []
-    for action in actions:
-        for available_action in available_actions:
-            if available_action["name"] == action:
-                action_list.append(available_action["agent_action"])
-    return action_list
+    available_by_name = {}
+    for available_action in available_actions:
+        available_by_name.setdefault(available_action["name"], available_action)
+    return [
+        available_by_name[action]["agent_action"]
+        for action in actions
+        if action in available_by_name
+    ]
+
+
+# Put on a stream output queue by the stream worker once the run has finished
+STREAM_DONE = ("done", None)
+
+
+def iter_stream_text(output_queue, batch_interval=0.05, batch_size=512):
+    """
+    Yield text from a stream output queue until STREAM_DONE is received.
+
+    Blocks until the first delta arrives, then coalesces any further deltas that
+    arrive within batch_interval seconds (or until batch_size characters) so
+    consumers update once per batch rather than once per token.
+    """
+    done = False
+    while not done:
+        item_type, item_value = output_queue.get()
+        if (item_type, item_value) == STREAM_DONE:
+            break
+        batch = [item_value] if item_type == "text" else []
+        size = len(batch[0]) if batch else 0
+        deadline = time.monotonic() + batch_interval
+        while size < batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item_type, item_value = output_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if (item_type, item_value) == STREAM_DONE:
+                done = True
+                break
+            if item_type == "text":
+                batch.append(item_value)
+                size += len(item_value)
+        if batch:
+            yield "".join(batch)
 
 
 def save_binary_response_content(binary_content):
@@ -85,18 +135,182 @@ def save_binary_response_content(binary_content):
     return file_path
 
 
-class EventHandler(AssistantEventHandler):
-    def __init__(self, output_queue) -> None:
-        super().__init__()
+# Run events that carry the final token usage of a run
+RUN_END_EVENTS = (
+    "thread.run.completed",
+    "thread.run.failed",
+    "thread.run.cancelled",
+    "thread.run.expired",
+    "thread.run.incomplete",
+)
+
+
+def usage_to_dict(usage):
+    """Convert the usage field of an assistant run to a plain dict."""
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return dict(usage)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+        "total_tokens": getattr(usage, "total_tokens", None),
+    }
+
+
+class ToolCallsMixin:
+    """Tool call dispatch shared by the sync and async event handlers."""
+
+    # Upper bound on tool calls from one requires_action event running at once
+    max_tool_workers = 8
+    # Timeout in seconds for actions that do not declare one, None waits forever
+    default_action_timeout = None
+
+    def init_tool_calls(self):
         self._images = []
+        self._tool_lock = threading.Lock()
         self.action_manager = ActionsManager()  # singleton
-        self.output_queue = output_queue
         self.internal_context = ""
+        # Run statistics, merged from the handlers of tool output streams
+        self.tool_call_count = 0
+        self.usage = None
+        self.run_error = None  # last_error of a failed run
+
+    def record_run_event(self, event):
+        """Keep the token usage of the run once it has finished."""
+        if event.event in RUN_END_EVENTS and event.data.usage is not None:
+            self.usage = event.data.usage
+        if event.event == "thread.run.failed":
+            self.run_error = event.data.last_error
+
+    def merge_run_stats(self, handler):
+        with self._tool_lock:
+            self.tool_call_count += handler.tool_call_count
+            if handler.usage is not None:
+                self.usage = handler.usage
+            if handler.run_error is not None:
+                self.run_error = handler.run_error
 
     @property
     def images(self):
         return self._images
 
+    def on_image_file_done(self, image_file) -> None:
+        content = client.files.content(image_file.file_id)
+        image_file = save_binary_response_content(content.content)
+        print(f"File saved as {image_file}")
+        with self._tool_lock:
+            self._images += [image_file]
+
+    def on_image_file(self, image_file) -> None:
+        with self._tool_lock:
+            self._images += [image_file]
+
+    def plan_tool_batches(self, tool_calls):
+        """
+        Split tool calls into batches that are safe to run at the same time.
+
+        Consecutive concurrent-safe calls share a batch, actions that opted out
+        with concurrent=False run alone and act as barriers. Each batch is a list
+        of (index, tool, action) tuples.
+        """
+        batches = []
+        batch = []
+        for index, tool in enumerate(tool_calls):
+            action = self.action_manager.get_action(tool.function.name)
+            if action and not action.get("concurrent", True):
+                if batch:
+                    batches.append(batch)
+                    batch = []
+                batches.append([(index, tool, action)])
+            else:
+                batch.append((index, tool, action))
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def run_tool_call(self, tool, action):
+        """Execute a single tool call and return its tool output, or None."""
+        if not action:
+            return None
+
+        print(f"action: {tool.function.name} -> {action}")
+        try:
+            args = json.loads(tool.function.arguments)
+            print(f"action: {tool.function.name} -> {args}")
+            output = self.call_action(tool.function.name, action, args)
+
+            if hasattr(output, "data"):
+                for el in output.data:
+                    if hasattr(el, "content"):
+                        for c in el.content:
+                            if hasattr(c, "image_file"):
+                                self.on_image_file_done(c.image_file)
+            elif isinstance(output, str) and ".png" in output:
+                self.on_image_file(output)
+
+            print(
+                f"action: {tool.function.name}(args={tool.function.arguments}) -> {str(output)}"
+            )
+            with self._tool_lock:
+                self.internal_context += str(output)
+            return {"tool_call_id": tool.id, "output": str(output)}
+        except ActionTimeoutError as e:
+            print(f"Timeout in action: {tool.function.name} -> {str(e)}")
+            output = {
+                "error": "timeout",
+                "action": e.action_name,
+                "timeout": e.timeout,
+                "on_timeout": e.on_timeout,
+                "message": str(e),
+            }
+            return {"tool_call_id": tool.id, "output": json.dumps(output)}
+        except Exception as e:
+            print(f"Error in action: {tool.function.name} -> {str(e)}")
+            return {"tool_call_id": tool.id, "output": str(e)}
+
+    def call_action(self, action_name, action, args):
+        """Call an action, enforcing its timeout and cancellation policy."""
+        timeout = action.get("timeout") or self.default_action_timeout
+        if not timeout:
+            return action["pointer"](**args)
+
+        cancel_event = threading.Event()
+        outcome = {}
+
+        def target():
+            try:
+                outcome["output"] = run_cancellable(
+                    action["pointer"], cancel_event, **args
+                )
+            except Exception as e:
+                outcome["error"] = e
+
+        # A daemon thread so an abandoned action never blocks shutdown
+        worker = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(target,),
+            name=f"action-{action_name}",
+        )
+        worker.daemon = True
+        worker.start()
+        worker.join(timeout)
+        if worker.is_alive():
+            on_timeout = action.get("on_timeout", "abandon")
+            if on_timeout == "cancel":
+                cancel_event.set()
+            raise ActionTimeoutError(action_name, timeout, on_timeout)
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["output"]
+
+
+class EventHandler(ToolCallsMixin, AssistantEventHandler):
+    def __init__(self, output_queue) -> None:
+        super().__init__()
+        self.init_tool_calls()
+        self.output_queue = output_queue
+
     @override
     def on_text_created(self, text) -> None:
         print("assistant > ", end="", flush=True)
@@ -106,15 +320,6 @@ class EventHandler(AssistantEventHandler):
         if delta.annotations:
             print(delta.annotations, end="", flush=True)
 
-    def on_image_file_done(self, image_file) -> None:
-        content = client.files.content(image_file.file_id)
-        image_file = save_binary_response_content(content.content)
-        print(f"File saved as {image_file}")
-        self._images += [image_file]
-
-    def on_image_file(self, image_file) -> None:
-        self._images += [image_file]
-
     def on_tool_call_created(self, tool_call):
         if tool_call.type == "code_interpreter":
             print("# >>> Code Interpreter", flush=True)
@@ -135,6 +340,7 @@ class EventHandler(AssistantEventHandler):
     def on_event(self, event):
         # Retrieve events that are denoted with 'requires_action'
         # since these will have our tool_calls
+        self.record_run_event(event)
         if event.event == "thread.run.requires_action":
             run_id = event.data.id  # Retrieve the run ID from the event data
             self.handle_requires_action(event.data, run_id)
@@ -144,52 +350,50 @@ class EventHandler(AssistantEventHandler):
         data,
         run_id,
     ):
-        tool_outputs = []
-
-        for tool in data.required_action.submit_tool_outputs.tool_calls:
-            if tool.function.name in self.action_manager.get_action_names():
-                action = self.action_manager.get_action(tool.function.name)
-                print(f"action: {tool.function.name} -> {action}")
-                if action:
-                    try:
-                        args = json.loads(tool.function.arguments)
-                        print(f"action: {tool.function.name} -> {args}")
-                        output = action["pointer"](**args)
-
-                        if hasattr(output, "data"):
-                            for el in output.data:
-                                if hasattr(el, "content"):
-                                    for c in el.content:
-                                        if hasattr(c, "image_file"):
-                                            self.on_image_file_done(c.image_file)
-                        elif isinstance(output, str) and ".png" in output:
-                            self.on_image_file(output)
-
-                        tool_outputs.append(
-                            {"tool_call_id": tool.id, "output": str(output)}
-                        )
-                        print(
-                            f"action: {tool.function.name}(args={tool.function.arguments}) -> {str(output)}"
-                        )
-                        self.internal_context += str(output)
-                    except Exception as e:
-                        print(f"Error in action: {tool.function.name} -> {str(e)}")
-                        tool_outputs.append({"tool_call_id": tool.id, "output": str(e)})
+        tool_calls = data.required_action.submit_tool_outputs.tool_calls
+        self.tool_call_count += len(tool_calls)
+        results = [None] * len(tool_calls)
+        for batch in self.plan_tool_batches(tool_calls):
+            self.run_tool_batch(batch, results)
+
+        # Keep the tool_call_id order of the run, skipping unknown actions
+        tool_outputs = [output for output in results if output is not None]
 
         # Submit all tool_outputs at the same time
         self.submit_tool_outputs(tool_outputs, run_id)
 
+    def run_tool_batch(self, batch, results):
+        """Run a batch of independent tool calls on a bounded thread pool."""
+        if len(batch) <= 1 or self.max_tool_workers <= 1:
+            for index, tool, action in batch:
+                results[index] = self.run_tool_call(tool, action)
+            return
+
+        workers = min(self.max_tool_workers, len(batch))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Actions see the context of the run, e.g. its current_sandbox
+            futures = {
+                index: executor.submit(
+                    contextvars.copy_context().run, self.run_tool_call, tool, action
+                )
+                for index, tool, action in batch
+            }
+            for index, future in futures.items():
+                results[index] = future.result()
+
     def submit_tool_outputs(self, tool_outputs, run_id):
         # Use the submit_tool_outputs_stream helper
+        handler = EventHandler(self.output_queue)
         try:
             with client.beta.threads.runs.submit_tool_outputs_stream(
                 thread_id=self.current_run.thread_id,
                 run_id=self.current_run.id,
                 tool_outputs=tool_outputs,
-                event_handler=EventHandler(self.output_queue),
+                event_handler=handler,
             ) as stream:
                 for text in stream.text_deltas:
                     self.output_queue.put(("text", text))
+            self.merge_run_stats(handler)
         except Exception as e:
             msg = f"Run cancelled with error in tool outputs: {str(e)}"
             self.output_queue.put(("text", msg))
@@ -201,3 +405,97 @@ class EventHandler(AssistantEventHandler):
                 role="assistant",
                 content=msg,
             )
+
+
+class AsyncEventHandler(ToolCallsMixin, AsyncAssistantEventHandler):
+    """
+    Event handler for runs streamed with the async client.
+
+    Actions are synchronous, so tool calls run on worker threads while the
+    event loop stays free to drive other runs.
+    """
+
+    def __init__(self, output_queue, async_client) -> None:
+        super().__init__()
+        self.init_tool_calls()
+        self.output_queue = output_queue
+        self.async_client = async_client
+
+    @override
+    async def on_text_created(self, text) -> None:
+        print("assistant > ", end="", flush=True)
+
+    @override
+    async def on_text_delta(self, delta, snapshot):
+        if delta.annotations:
+            print(delta.annotations, end="", flush=True)
+
+    @override
+    async def on_tool_call_created(self, tool_call):
+        if tool_call.type == "code_interpreter":
+            print("# >>> Code Interpreter", flush=True)
+
+    @override
+    async def on_tool_call_delta(self, delta, snapshot):
+        if delta.type == "code_interpreter":
+            if delta.code_interpreter.input:
+                print(delta.code_interpreter.input, end="", flush=True)
+                self.internal_context += delta.code_interpreter.input
+            if delta.code_interpreter.outputs:
+                print("\nOutput >", flush=True)
+                for output in delta.code_interpreter.outputs:
+                    if output.type == "logs":
+                        print(f"{output.logs}", flush=True)
+                        self.internal_context += output.logs
+
+    @override
+    async def on_event(self, event):
+        self.record_run_event(event)
+        if event.event == "thread.run.requires_action":
+            run_id = event.data.id
+            await self.handle_requires_action(event.data, run_id)
+
+    async def handle_requires_action(self, data, run_id):
+        tool_calls = data.required_action.submit_tool_outputs.tool_calls
+        self.tool_call_count += len(tool_calls)
+        results = [None] * len(tool_calls)
+        semaphore = asyncio.Semaphore(max(self.max_tool_workers, 1))
+
+        async def run_bounded(tool, action):
+            async with semaphore:
+                return await asyncio.to_thread(self.run_tool_call, tool, action)
+
+        for batch in self.plan_tool_batches(tool_calls):
+            outputs = await asyncio.gather(
+                *(run_bounded(tool, action) for _, tool, action in batch)
+            )
+            for (index, _, _), output in zip(batch, outputs):
+                results[index] = output
+
+        # Keep the tool_call_id order of the run, skipping unknown actions
+        tool_outputs = [output for output in results if output is not None]
+        await self.submit_tool_outputs(tool_outputs, run_id)
+
+    async def submit_tool_outputs(self, tool_outputs, run_id):
+        handler = AsyncEventHandler(self.output_queue, self.async_client)
+        try:
+            async with self.async_client.beta.threads.runs.submit_tool_outputs_stream(
+                thread_id=self.current_run.thread_id,
+                run_id=self.current_run.id,
+                tool_outputs=tool_outputs,
+                event_handler=handler,
+            ) as stream:
+                async for text in stream.text_deltas:
+                    await self.output_queue.put(("text", text))
+            self.merge_run_stats(handler)
+        except Exception as e:
+            msg = f"Run cancelled with error in tool outputs: {str(e)}"
+            await self.output_queue.put(("text", msg))
+            await self.async_client.beta.threads.runs.cancel(
+                run_id=self.current_run.id, thread_id=self.current_run.thread_id
+            )
+            await self.async_client.beta.threads.messages.create(
+                thread_id=self.current_run.thread_id,
+                role="assistant",
+                content=msg,
+            )
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from playground.thread_lifecycle import FRESH
+
+CHECKPOINT_DIR = "btree_checkpoints"
+
+# Paths of the checkpoints held by a running tree, one run per checkpoint
+_claimed = set()
+_claimed_lock = threading.Lock()
+
+
+class BehaviorTreeCheckpoint:
+    """
+    JSON checkpoint of the action nodes a behavior tree run has finished.
+
+    Each finished node records its status, result and assistant thread id. When
+    a crashed or cancelled run is started again, nodes that already succeeded are
+    skipped once instead of repeating their assistant calls.
+    """
+
+    def __init__(self, path, tree_hash=None):
+        self.path = path
+        self.tree_hash = tree_hash
+        self._lock = threading.Lock()
+        self.nodes = {}
+        self.resume_nodes = {}  # successes from the previous run, consumed on resume
+        self.load()
+
+    @classmethod
+    def for_yaml(cls, yaml_path, checkpoint_dir=CHECKPOINT_DIR):
+        """Create the checkpoint of a YAML tree, discarded when the YAML changes."""
+        with open(yaml_path, "rb") as f:
+            tree_hash = hashlib.sha256(f.read()).hexdigest()
+        name = os.path.splitext(os.path.basename(yaml_path))[0]
+        return cls(os.path.join(checkpoint_dir, f"{name}.json"), tree_hash=tree_hash)
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("tree_hash") != self.tree_hash:
+            print(f"Ignoring checkpoint {self.path}, the tree has changed.")
+            return
+        self.nodes = data.get("nodes", {})
+        self.resume_nodes = {
+            key: entry
+            for key, entry in self.nodes.items()
+            if entry.get("status") == "SUCCESS"
+        }
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"tree_hash": self.tree_hash, "nodes": self.nodes},
+                f,
+                indent=2,
+                default=str,
+            )
+        os.replace(tmp_path, self.path)
+
+    def attach(self, tree):
+        """Give every checkpointable node of a tree this checkpoint and its key."""
+        shared = {}  # id of a shared thread lifecycle -> (lifecycle, node keys)
+        for key, node in node_keys(tree):
+            if hasattr(node, "checkpoint_key"):
+                node.checkpoint = self
+                node.checkpoint_key = key
+            threads = getattr(node, "thread_lifecycle", None)
+            if threads is not None and threads.policy != FRESH:
+                shared.setdefault(id(threads), (threads, []))[1].append(key)
+        for threads, keys in shared.values():
+            self.restore_thread(threads, keys)
+
+    def restore_thread(self, threads, keys):
+        """Continue the shared thread of resumed nodes, or resume none of them.
+
+        Later nodes on a shared thread depend on the conversation of the skipped
+        ones, so they are only skipped if that thread can be restored.
+        """
+        entries = [self.resume_nodes[key] for key in keys if key in self.resume_nodes]
+        if not entries:
+            return
+        with_thread = [entry for entry in entries if entry.get("thread_id")]
+        if with_thread:
+            # Later nodes win ties, their runs were on the newest thread
+            latest = max(
+                reversed(with_thread), key=lambda entry: entry.get("completed_at", 0)
+            )
+            if threads.restore(latest["thread_id"]):
+                return
+        print("Unable to restore the shared thread, its nodes run again.")
+        with self._lock:
+            for key in keys:
+                self.resume_nodes.pop(key, None)
+
+    def take_resumed(self, key):
+        """Return and consume the previous run's success entry for a node, if any."""
+        with self._lock:
+            return self.resume_nodes.pop(key, None)
+
+    def record(self, key, status, result=None, thread_id=None):
+        """Record a finished node and write the checkpoint to disk."""
+        with self._lock:
+            self.nodes[key] = {
+                "status": status,
+                "result": result,
+                "thread_id": thread_id,
+                "completed_at": time.time(),
+            }
+            self.save()
+
+    def clear(self):
+        """Forget all nodes, e.g. after the tree completed successfully."""
+        with self._lock:
+            self.nodes = {}
+            self.resume_nodes = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def node_keys(tree):
+    """Yield (key, node) for every node, keyed by depth-first position and name."""
+    for index, node in enumerate(tree.root.iterate()):
+        yield f"{index}:{node.name}", node
+
+
+@contextmanager
+def claim_checkpoint(checkpoint, tree):
+    """Attach a checkpoint to a tree for the length of a run.
+
+    Yields the checkpoint, or None if it is None or another run of the same tree
+    holds it, so concurrent runs neither resume nor clear each other's progress.
+    """
+    if checkpoint is None:
+        yield None
+        return
+    with _claimed_lock:
+        claimed = checkpoint.path not in _claimed
+        if claimed:
+            _claimed.add(checkpoint.path)
+    if not claimed:
+        print(f"Another run holds checkpoint {checkpoint.path}, running without it.")
+        yield None
+        return
+    try:
+        checkpoint.attach(tree)
+        yield checkpoint
+    finally:
+        with _claimed_lock:
+            _claimed.discard(checkpoint.path)
@@ -1,33 +1,54 @@
 import os
 import threading
-import time
+import uuid
 from prefect import flow
-import yaml
 import py_trees
 from py_trees.trees import BehaviourTree
 
-from playground.behavior_trees import create_assistant_action
+from playground.assistants_api import api
+from playground.behavior_tree_checkpoint import (
+    BehaviorTreeCheckpoint,
+    claim_checkpoint,
+)
+from playground.behavior_tree_pool import BehaviorTreePool
+from playground.behavior_tree_schema import BehaviorTreeSchemaError, compiled_trees
+from playground.behavior_trees import (
+    TickScheduler,
+    action_completed,
+    create_assistant_action,
+)
+from playground.thread_lifecycle import ThreadLifecycle
+
+# YAML names of the success policies supported by Parallel nodes
+PARALLEL_POLICIES = {
+    "SuccessOnAll": py_trees.common.ParallelPolicy.SuccessOnAll,
+    "SuccessOnOne": py_trees.common.ParallelPolicy.SuccessOnOne,
+}
+
+# Trees started from the UI run here, several at a time
+MAX_RUNNING_TREES = 4
+runner_pool = BehaviorTreePool(max_running=MAX_RUNNING_TREES)
 
 
 @flow(log_prints=True)
-def deployment_run_btree(yaml_path, tick_interval=30):
+def deployment_run_btree(yaml_path, tick_interval=30, resume=True):
     btm = BehaviorTreeManager(os.path.dirname(yaml_path))
     tree = btm.load_behavior_tree_from_yaml(yaml_path)
-    while True:
-        tree.tick()
-        if tree.root.status == py_trees.common.Status.SUCCESS:
-            print("Behavior tree completed successfully.")
-            break
-        if tree.root.status == py_trees.common.Status.FAILURE:
-            print("Behavior tree failed.")
-            break
-        time.sleep(tick_interval)
+    checkpoint = BehaviorTreeCheckpoint.for_yaml(yaml_path) if resume else None
+    with claim_checkpoint(checkpoint, tree) as checkpoint:
+        # tick_interval is now the longest idle wait, completed actions tick at once
+        status = TickScheduler(max_interval=tick_interval).run(tree)
+        if status == py_trees.common.Status.SUCCESS and checkpoint is not None:
+            checkpoint.clear()
+    if status == py_trees.common.Status.SUCCESS:
+        print("Behavior tree completed successfully.")
+    if status == py_trees.common.Status.FAILURE:
+        print("Behavior tree failed.")
 
 
 class BehaviorTreeManager:
     def __init__(self, folder_path):
         self.folder_path = folder_path
-        self.current_tree_runner = None
 
     def load_yaml_files(self):
         yaml_files = [
@@ -35,16 +56,40 @@ class BehaviorTreeManager:
             for f in os.listdir(self.folder_path)
             if f.endswith(".yaml") or f.endswith(".yml")
         ]
+        listed_files = []
         summaries = []
         for file in yaml_files:
-            with open(os.path.join(self.folder_path, file), "r") as f:
-                data = yaml.safe_load(f)
-                summaries.append(data["behavior_tree"]["name"])
-        return yaml_files, summaries
+            try:
+                name = compiled_trees.tree_name(os.path.join(self.folder_path, file))
+            except (OSError, BehaviorTreeSchemaError) as e:
+                print(f"Skipping behavior tree {file}: {str(e)}")
+                continue
+            listed_files.append(file)
+            summaries.append(name)
+        return listed_files, summaries
 
     def load_behavior_tree_from_yaml(self, yaml_path):
-        with open(yaml_path, "r") as file:
-            data = yaml.safe_load(file)
+        compiled = compiled_trees.load(yaml_path)
+        # Resolve every agent with one listing instead of a lookup per node
+        assistant_ids = api.resolve_assistant_ids(compiled.agent_names)
+        missing = [name for name, found in assistant_ids.items() if found is None]
+        if missing:
+            raise BehaviorTreeSchemaError(
+                f"Unknown agents in {yaml_path}: {', '.join(missing)}"
+            )
+
+        # Actions of the tree share one thread unless the policy is fresh
+        threads = ThreadLifecycle(
+            api,
+            policy=compiled.thread_policy,
+            token_budget=compiled.token_budget,
+            keep_messages=compiled.keep_messages,
+        )
+
+        # sandbox: true runs the tree in a sandbox of its own, a name shares one
+        sandbox = compiled.sandbox
+        if sandbox is True:
+            sandbox = f"{compiled.name}_{uuid.uuid4().hex[:8]}"
 
         def create_node(node_data):
             node_type = node_data["type"]
@@ -60,23 +105,38 @@ class BehaviorTreeManager:
                 for child_data in node_data.get("children", []):
                     child_node = create_node(child_data)
                     node.add_child(child_node)
+            elif node_type == "Parallel":
+                # Children tick together, so their assistant calls overlap.
+                # The node fails as soon as any child fails.
+                policy_name = node_data.get("policy", "SuccessOnAll")
+                if policy_name == "SuccessOnAll":
+                    policy = PARALLEL_POLICIES[policy_name](
+                        synchronise=node_data.get("synchronise", True)
+                    )
+                else:
+                    policy = PARALLEL_POLICIES[policy_name]()
+                node = py_trees.composites.Parallel(
+                    node_data.get("name", ""), policy=policy
+                )
+                for child_data in node_data.get("children", []):
+                    node.add_child(create_node(child_data))
             elif node_type == "Action":
                 node = create_assistant_action(
                     action_name=node_data["name"],
                     assistant_name=node_data["agent"],
                     assistant_instructions=node_data["instructions"],
+                    assistant_id=assistant_ids[node_data["agent"]],
+                    threads=threads if "thread_policy" not in node_data else None,
                 )
-            elif node_type == "Condition":
+                node.tree_name = compiled.name
+                node.sandbox = sandbox or None
+            else:
                 node = py_trees.behaviours.CheckBlackboardVariableExists(
                     name=node_data["name"], variable_name=node_data["name"]
                 )
-            else:
-                raise ValueError(f"Unknown node type: {node_type}")
             return node
 
-        root_data = data["behavior_tree"]["root"]
-        root = create_node(root_data)
-        return BehaviourTree(root)
+        return BehaviourTree(create_node(compiled.root))
 
     # def deploy_behavior_tree(
     #     self, yaml_path, deployment_name="Behavior Tree Deployment"
@@ -93,34 +153,57 @@ class BehaviorTreeManager:
                 deployment_name, parameters={"yaml_path": yaml_path}
             )
 
-        deploy_thread = threading.Thread(target=deploy_flow)
-        deploy_thread.start()
+        # Tracked by the pool so deployments show up next to the tree runs
+        runner_pool.track_deployment(deployment_name, deploy_flow, yaml_path=yaml_path)
 
         return f"Behavior tree: {deployment_name}, is deployed."
 
+    def run_behavior_tree(self, yaml_path, resume=True, **runner_kwargs):
+        """Load a tree and queue it on the runner pool, returns the run id."""
+        tree = self.load_behavior_tree_from_yaml(yaml_path)
+        # Resumes from the last completed node if a previous run did not finish
+        checkpoint = BehaviorTreeCheckpoint.for_yaml(yaml_path) if resume else None
+        runner = BehaviorTreeRunner(tree, checkpoint=checkpoint, **runner_kwargs)
+        name = compiled_trees.tree_name(yaml_path)
+        return runner_pool.submit(name, runner, yaml_path=yaml_path)
+
 
 @flow(log_prints=True)
 def run_btree(btree_runner):
-    while not btree_runner._stop_event.is_set():
-        btree_runner.tree.tick()
-        if btree_runner.tree.root.status == py_trees.common.Status.SUCCESS:
-            print("Behavior tree completed successfully.")
-            break
-        if btree_runner.tree.root.status == py_trees.common.Status.FAILURE:
-            print("Behavior tree failed.")
-            break
-        time.sleep(btree_runner.tick_interval)
+    # Claimed for the run, so concurrent runs of a tree do not share progress
+    with claim_checkpoint(btree_runner.checkpoint, btree_runner.tree) as checkpoint:
+        status = btree_runner.scheduler.run(
+            btree_runner.tree, stop_event=btree_runner._stop_event
+        )
+        # A finished tree starts from scratch next time
+        if status == py_trees.common.Status.SUCCESS and checkpoint is not None:
+            checkpoint.clear()
+    if status == py_trees.common.Status.SUCCESS:
+        print("Behavior tree completed successfully.")
+    if status == py_trees.common.Status.FAILURE:
+        print("Behavior tree failed.")
+    return status
 
 
 class BehaviorTreeRunner(threading.Thread):
-    def __init__(self, tree, tick_interval=30):
+    def __init__(self, tree, tick_interval=30, min_tick_interval=1, checkpoint=None):
         super().__init__()
         self.tree = tree
+        # Finished nodes are saved here, and skipped when a failed run is resumed.
+        # It is attached to the tree when the run starts.
+        self.checkpoint = checkpoint
+        # The tree is ticked when an action completes, or after an idle backoff
+        # growing from min_tick_interval up to tick_interval seconds
         self.tick_interval = tick_interval
+        self.scheduler = TickScheduler(
+            max_interval=tick_interval, min_interval=min_tick_interval
+        )
         self._stop_event = threading.Event()
 
     def run(self):
-        run_btree(self)
+        # Also called directly by the runner pool, which reports the status
+        return run_btree(self)
 
     def stop(self):
         self._stop_event.set()
+        action_completed.wake()
@@ -0,0 +1,122 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from playground.actions_manager import SingletonMeta
+
+BTREE_METRICS_DB = "btree_metrics.db"
+
+METRIC_FIELDS = (
+    "wall_time",
+    "queue_wait",
+    "run_time",
+    "tool_calls",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "retries",
+)
+
+
+class NodeMetricsStore(metaclass=SingletonMeta):
+    """
+    SQLite store of per-node behavior tree metrics.
+
+    Every finished action node records its wall time, the time it waited for a
+    worker, the assistant run time, the tool calls and tokens of the run and how
+    often the node was retried. Only the newest max_rows records are kept.
+    """
+
+    def __init__(self, db_path=BTREE_METRICS_DB, max_rows=10000):
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        with self.connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS node_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tree_name TEXT NOT NULL,
+                    node_name TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    finished_at REAL NOT NULL,
+                    wall_time REAL,
+                    queue_wait REAL,
+                    run_time REAL,
+                    tool_calls INTEGER,
+                    prompt_tokens INTEGER,
+                    completion_tokens INTEGER,
+                    total_tokens INTEGER,
+                    retries INTEGER,
+                    thread_id TEXT
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_node_runs_tree "
+                "ON node_runs (tree_name, node_name)"
+            )
+
+    @contextmanager
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, tree_name, node_name, status, thread_id=None, **metrics):
+        """Record one finished node run, metrics are keyword args of METRIC_FIELDS."""
+        unknown = set(metrics) - set(METRIC_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown node metrics: {', '.join(sorted(unknown))}")
+        values = [metrics.get(field) for field in METRIC_FIELDS]
+        with self._lock, self.connect() as conn:
+            conn.execute(
+                f"INSERT INTO node_runs (tree_name, node_name, status, finished_at, "
+                f"{', '.join(METRIC_FIELDS)}, thread_id) "
+                f"VALUES (?, ?, ?, ?, {', '.join('?' for _ in METRIC_FIELDS)}, ?)",
+                [tree_name, node_name, status, time.time(), *values, thread_id],
+            )
+            conn.execute(
+                "DELETE FROM node_runs WHERE id <= "
+                "(SELECT id FROM node_runs ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (self.max_rows,),
+            )
+
+    def summary(self, tree_name):
+        """Return per node aggregates of a tree as {node_name: {...}}."""
+        with self._lock, self.connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT node_name, COUNT(*),
+                    SUM(CASE WHEN status = 'SUCCESS' THEN 0 ELSE 1 END),
+                    AVG(wall_time), MAX(wall_time), AVG(queue_wait), AVG(run_time),
+                    AVG(tool_calls), AVG(total_tokens), SUM(total_tokens),
+                    SUM(retries)
+                FROM node_runs WHERE tree_name = ? GROUP BY node_name
+                """,
+                (tree_name,),
+            ).fetchall()
+        keys = (
+            "runs",
+            "failures",
+            "avg_wall_time",
+            "max_wall_time",
+            "avg_queue_wait",
+            "avg_run_time",
+            "avg_tool_calls",
+            "avg_tokens",
+            "total_tokens",
+            "retries",
+        )
+        return {row[0]: dict(zip(keys, row[1:])) for row in rows}
+
+    def clear(self, tree_name=None):
+        with self._lock, self.connect() as conn:
+            if tree_name is None:
+                conn.execute("DELETE FROM node_runs")
+            else:
+                conn.execute("DELETE FROM node_runs WHERE tree_name = ?", (tree_name,))
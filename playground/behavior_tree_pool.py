@@ -0,0 +1,230 @@
+import itertools
+import threading
+import time
+from collections import deque
+
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+CANCELLED = "CANCELLED"
+ERROR = "ERROR"
+DEPLOYED = "DEPLOYED"
+ACTIVE_STATUSES = (QUEUED, RUNNING, DEPLOYED)
+
+
+class AssistantCallLimiter:
+    """
+    Global limit on the assistant calls made by behavior tree actions.
+
+    Caps the number of calls in flight and, optionally, the number of calls
+    started in any sliding 60 second window. Use as a context manager around a
+    call; it blocks until the call is allowed.
+    """
+
+    def __init__(self, max_concurrent=None, calls_per_minute=None):
+        self._condition = threading.Condition()
+        self._active = 0
+        self._started = deque()  # start times of calls in the last minute
+        self.max_concurrent = max_concurrent
+        self.calls_per_minute = calls_per_minute
+
+    def configure(self, max_concurrent=None, calls_per_minute=None):
+        """Change the limits, None removes a limit."""
+        with self._condition:
+            self.max_concurrent = max_concurrent
+            self.calls_per_minute = calls_per_minute
+            self._condition.notify_all()
+
+    def acquire(self):
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                while self._started and now - self._started[0] >= 60:
+                    self._started.popleft()
+                wait = None
+                if self.max_concurrent and self._active >= self.max_concurrent:
+                    wait = 1
+                elif self.calls_per_minute and len(self._started) >= (
+                    self.calls_per_minute
+                ):
+                    wait = 60 - (now - self._started[0])
+                if wait is None:
+                    break
+                self._condition.wait(wait)
+            self._active += 1
+            self._started.append(now)
+
+    def release(self):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+# Shared by every tree, changed from the runner panel. The default matches the
+# workers that run the action nodes, so calls only wait there once it is lowered
+MAX_CONCURRENT_ASSISTANT_CALLS = 8
+assistant_calls = AssistantCallLimiter(max_concurrent=MAX_CONCURRENT_ASSISTANT_CALLS)
+
+
+class TreeRun:
+    def __init__(self, run_id, name, runner, yaml_path=None):
+        self.id = run_id
+        self.name = name
+        self.runner = runner
+        self.yaml_path = yaml_path
+        self.status = QUEUED
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+        self.thread = None
+
+    def to_dict(self):
+        end = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "name": self.name,
+            "yaml_path": self.yaml_path,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": end - self.started_at if self.started_at else None,
+        }
+
+
+class BehaviorTreePool:
+    """
+    Runs many behavior trees side by side, each under its own run id.
+
+    At most max_running trees tick at once, later submissions wait in the queue.
+    A runner is any object with a blocking run() returning the final tree status
+    and a stop() method, such as BehaviorTreeRunner.
+    """
+
+    def __init__(self, max_running=4, max_finished=50):
+        self.max_finished = max_finished
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(max_running)
+        self._runs = {}  # run id -> TreeRun, in submission order
+        self._ids = itertools.count(1)
+
+    def submit(self, name, runner, yaml_path=None):
+        """Queue a tree runner and return its run id."""
+        with self._lock:
+            run = TreeRun(str(next(self._ids)), name, runner, yaml_path)
+            self._runs[run.id] = run
+            self._prune()
+        run.thread = threading.Thread(
+            target=self._run, args=(run,), name=f"btree-run-{run.id}", daemon=True
+        )
+        run.thread.start()
+        return run.id
+
+    def track_deployment(self, name, target, yaml_path=None):
+        """Run a long lived deployment thread and list it with the tree runs.
+
+        Deployments do not take a run slot and cannot be cancelled. Returns the
+        existing run id if the same deployment is still active.
+        """
+        with self._lock:
+            for run in self._runs.values():
+                if run.name == name and run.status == DEPLOYED:
+                    return run.id
+            run = TreeRun(str(next(self._ids)), name, None, yaml_path)
+            run.status = DEPLOYED
+            run.started_at = time.time()
+            self._runs[run.id] = run
+
+        def deploy():
+            try:
+                target()
+            except Exception as e:
+                run.error = str(e)
+                print(f"Deployment {name} failed: {str(e)}")
+            finally:
+                run.status = ERROR if run.error else CANCELLED
+                run.finished_at = time.time()
+
+        run.thread = threading.Thread(
+            target=deploy, name=f"btree-deploy-{run.id}", daemon=True
+        )
+        run.thread.start()
+        return run.id
+
+    def _run(self, run):
+        with self._slots:
+            with self._lock:
+                if run.cancel_requested:
+                    return
+                run.status = RUNNING
+                run.started_at = time.time()
+            try:
+                status = run.runner.run()
+                status = getattr(status, "value", status)  # py_trees Status
+                run.status = CANCELLED if run.cancel_requested else str(status)
+            except Exception as e:
+                print(f"Behavior tree run {run.id} failed: {str(e)}")
+                run.error = str(e)
+                run.status = ERROR
+            finally:
+                run.finished_at = time.time()
+
+    def cancel(self, run_id):
+        """Cancel a queued or running tree, returns False if it is not active."""
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None or run.status not in (QUEUED, RUNNING):
+                return False
+            run.cancel_requested = True
+            if run.status == QUEUED:
+                run.status = CANCELLED
+                run.finished_at = time.time()
+                return True
+        run.runner.stop()
+        return True
+
+    def cancel_all(self):
+        for run in self.list_runs(active_only=True):
+            self.cancel(run["id"])
+
+    def get(self, run_id):
+        with self._lock:
+            run = self._runs.get(run_id)
+            return run.to_dict() if run is not None else None
+
+    def list_runs(self, active_only=False):
+        """Return the runs as dicts, oldest first."""
+        with self._lock:
+            runs = list(self._runs.values())
+        return [
+            run.to_dict()
+            for run in runs
+            if not active_only or run.status in ACTIVE_STATUSES
+        ]
+
+    def wait(self, run_id, timeout=None):
+        """Wait for a run to finish, returns its final status dict."""
+        with self._lock:
+            run = self._runs.get(run_id)
+        if run is None:
+            return None
+        run.thread.join(timeout)
+        return run.to_dict()
+
+    def _prune(self):
+        finished = [
+            run_id
+            for run_id, run in self._runs.items()
+            if run.status not in ACTIVE_STATUSES
+        ]
+        for run_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._runs[run_id]
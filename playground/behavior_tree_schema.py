@@ -0,0 +1,157 @@
+import hashlib
+import os
+import threading
+
+import yaml
+
+from playground.thread_lifecycle import FRESH, THREAD_POLICIES
+
+NODE_TYPES = ("Sequence", "Selector", "Parallel", "Action", "Condition")
+COMPOSITE_TYPES = ("Sequence", "Selector", "Parallel")
+PARALLEL_POLICY_NAMES = ("SuccessOnAll", "SuccessOnOne")
+
+
+class BehaviorTreeSchemaError(ValueError):
+    """Raised when a behavior tree YAML does not match the expected schema."""
+
+
+def validate_behavior_tree(data):
+    """Check a parsed behavior tree YAML, raising BehaviorTreeSchemaError if invalid.
+
+    Runs before any node is created, so a broken tree fails without API calls.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("behavior_tree"), dict):
+        raise BehaviorTreeSchemaError("Missing top level 'behavior_tree' mapping.")
+    behavior_tree = data["behavior_tree"]
+    if not isinstance(behavior_tree.get("name"), str):
+        raise BehaviorTreeSchemaError("behavior_tree: 'name' must be a string.")
+    if "root" not in behavior_tree:
+        raise BehaviorTreeSchemaError("behavior_tree: missing 'root' node.")
+    policy = behavior_tree.get("thread_policy", FRESH)
+    if policy not in THREAD_POLICIES:
+        raise BehaviorTreeSchemaError(
+            f"behavior_tree: unknown thread_policy {policy!r}."
+        )
+    for field in ("token_budget", "keep_messages"):
+        value = behavior_tree.get(field)
+        if value is not None and (not isinstance(value, int) or value <= 0):
+            raise BehaviorTreeSchemaError(
+                f"behavior_tree: '{field}' must be a positive integer."
+            )
+    sandbox = behavior_tree.get("sandbox", False)
+    if not isinstance(sandbox, (bool, str)) or sandbox == "":
+        raise BehaviorTreeSchemaError(
+            "behavior_tree: 'sandbox' must be a boolean or a sandbox name."
+        )
+    validate_node(behavior_tree["root"], "root")
+
+
+def validate_node(node_data, path):
+    if not isinstance(node_data, dict):
+        raise BehaviorTreeSchemaError(f"{path}: a node must be a mapping.")
+    node_type = node_data.get("type")
+    if node_type not in NODE_TYPES:
+        raise BehaviorTreeSchemaError(f"{path}: unknown node type {node_type!r}.")
+    if node_type in COMPOSITE_TYPES:
+        children = node_data.get("children", [])
+        if not isinstance(children, list):
+            raise BehaviorTreeSchemaError(f"{path}: 'children' must be a list.")
+        policy = node_data.get("policy", "SuccessOnAll")
+        if node_type == "Parallel" and policy not in PARALLEL_POLICY_NAMES:
+            raise BehaviorTreeSchemaError(
+                f"{path}: unknown parallel policy {policy!r}."
+            )
+        for index, child_data in enumerate(children):
+            validate_node(child_data, f"{path}.children[{index}]")
+        return
+    required = ("name", "agent", "instructions") if node_type == "Action" else ("name",)
+    # Actions can opt out of the tree's shared thread, nothing else
+    if node_data.get("thread_policy", FRESH) != FRESH:
+        raise BehaviorTreeSchemaError(
+            f"{path}: a node thread_policy can only be 'fresh'."
+        )
+    for field in required:
+        if not isinstance(node_data.get(field), str) or not node_data[field]:
+            raise BehaviorTreeSchemaError(
+                f"{path}: {node_type} node needs a '{field}' string."
+            )
+
+
+def iter_nodes(node_data):
+    """Yield a node and all of its descendants, depth first."""
+    yield node_data
+    for child_data in node_data.get("children", []):
+        yield from iter_nodes(child_data)
+
+
+class CompiledTree:
+    """A validated behavior tree definition, ready to be built without parsing."""
+
+    def __init__(self, path, file_hash, data):
+        self.path = path
+        self.file_hash = file_hash
+        self.name = data["behavior_tree"]["name"]
+        self.root = data["behavior_tree"]["root"]
+        self.thread_policy = data["behavior_tree"].get("thread_policy", FRESH)
+        self.token_budget = data["behavior_tree"].get("token_budget", 8000)
+        self.keep_messages = data["behavior_tree"].get("keep_messages", 10)
+        self.sandbox = data["behavior_tree"].get("sandbox", False)
+        self.agent_names = sorted(
+            {node["agent"] for node in iter_nodes(self.root) if node.get("agent")}
+        )
+
+
+class CompiledTreeCache:
+    """
+    Process wide cache of compiled behavior tree YAML files.
+
+    Trees are keyed by the hash of the file contents, so an edited file is parsed
+    and validated again. Tree names for folder listings are keyed by the file's
+    mtime and size and never re-read the file while it is unchanged.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trees = {}  # path -> CompiledTree
+        self._names = {}  # path -> (mtime_ns, size, name)
+
+    def load(self, yaml_path):
+        """Return the compiled tree of a YAML file, parsing it only if it changed."""
+        path = os.path.abspath(yaml_path)
+        with open(path, "rb") as f:
+            contents = f.read()
+        file_hash = hashlib.sha256(contents).hexdigest()
+        with self._lock:
+            compiled = self._trees.get(path)
+        if compiled is not None and compiled.file_hash == file_hash:
+            return compiled
+        try:
+            data = yaml.safe_load(contents)
+        except yaml.YAMLError as e:
+            raise BehaviorTreeSchemaError(f"Invalid YAML in {yaml_path}: {e}") from e
+        validate_behavior_tree(data)
+        compiled = CompiledTree(path, file_hash, data)
+        with self._lock:
+            self._trees[path] = compiled
+        return compiled
+
+    def tree_name(self, yaml_path):
+        """Return the behavior tree name of a YAML file."""
+        path = os.path.abspath(yaml_path)
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._names.get(path)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            return entry[2]
+        name = self.load(path).name
+        with self._lock:
+            self._names[path] = (stat.st_mtime_ns, stat.st_size, name)
+        return name
+
+    def clear(self):
+        with self._lock:
+            self._trees = {}
+            self._names = {}
+
+
+compiled_trees = CompiledTreeCache()
@@ -1,7 +1,119 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from prefect import flow
 import py_trees
 
 from playground.assistants_api import api
+from playground.behavior_tree_metrics import NodeMetricsStore
+from playground.behavior_tree_pool import assistant_calls
+from playground.retry_policy import RetryPolicy
+from playground.sandbox_manager import current_sandbox
+from playground.thread_lifecycle import ThreadLifecycle
+
+# Action nodes run their assistant calls here so tree ticks never block
+ACTION_WORKERS = 8
+action_executor = ThreadPoolExecutor(
+    max_workers=ACTION_WORKERS, thread_name_prefix="btree-action"
+)
+action_retry_policy = RetryPolicy()
+
+
+class ActionCompletionSignal:
+    """Wakes tree schedulers up as soon as a running action node completes."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._count = 0
+        self._seen = threading.local()
+
+    def count(self):
+        with self._condition:
+            return self._count
+
+    def notify(self):
+        with self._condition:
+            self._count += 1
+            self._condition.notify_all()
+
+    def wake(self):
+        """Wake all waiters without recording a completion, e.g. to stop a runner."""
+        with self._condition:
+            self._condition.notify_all()
+
+    def wait(self, since, timeout, stop_event=None):
+        """Wait until an action completes after `since` or the timeout passes.
+
+        Returns True if an action completed.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: (
+                    self._count != since
+                    or (stop_event is not None and stop_event.is_set())
+                ),
+                timeout=timeout,
+            )
+            return self._count != since
+
+    def wait_next(self, timeout):
+        """Wait for a completion this thread has not seen yet, or the timeout.
+
+        A thread's first call cannot tell which completions happened during the
+        tick before it, so it returns at once if any action ever completed: an
+        extra tick is cheap, missing a completion costs the whole timeout.
+        """
+        seen = getattr(self._seen, "count", 0)
+        with self._condition:
+            self._condition.wait_for(lambda: self._count != seen, timeout=timeout)
+            self._seen.count = self._count
+            return self._count != seen
+
+
+action_completed = ActionCompletionSignal()
+
+
+def wait_for_next_tick(timeout):
+    """
+    Drop-in replacement for a fixed sleep between ticks in tree scripts.
+
+    Returns as soon as an action completes, or after timeout seconds. Completions
+    are tracked per thread, so one finishing during the last tick is not missed.
+    """
+    return action_completed.wait_next(timeout)
+
+
+class TickScheduler:
+    """
+    Ticks a tree whenever one of its actions completes.
+
+    While nothing completes it falls back to an idle backoff that doubles from
+    min_interval up to max_interval seconds.
+    """
+
+    def __init__(self, max_interval=30, min_interval=1):
+        self.max_interval = max_interval
+        self.min_interval = min_interval
+
+    def run(self, tree, stop_event=None):
+        """Tick the tree until it succeeds, fails or stop_event is set."""
+        backoff = self.min_interval
+        while stop_event is None or not stop_event.is_set():
+            seen = action_completed.count()
+            tree.tick()
+            status = tree.root.status
+            if status in (
+                py_trees.common.Status.SUCCESS,
+                py_trees.common.Status.FAILURE,
+            ):
+                return status
+            started = time.monotonic()
+            if action_completed.wait(seen, backoff, stop_event):
+                backoff = self.min_interval
+            elif time.monotonic() - started >= backoff:
+                backoff = min(backoff * 2, self.max_interval)
+        return tree.root.status
 
 
 # Define the FunctionWrapper class
@@ -15,7 +127,7 @@ class FunctionWrapper:
         return self.function(*self.args, **self.kwargs)
 
 
-def create_task(action):
+def create_task(action, run_count):
     @flow(name=action.name, description=action.assistant_name, log_prints=True)
     def init_wrapper():
         print(f"Initializing task: {action.name}")
@@ -27,7 +139,7 @@ def create_task(action):
         # action.thread.start()
 
         # action.thread.join()
-        action.long_running_process()
+        action.long_running_process(run_count)
 
     return init_wrapper
 
@@ -43,6 +155,24 @@ class ActionWrapper(py_trees.behaviour.Behaviour):
         self.function_wrapper = function_wrapper
         self.is_condition = is_condition
         self.run_context = None
+        self.future = None
+        self.run_count = 0
+        self.result = None
+        # Set by BehaviorTreeCheckpoint.attach when the run is checkpointed
+        self.checkpoint = None
+        self.checkpoint_key = None
+        # ThreadLifecycle of the node's runs, restored when a run is resumed
+        self.thread_lifecycle = None
+        # Metrics of the node are recorded under the tree name
+        self.tree_name = ""
+        self.start_count = 0
+        # Transient errors raised by the assistant call are retried with backoff
+        self.retry_policy = action_retry_policy
+        self.call_retries = 0
+        self.submitted_at = None
+        # Environment actions of the node run in this sandbox, None is the shared
+        # base environment
+        self.sandbox = current_sandbox.get()
 
     def setup(self):
         # This is called once at the beginning to setup any necessary state or resources
@@ -50,7 +180,18 @@ class ActionWrapper(py_trees.behaviour.Behaviour):
         return py_trees.common.Status.SUCCESS
 
     def initialise(self):
-        create_task(self)()
+        if self.resume_from_checkpoint():
+            return
+        # Run the assistant call on the worker pool, update() reports RUNNING meanwhile
+        self.run_count += 1
+        self.start_count += 1
+        self.call_retries = 0
+        self.thread_running = True
+        self.thread_success = False
+        self.result = None
+        self.submitted_at = time.monotonic()
+        # The run is identified when it is queued, it may start after a restart
+        self.future = action_executor.submit(create_task(self, self.run_count))
         # # This is called once each time the behavior is started
         # print("%s.initialise()" % self.name)
         # self.thread_running = True
@@ -58,25 +199,112 @@ class ActionWrapper(py_trees.behaviour.Behaviour):
         # self.thread = threading.Thread(target=self.long_running_process)
         # self.thread.start()
 
-    def long_running_process(self):
+    def resume_from_checkpoint(self):
+        """Skip the assistant call if the node succeeded in a previous run."""
+        if self.checkpoint is None or self.is_condition:
+            return False
+        entry = self.checkpoint.take_resumed(self.checkpoint_key)
+        if entry is None:
+            return False
+        print("%s: Resumed from checkpoint, skipping." % self.name)
+        self.result = entry["result"]
+        self.thread_running = False
+        self.thread_success = True
+        return True
+
+    def long_running_process(self, run_count):
+        success = False
+        result = None
+        started = time.monotonic()
+        call_started = []
+        call_finished = None
+        sandbox_token = current_sandbox.set(self.sandbox)
         try:
             print("%s: Thread started, running process..." % self.name)
-            result = self.function_wrapper()
+
+            def call():
+                # Shared by every running tree, see behavior_tree_pool
+                with assistant_calls:
+                    call_started.append(time.monotonic())
+                    return self.function_wrapper()
+
+            result = self.retry_policy.call(call, on_retry=self.count_retry)
+            call_finished = time.monotonic()
             print(result)
             if "FAILURE" in result["text"]:
                 print("%s: Thread completed with failure." % self.name)
                 return
 
             if self.is_condition:
-                self.thread_success = "SUCCESS" in result["text"]
+                success = "SUCCESS" in result["text"]
             else:
-                self.thread_success = True
+                success = True
 
             print("%s: Thread completed successfully." % self.name)
         except Exception as e:
             print("%s: Exception in thread: %s" % (self.name, str(e)))
         finally:
-            self.thread_running = False
+            current_sandbox.reset(sandbox_token)
+            # Ignore results of runs that were interrupted and restarted meanwhile
+            if run_count == self.run_count:
+                self.result = result
+                self.thread_success = success
+                self.thread_running = False
+                self.save_checkpoint(success, result)
+                self.save_metrics(
+                    success,
+                    result,
+                    started,
+                    call_started[0] if call_started else None,
+                    call_finished,
+                )
+                # Restarts are counted per completed run, not for the node's life
+                self.start_count = 0
+                action_completed.notify()
+
+    def count_retry(self, attempt, error, delay):
+        self.call_retries += 1
+
+    def save_metrics(self, success, result, started, call_started, call_finished):
+        finished = time.monotonic()
+        submitted = self.submitted_at or started
+        message = result if isinstance(result, dict) else {}
+        usage = message.get("usage") or {}
+        # Node restarts, retried calls and runs retried inside the API
+        retries = (
+            self.start_count - 1 + self.call_retries + message.get("attempts", 1) - 1
+        )
+        try:
+            NodeMetricsStore().record(
+                self.tree_name,
+                self.name,
+                "SUCCESS" if success else "FAILURE",
+                thread_id=message.get("thread_id"),
+                wall_time=finished - submitted,
+                # Time spent waiting for a worker and the assistant call limiter
+                queue_wait=(call_started or finished) - submitted,
+                run_time=(call_finished or finished) - (call_started or finished),
+                tool_calls=message.get("tool_calls"),
+                prompt_tokens=usage.get("prompt_tokens"),
+                completion_tokens=usage.get("completion_tokens"),
+                total_tokens=usage.get("total_tokens"),
+                retries=retries,
+            )
+        except Exception as e:
+            print("%s: Unable to save metrics: %s" % (self.name, str(e)))
+
+    def save_checkpoint(self, success, result):
+        if self.checkpoint is None:
+            return
+        try:
+            self.checkpoint.record(
+                self.checkpoint_key,
+                "SUCCESS" if success else "FAILURE",
+                result=result,
+                thread_id=result.get("thread_id") if isinstance(result, dict) else None,
+            )
+        except Exception as e:
+            print("%s: Unable to save checkpoint: %s" % (self.name, str(e)))
 
     def update(self):
         # This is called every tick to update the status of the behavior
@@ -93,23 +321,36 @@ class ActionWrapper(py_trees.behaviour.Behaviour):
     def terminate(self, new_status):
         # This is called once each time the behavior terminates
         print("%s.terminate(%s)" % (self.name, new_status))
-        if self.thread is not None:
-            self.thread.join()
+        if new_status == py_trees.common.Status.INVALID:
+            # Interrupted by a parent, a still running call is left to finish
+            # in the background and its result is ignored
+            self.run_count += 1
+        self.future = None
         self.thread = None
         self.thread_running = False
         self.thread_success = False
 
 
-def create_assistant_action(action_name, assistant_name, assistant_instructions):
-    assistant = api.get_assistant_by_name(assistant_name)
-    function_wrapper = FunctionWrapper(
-        api.call_assistant, assistant.id, assistant_instructions
-    )
-    return ActionWrapper(
+def create_assistant_action(
+    action_name,
+    assistant_name,
+    assistant_instructions,
+    assistant_id=None,
+    threads=None,
+):
+    if assistant_id is None:
+        assistant_id = api.get_assistant_by_name(assistant_name).id
+    # threads is a ThreadLifecycle deciding which thread each run goes to,
+    # without one every run starts a new thread
+    call = threads.call if threads is not None else api.call_assistant
+    function_wrapper = FunctionWrapper(call, assistant_id, assistant_instructions)
+    action = ActionWrapper(
         name=action_name,
         assistant_name=assistant_name,
         function_wrapper=function_wrapper,
     )
+    action.thread_lifecycle = threads
+    return action
 
 
 def create_assistant_condition(condition_name, assistant_name, assistant_instructions):
@@ -125,12 +366,21 @@ def create_assistant_condition(condition_name, assistant_name, assistant_instruc
     )
 
 
+def thread_function_wrapper(thread, assistant_id, assistant_instructions):
+    # A ThreadLifecycle bounds the history that builds up on the shared thread
+    if isinstance(thread, ThreadLifecycle):
+        return FunctionWrapper(thread.call, assistant_id, assistant_instructions)
+    return FunctionWrapper(
+        api.call_assistant_with_thread, thread, assistant_id, assistant_instructions
+    )
+
+
 def create_assistant_action_on_thread(
     thread, action_name, assistant_name, assistant_instructions
 ):
     assistant = api.get_assistant_by_name(assistant_name)
-    function_wrapper = FunctionWrapper(
-        api.call_assistant_with_thread, thread, assistant.id, assistant_instructions
+    function_wrapper = thread_function_wrapper(
+        thread, assistant.id, assistant_instructions
     )
     return ActionWrapper(
         name=action_name,
@@ -143,8 +393,8 @@ def create_assistant_condition_on_thread(
     thread, condition_name, assistant_name, assistant_instructions
 ):
     assistant = api.get_assistant_by_name(assistant_name)
-    function_wrapper = FunctionWrapper(
-        api.call_assistant_with_thread, thread, assistant.id, assistant_instructions
+    function_wrapper = thread_function_wrapper(
+        thread, assistant.id, assistant_instructions
     )
     return ActionWrapper(
         name=condition_name,
@@ -1,7 +1,12 @@
 import os
+from html import escape as html_escape
+
 import yaml
 import gradio as gr
-from playground.behavior_tree_manager import BehaviorTreeManager, BehaviorTreeRunner
+from playground.behavior_tree_manager import BehaviorTreeManager, runner_pool
+from playground.behavior_tree_metrics import NodeMetricsStore
+from playground.behavior_tree_pool import DEPLOYED, assistant_calls
+from playground.behavior_tree_schema import BehaviorTreeSchemaError
 
 
 def get_html_tree(tree):
@@ -121,6 +126,20 @@ def get_html_tree(tree):
                     padding: 10px;
                 }}
 
+                .tree li span.node .metrics {{
+                    display: block;
+                    margin-top: 4px;
+                    font-size: calc(var(--font-size) * 0.75);
+                    font-weight: normal;
+                }}
+
+                .tree li span.node .metrics-bar {{
+                    display: block;
+                    height: 4px;
+                    margin-top: 3px;
+                    background: #e74c3c;
+                }}
+
                 .tree li span.node:hover, .tree li span.node:hover+ul li span.node {{
                     background: #94a8b7;
                     color: white;
@@ -136,8 +155,39 @@ def get_html_tree(tree):
     return base_html_tree
 
 
-def convert_to_html(node):
+def format_node_metrics(node_metrics, slowest):
+    """Timing overlay of a node: average wall time, tokens and run count."""
+    wall_time = node_metrics["avg_wall_time"] or 0
+    parts = [f"{wall_time:.1f}s"]
+    if node_metrics["avg_tokens"]:
+        parts.append(f"{node_metrics['avg_tokens']:.0f} tok")
+    parts.append(f"{node_metrics['runs']} runs")
+    title = (
+        f"wall {wall_time:.1f}s (max {node_metrics['max_wall_time'] or 0:.1f}s), "
+        f"queue {node_metrics['avg_queue_wait'] or 0:.1f}s, "
+        f"assistant {node_metrics['avg_run_time'] or 0:.1f}s, "
+        f"tool calls {node_metrics['avg_tool_calls'] or 0:.1f}, "
+        f"tokens {node_metrics['total_tokens'] or 0}, "
+        f"failures {node_metrics['failures']}, retries {node_metrics['retries'] or 0}"
+    )
+    width = 100 * wall_time / slowest if slowest else 0
+    return (
+        f'<small class="metrics" title="{html_escape(title)}">'
+        f"{' · '.join(parts)}</small>"
+        f'<span class="metrics-bar" style="width: {width:.0f}%"></span>'
+    )
+
+
+def convert_to_html(node, metrics=None):
     html = ""
+    metrics = metrics or {}
+    slowest = max(
+        (node_metrics["avg_wall_time"] or 0 for node_metrics in metrics.values()),
+        default=0,
+    )
+    overlay = ""
+    if node.get("name") in metrics:
+        overlay = format_node_metrics(metrics[node["name"]], slowest)
 
     # Determine the type of node and its corresponding HTML class and symbol
     if node["type"] == "Selector":
@@ -149,47 +199,65 @@ def convert_to_html(node):
     elif node["type"] == "Decorator":
         html += '<span class="node decorator" data-symbol="◇">◇</span>'
     elif node["type"] == "Action":
-        html += f'<span class="node action">{node["name"]}</span>'
+        html += f'<span class="node action">{node["name"]}{overlay}</span>'
     elif node["type"] == "Condition":
-        html += f'<span class="node condition">{node["name"]}</span>'
+        html += f'<span class="node condition">{node["name"]}{overlay}</span>'
 
     # If the node has children, process them recursively
     if "children" in node and node["children"]:
         html += "<ul>"
         for child in node["children"]:
-            html += "<li>" + convert_to_html(child) + "</li>"
+            html += "<li>" + convert_to_html(child, metrics) + "</li>"
         html += "</ul>"
 
     return html
 
 
-def yaml_to_html_tree(yaml_tree):
+def yaml_to_html_tree(yaml_tree, show_metrics=True):
     tree = yaml.safe_load(yaml_tree)
     root = tree["behavior_tree"]["root"]
+    # Overlay the recorded timings of previous runs on the action nodes
+    metrics = None
+    if show_metrics:
+        metrics = NodeMetricsStore().summary(tree["behavior_tree"].get("name", ""))
     html = '<div class="tree"><ul><li>'
-    html += convert_to_html(root)
+    html += convert_to_html(root, metrics)
     html += "</li></ul></div>"
     return get_html_tree(html)
 
 
-# Global variable to store the current thread running the behavior tree
-current_tree_runner = None
-
-
 def run_selected_behavior_tree(yaml_file_path):
-    global current_tree_runner
-    if current_tree_runner and current_tree_runner.is_alive():
-        current_tree_runner.stop()
-        current_tree_runner.join()
-
     manager = BehaviorTreeManager(os.path.dirname(yaml_file_path))
-    tree = manager.load_behavior_tree_from_yaml(yaml_file_path)
-    current_tree_runner = BehaviorTreeRunner(tree)
-    current_tree_runner.start()
-    return (
-        "Behavior tree is running.",
-        gr.update(visible=True),
-        gr.update(visible=False),
+    try:
+        run_id = manager.run_behavior_tree(yaml_file_path)
+    except BehaviorTreeSchemaError as e:
+        return f"Invalid behavior tree: {str(e)}", list_tree_runs()
+    return f"Behavior tree is queued as run {run_id}.", list_tree_runs()
+
+
+def list_tree_runs():
+    rows = []
+    for run in runner_pool.list_runs():
+        duration = run["duration"]
+        rows.append(
+            [
+                run["id"],
+                run["name"],
+                run["status"],
+                f"{duration:.0f}s" if duration is not None else "",
+                run["error"] or "",
+            ]
+        )
+    return gr.update(value=rows or None)
+
+
+def active_run_choices():
+    return gr.update(
+        choices=[
+            (f"{run['id']}: {run['name']}", run["id"])
+            for run in runner_pool.list_runs(active_only=True)
+            if run["status"] != DEPLOYED
+        ]
     )
 
 
@@ -216,17 +284,25 @@ def deploy_btree(yaml_file_path):
     return manager.deploy_behavior_tree(yaml_file_path)
 
 
-def cancel_behavior_tree():
-    global current_tree_runner
-    if current_tree_runner and current_tree_runner.is_alive():
-        current_tree_runner.stop()
-        current_tree_runner.join()
-        return (
-            "Behavior tree execution cancelled.",
-            gr.update(visible=False),
-            gr.update(visible=True),
-        )
-    return "No behavior tree is running."
+def cancel_behavior_tree(run_id):
+    if not run_id:
+        return "Select a run to cancel.", list_tree_runs()
+    if runner_pool.cancel(run_id):
+        return f"Behavior tree run {run_id} cancelled.", list_tree_runs()
+    return f"Run {run_id} is not running.", list_tree_runs()
+
+
+def configure_assistant_calls(max_concurrent, calls_per_minute):
+    # 0 or an empty field removes the limit
+    max_concurrent = int(max_concurrent) if max_concurrent else None
+    calls_per_minute = int(calls_per_minute) if calls_per_minute else None
+    assistant_calls.configure(
+        max_concurrent=max_concurrent, calls_per_minute=calls_per_minute
+    )
+    return (
+        f"Assistant calls limited to {max_concurrent or 'unlimited'} at once "
+        f"and {calls_per_minute or 'unlimited'} per minute."
+    )
 
 
 def btree_runner_panel():
@@ -243,13 +319,39 @@ def btree_runner_panel():
                 html_tree = gr.HTML(label="Behavior Tree")
 
         with gr.Row():
-            run_button = gr.Button("Run", visible=True)
-            cancel_button = gr.Button("Cancel", visible=False)
+            run_button = gr.Button("Run")
             save_button = gr.Button("Save YAML")
             deploy_button = gr.Button("Deploy")
 
         status_box = gr.Textbox(label="Status", interactive=False)
 
+        runs_table = gr.Dataframe(
+            headers=["Run", "Tree", "Status", "Duration", "Error"],
+            label="Behavior Tree Runs",
+            interactive=False,
+        )
+        with gr.Row():
+            run_select = gr.Dropdown(label="Active Runs", choices=[], scale=4)
+            cancel_button = gr.Button("Cancel Run", scale=1)
+        with gr.Accordion("Assistant Call Limits", open=False):
+            with gr.Row():
+                max_concurrent_calls = gr.Number(
+                    label="Max Concurrent Calls (0 = unlimited)",
+                    value=assistant_calls.max_concurrent or 0,
+                    precision=0,
+                    minimum=0,
+                )
+                calls_per_minute = gr.Number(
+                    label="Calls Per Minute (0 = unlimited)",
+                    value=assistant_calls.calls_per_minute or 0,
+                    precision=0,
+                    minimum=0,
+                )
+                limits_button = gr.Button("Apply Limits")
+        runs_timer = gr.Timer(2)
+        runs_timer.tick(list_tree_runs, outputs=runs_table)
+        runs_timer.tick(active_run_choices, outputs=run_select)
+
         yaml_file.change(
             display_yaml, inputs=yaml_file, outputs=[yaml_code_block, html_tree]
         )
@@ -259,10 +361,15 @@ def btree_runner_panel():
         run_button.click(
             run_selected_behavior_tree,
             inputs=yaml_file,
-            outputs=[status_box, cancel_button, run_button],
+            outputs=[status_box, runs_table],
         )
         cancel_button.click(
-            cancel_behavior_tree, outputs=[status_box, cancel_button, run_button]
+            cancel_behavior_tree, inputs=run_select, outputs=[status_box, runs_table]
+        )
+        limits_button.click(
+            configure_assistant_calls,
+            inputs=[max_concurrent_calls, calls_per_minute],
+            outputs=status_box,
         )
         save_button.click(
             save_yaml, inputs=[yaml_code_block, yaml_file], outputs=status_box
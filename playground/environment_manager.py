@@ -1,18 +1,52 @@
+import glob
+import hashlib
+import json
 import os
+import signal
 import subprocess
 import sys
-from datetime import datetime
 import time
-import pyautogui
+from datetime import datetime
+
+from playground.actions_manager import action_cancelled
+from playground.interpreter_pool import InterpreterPool
+from playground.process_output import ProcessOutput
+from playground.resource_limits import ResourceLimits, execution_stats
+
+# Written into the venv after installing the requirements
+REQUIREMENTS_FINGERPRINT = ".requirements_fingerprint.json"
 
 
 class EnvironmentManager:
-    def __init__(self, base_path="environments", env_name="env"):
+    def __init__(
+        self, base_path="environments", env_name="env", code_timeout=None, limits=None
+    ):
         self.base_path = base_path
         self.env_name = env_name
         self.env_path = os.path.join(self.base_path, self.env_name)
+        # Default wall clock limit in seconds for run_code, None waits forever
+        self.code_timeout = code_timeout
+        # Default ResourceLimits of code and shell executions
+        self.limits = limits or ResourceLimits()
         self.ensure_directories()
 
+    @staticmethod
+    def python_executable_of(env_path):
+        return (
+            os.path.join(env_path, "Scripts", "python")
+            if os.name == "nt"
+            else os.path.join(env_path, "bin", "python")
+        )
+
+    @property
+    def python_executable(self):
+        return self.python_executable_of(self.env_path)
+
+    @property
+    def interpreters(self):
+        # Shared by every manager of the venv, managers are created per action call
+        return InterpreterPool.for_executable(self.python_executable)
+
     def ensure_directories(self):
         if not os.path.exists(self.base_path):
             os.makedirs(self.base_path)
@@ -23,29 +57,109 @@ class EnvironmentManager:
         subprocess.check_call([sys.executable, "-m", "venv", self.env_path])
         print(f"Created virtual environment at {self.env_path}")
 
-    def install_requirements(self, requirements_file="code_env_requirements.txt"):
-        pip_executable = (
-            os.path.join(self.env_path, "Scripts", "pip")
-            if os.name == "nt"
-            else os.path.join(self.env_path, "bin", "pip")
+    @property
+    def pip_command(self):
+        # Through the interpreter, the binary pip launchers of cloned sandboxes
+        # on Windows still point at the venv they were cloned from
+        return [self.python_executable, "-m", "pip"]
+
+    @property
+    def fingerprint_path(self):
+        return os.path.join(self.env_path, REQUIREMENTS_FINGERPRINT)
+
+    def installed_packages_hash(self):
+        """Hash of the installed distributions, from the names of their metadata.
+
+        The names carry the versions, so this catches installs, upgrades and
+        removals without running pip.
+        """
+        patterns = [
+            os.path.join("Lib", "site-packages", "*.dist-info"),
+            os.path.join("lib", "python*", "site-packages", "*.dist-info"),
+        ]
+        names = sorted(
+            os.path.basename(path)
+            for pattern in patterns
+            for path in glob.glob(os.path.join(self.env_path, pattern))
         )
-        subprocess.check_call([pip_executable, "install", "-r", requirements_file])
+        return hashlib.sha256("\n".join(names).encode("utf-8")).hexdigest()
+
+    def requirements_fingerprint(self, requirements_file):
+        with open(requirements_file, "rb") as f:
+            requirements_hash = hashlib.sha256(f.read()).hexdigest()
+        return {
+            "requirements_hash": requirements_hash,
+            "packages_hash": self.installed_packages_hash(),
+        }
+
+    def load_fingerprint(self):
+        try:
+            with open(self.fingerprint_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_fingerprint(self, fingerprint):
+        with open(self.fingerprint_path, "w", encoding="utf-8") as f:
+            json.dump(fingerprint, f, indent=2)
+
+    def install_requirements(
+        self,
+        requirements_file="code_env_requirements.txt",
+        wheelhouse=None,
+        force=False,
+    ):
+        """
+        Install the requirements into the venv unless they are already installed.
+
+        pip is skipped when the requirements file and the installed packages match
+        the fingerprint of the last install. wheelhouse, or the CODE_ENV_WHEELHOUSE
+        environment variable, installs offline from a folder of wheels (see
+        download_wheelhouse). Returns True if pip ran.
+        """
+        fingerprint = self.requirements_fingerprint(requirements_file)
+        if not force and self.load_fingerprint() == fingerprint:
+            print(f"Packages from {requirements_file} are up to date.")
+            return False
+
+        command = [*self.pip_command, "install", "-r", requirements_file]
+        wheelhouse = wheelhouse or os.getenv("CODE_ENV_WHEELHOUSE")
+        if wheelhouse:
+            command += ["--no-index", "--find-links", wheelhouse]
+        subprocess.check_call(command)
         print(f"Installed packages from {requirements_file}")
 
-    def install_package(self, package):
-        pip_executable = (
-            os.path.join(self.env_path, "Scripts", "pip")
-            if os.name == "nt"
-            else os.path.join(self.env_path, "bin", "pip")
+        fingerprint["packages_hash"] = self.installed_packages_hash()
+        self.save_fingerprint(fingerprint)
+        return True
+
+    def download_wheelhouse(
+        self, wheelhouse, requirements_file="code_env_requirements.txt"
+    ):
+        """Download the wheels of the requirements, for offline installs elsewhere."""
+        subprocess.check_call(
+            [*self.pip_command, "download", "-r", requirements_file, "-d", wheelhouse]
         )
-        subprocess.check_call([pip_executable, "install", package])
+        print(f"Downloaded packages from {requirements_file} to {wheelhouse}")
+
+    def install_package(self, package):
+        subprocess.check_call([*self.pip_command, "install", package])
         print(f"Installed package: {package}")
 
+        # An extra package does not make the requirements stale
+        fingerprint = self.load_fingerprint()
+        if fingerprint is not None:
+            fingerprint["packages_hash"] = self.installed_packages_hash()
+            self.save_fingerprint(fingerprint)
+
     def capture_screenshot(self, filename):
+        # Only needed when screenshots are asked for, and needs a display
+        import pyautogui
+
         screenshot = pyautogui.screenshot()
         screenshot.save(filename)
 
-    def run_app_file(self, filename):
+    def run_app_file(self, filename, startup_wait=10):
         """
         Execute the specified Python web application file in a virtual environment.
 
@@ -61,36 +175,23 @@ class EnvironmentManager:
             raise ValueError("Filename must be provided")
 
         filepath = os.path.join(self.env_path, filename)
-        python_executable = (
-            os.path.join(self.env_path, "Scripts", "python")
-            if os.name == "nt"
-            else os.path.join(self.env_path, "bin", "python")
-        )
 
         try:
-            process = subprocess.Popen(
-                [python_executable, filepath],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-            )
-
-            # Allow the process to run for a few seconds to capture initial output
-            time.sleep(10)
-
-            # Check if process has terminated
-            return_code = process.poll()
-            if return_code is not None:
-                # Process terminated, capture output and errors
-                initial_output, initial_errors = process.communicate()
-            else:
+            process = self.interpreters.start(filepath, cwd=self.env_path)
+
+            # Give the app up to startup_wait seconds to fail on start up
+            try:
+                process.wait(timeout=startup_wait)
+            except subprocess.TimeoutExpired:
                 return "Process appears to be running correctly", ""
 
+            # Process terminated, capture output and errors
+            initial_output, initial_errors = process.communicate()
             return initial_output, initial_errors
         except Exception as e:
             return "", str(e)
 
-    def run_code(self, code, filename=None):
+    def write_code_file(self, code, filename=None):
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"code_{timestamp}.py"
@@ -100,40 +201,71 @@ class EnvironmentManager:
             # Write the code to a file
             with open(filepath, "w") as f:
                 f.write(code)
+        return filepath
 
-        python_executable = (
-            os.path.join(self.env_path, "Scripts", "python")
-            if os.name == "nt"
-            else os.path.join(self.env_path, "bin", "python")
-        )
+    def stream_code(self, code, filename=None, timeout=None, limits=None):
+        """
+        Start Python code on a warm interpreter and return its ProcessOutput.
 
-        # Start the subprocess
-        process = subprocess.Popen(
-            [python_executable, filepath],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
+        Iterate it for (stream_name, text) chunks as they are produced, then
+        read its stdout, stderr, reason and resource usage.
+        """
+        limits = limits or self.limits
+        # Runs in the venv folder, so relative paths of parallel sandboxes differ
+        process = self.interpreters.start(
+            self.write_code_file(code, filename),
+            cwd=self.env_path,
+            rlimits=limits.rlimits(),
         )
+        return self.process_output(process, timeout, limits)
+
+    def run_code(
+        self,
+        code,
+        filename=None,
+        timeout=None,
+        screenshots=False,
+        on_output=None,
+        limits=None,
+        return_stats=False,
+    ):
+        """
+        Run Python code in the virtual environment on a warm interpreter.
 
-        # Allow some time for the Pygame window to open
-        time.sleep(2)
+        timeout falls back to the wall clock limit of limits, then to
+        code_timeout. screenshots captures the screen 2 seconds in, if the code
+        still runs, and at the end, e.g. for pygame apps. on_output(stream_name,
+        text) receives output as it is produced. return_stats adds the
+        execution_stats of the run to the returned tuple.
+        """
+        limits = limits or self.limits
+        output = self.stream_code(code, filename, timeout, limits)
 
-        # Capture the initial screenshot
-        self.capture_screenshot("initial_screenshot.png")
+        if screenshots:
+            # Allow some time for a Pygame window to open, polling through the
+            # output so the resource usage of the process is kept
+            deadline = time.monotonic() + 2
+            while output.poll() is None and time.monotonic() < deadline:
+                time.sleep(0.1)
+            if output.poll() is None:
+                self.capture_screenshot("initial_screenshot.png")
 
-        # Wait for the process to complete
-        stdout, stderr = process.communicate()
+        output.wait(on_output)
+        stats = execution_stats(output, limits)
+        stdout, stderr = output.stdout, output.stderr + self.stop_message(output, stats)
 
-        # Capture the final screenshot
-        self.capture_screenshot("final_screenshot.png")
+        if screenshots:
+            self.capture_screenshot("final_screenshot.png")
 
         # Return the results
         if (stderr is None or stderr == "") and (stdout is None or stdout == ""):
-            return "The process appears to have run successfully.", ""
-        return stdout, stderr
+            stdout, stderr = "The process appears to have run successfully.", ""
+        return (stdout, stderr, stats) if return_stats else (stdout, stderr)
 
-    def run_shell_command(self, command):
-        activate_script = (
+    def stream_shell_command(self, command, timeout=None, limits=None):
+        """Start a shell command in the virtual environment, see stream_code."""
+        limits = limits or self.limits
+        activate_script = os.path.abspath(
             os.path.join(self.env_path, "Scripts", "activate")
             if os.name == "nt"
             else os.path.join(self.env_path, "bin", "activate")
@@ -141,17 +273,57 @@ class EnvironmentManager:
         if os.name == "nt":
             command = f'cmd /c "{activate_script} & {command}"'
         else:
+            ulimit_command = limits.ulimit_command()
+            if ulimit_command:
+                command = f"{ulimit_command} && {command}"
             command = f'/bin/bash -c "source {activate_script} && {command}"'
 
-        result = subprocess.run(
+        process = subprocess.Popen(
             command,
             shell=True,
-            capture_output=True,
+            cwd=self.env_path,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
+            # A group of its own, so a timeout kills what the shell started too
+            start_new_session=os.name != "nt",
         )
-        # print(f"Output: {result.stdout}")
-        # print(f"Errors: {result.stderr}")
-        return result.stdout, result.stderr
+        return self.process_output(process, timeout, limits, kill_group=os.name != "nt")
+
+    def run_shell_command(
+        self, command, timeout=None, on_output=None, limits=None, return_stats=False
+    ):
+        limits = limits or self.limits
+        output = self.stream_shell_command(command, timeout, limits).wait(on_output)
+        stats = execution_stats(output, limits)
+        stdout, stderr = output.stdout, output.stderr + self.stop_message(output, stats)
+        return (stdout, stderr, stats) if return_stats else (stdout, stderr)
+
+    def process_output(self, process, timeout=None, limits=None, kill_group=False):
+        kill = None
+        if kill_group:
+
+            def kill():
+                os.killpg(process.pid, signal.SIGKILL)
+
+        if timeout is None:
+            timeout = (limits or self.limits).wall_seconds or self.code_timeout
+        # Killed when the timeout passes or the dispatcher cancels the action
+        return ProcessOutput(
+            process, timeout=timeout, cancelled=action_cancelled, kill=kill
+        )
+
+    @staticmethod
+    def stop_message(output, stats):
+        if output.reason == "timeout":
+            return f"\nProcess killed after the {output.timeout}s timeout."
+        if output.reason == "cancelled":
+            return "\nProcess killed, the action was cancelled."
+        if stats["exit_reason"] == "cpu_limit":
+            return f"\nProcess killed after {stats['cpu_time']}s of CPU time."
+        if stats["exit_reason"] == "memory_limit":
+            return "\nProcess ran out of its memory limit."
+        return ""
 
 
 # def main():
@@ -0,0 +1,159 @@
+import atexit
+import json
+import os
+import subprocess
+import threading
+
+# Runs in a pre-started interpreter: waits for the path of a script, the working
+# folder and the rlimits as JSON on stdin, then runs it as __main__ the way
+# `python path` would
+WORKER_SCRIPT = """
+import json, os, runpy, sys, traceback
+for module in sys.argv[1:]:
+    try:
+        __import__(module)
+    except Exception:
+        pass
+path = sys.stdin.readline().strip()
+cwd = sys.stdin.readline().strip()
+rlimits = json.loads(sys.stdin.readline().strip() or "{}")
+sys.stdin.close()
+if not path:
+    sys.exit(0)
+if cwd:
+    os.chdir(cwd)
+if rlimits:
+    import resource
+    for name, (soft, hard) in rlimits.items():
+        if name == "RLIMIT_CPU":
+            # The time spent waiting and preloading does not count
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            used = int(usage.ru_utime + usage.ru_stime) + 1
+            soft, hard = soft + used, hard + used
+        limit = getattr(resource, name)
+        current_hard = resource.getrlimit(limit)[1]
+        if current_hard != resource.RLIM_INFINITY:
+            soft, hard = min(soft, current_hard), min(hard, current_hard)
+        resource.setrlimit(limit, (soft, hard))
+sys.argv = [path]
+sys.path[0] = os.path.dirname(os.path.abspath(path))
+try:
+    runpy.run_path(path, run_name="__main__")
+except Exception:
+    exc_type, exc, tb = sys.exc_info()
+    # Hide the frames of this worker and runpy from the traceback
+    while tb is not None and tb.tb_frame.f_code.co_filename != path:
+        tb = tb.tb_next
+    traceback.print_exception(exc_type, exc, tb)
+    sys.exit(1)
+"""
+
+
+class InterpreterPool:
+    """
+    Keeps interpreters of a venv started ahead of time to run scripts in.
+
+    Each worker runs a single script and exits, so runs stay as isolated as a
+    fresh `python script.py`. The interpreter start up is paid in the background
+    while the pool refills, not on the request path. preload names modules that
+    workers import while they wait, e.g. heavy libraries most snippets use.
+    """
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, python_executable, size=2, preload=()):
+        self.python_executable = python_executable
+        self.size = size
+        self.preload = tuple(preload)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._closed = False
+        self.refill()
+
+    @classmethod
+    def for_executable(cls, python_executable, **kwargs):
+        """Return the shared pool of an interpreter, creating it on first use."""
+        with cls._pools_lock:
+            pool = cls._pools.get(python_executable)
+            if pool is None:
+                pool = cls(python_executable, **kwargs)
+                cls._pools[python_executable] = pool
+            return pool
+
+    def spawn(self):
+        return subprocess.Popen(
+            [self.python_executable, "-u", "-c", WORKER_SCRIPT, *self.preload],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+
+    def refill(self):
+        """Start workers until size of them are idle."""
+        with self._lock:
+            self._idle = [worker for worker in self._idle if worker.poll() is None]
+            missing = 0 if self._closed else self.size - len(self._idle)
+        for _ in range(missing):
+            try:
+                worker = self.spawn()
+            except OSError as e:
+                print(f"Unable to start interpreter worker: {str(e)}")
+                return
+            with self._lock:
+                self._idle.append(worker)
+
+    def refill_in_background(self):
+        threading.Thread(target=self.refill, daemon=True).start()
+
+    def start(self, path, cwd=None, rlimits=None):
+        """Run a script on a warm worker and return its process.
+
+        The script runs in cwd, by default the current working folder, under
+        rlimits, a dict of rlimit names to (soft, hard) limits.
+        """
+        worker = None
+        with self._lock:
+            while self._idle and worker is None:
+                candidate = self._idle.pop(0)
+                if candidate.poll() is None:
+                    worker = candidate
+        if worker is None:
+            worker = self.spawn()  # pool is drained, start one cold
+        self.refill_in_background()
+        worker.stdin.write(
+            f"{os.path.abspath(path)}\n{os.path.abspath(cwd or os.getcwd())}\n"
+            f"{json.dumps(rlimits or {})}\n"
+        )
+        worker.stdin.close()
+        # The script gets no stdin, and communicate() must not flush the closed pipe
+        worker.stdin = None
+        return worker
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.kill()
+            worker.wait()
+
+    @classmethod
+    def close_for(cls, python_executable):
+        """Close the pool of an interpreter, e.g. before removing its venv."""
+        with cls._pools_lock:
+            pool = cls._pools.pop(python_executable, None)
+        if pool is not None:
+            pool.close()
+
+    @classmethod
+    def close_all(cls):
+        with cls._pools_lock:
+            pools = list(cls._pools.values())
+            cls._pools = {}
+        for pool in pools:
+            pool.close()
+
+
+atexit.register(InterpreterPool.close_all)
@@ -31,3 +31,25 @@ def get_llm_client():
         )
 
     return client
+
+
+def get_async_llm_client():
+    api_type = os.getenv("API_TYPE")
+
+    if api_type == "azure":
+        from openai import AsyncAzureOpenAI
+
+        client = AsyncAzureOpenAI(
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+            api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+        )
+    else:
+        # openai, or no api type set
+        from openai import AsyncOpenAI
+
+        client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+        )
+
+    return client
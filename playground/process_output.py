@@ -0,0 +1,281 @@
+import codecs
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+# Bytes read from a pipe at a time, output is streamed in chunks of at most this
+CHUNK_SIZE = 4096
+# Characters kept from the start and the end of a stream, the middle is dropped
+HEAD_CHARS = 16000
+TAIL_CHARS = 16000
+# Seconds to wait for the pipes to close once the process is gone
+PIPE_GRACE = 1
+# Seconds between samples of the memory used by the process and its children
+MEMORY_SAMPLE_INTERVAL = 0.05
+
+
+def process_tree(pid):
+    """Return the pid and the pids of its descendants, as far as /proc lists them."""
+    pids = [pid]
+    for parent in pids:
+        try:
+            with open(f"/proc/{parent}/task/{parent}/children") as f:
+                pids.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            pass  # gone meanwhile, or not Linux
+    return pids
+
+
+def read_peak_rss(pid):
+    """Return the peak resident memory in bytes of a live process, or None."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class OutputBuffer:
+    """
+    Keeps the head and the tail of a stream of text in bounded memory.
+
+    The first head_chars characters and the last tail_chars characters are kept,
+    everything in between is counted and dropped, e.g. the middle of a build log.
+    """
+
+    def __init__(self, head_chars=HEAD_CHARS, tail_chars=TAIL_CHARS):
+        self.head_chars = head_chars
+        self.tail_chars = tail_chars
+        self.head = []
+        self.head_size = 0
+        self.tail = deque()
+        self.tail_size = 0
+        self.dropped = 0
+
+    def append(self, text):
+        if self.head_size < self.head_chars:
+            part = text[: self.head_chars - self.head_size]
+            self.head.append(part)
+            self.head_size += len(part)
+            text = text[len(part) :]
+        if not text:
+            return
+        self.tail.append(text)
+        self.tail_size += len(text)
+        while self.tail_size > self.tail_chars:
+            extra = self.tail_size - self.tail_chars
+            oldest = self.tail[0]
+            if len(oldest) <= extra:
+                self.tail.popleft()
+                removed = len(oldest)
+            else:
+                self.tail[0] = oldest[extra:]
+                removed = extra
+            self.tail_size -= removed
+            self.dropped += removed
+
+    @property
+    def truncated(self):
+        return self.dropped > 0
+
+    def text(self):
+        head = "".join(self.head)
+        tail = "".join(self.tail)
+        if not self.dropped:
+            return head + tail
+        return f"{head}\n... [{self.dropped} characters truncated] ...\n{tail}"
+
+
+class ProcessOutput:
+    """
+    Streams the stdout and stderr of a process as it arrives.
+
+    Iterating yields (stream_name, text) chunks until the process exits. The
+    process is killed once timeout seconds pass or cancelled() returns True.
+    Afterwards stdout and stderr hold the output, truncated to its head and
+    tail, reason is "exit", "timeout" or "cancelled" and wall_time, cpu_time
+    and peak_rss hold what the process used.
+
+    peak_rss is the largest VmHWM of the process and its descendants, sampled
+    from /proc while it runs. The ru_maxrss of wait4 is no use here, on Linux
+    it keeps the high-water mark of the server the process was spawned from.
+    A process that exits before the first sample, or a platform without /proc,
+    reports None, and memory used just before exiting may go unseen.
+    """
+
+    def __init__(
+        self,
+        process,
+        timeout=None,
+        cancelled=None,
+        head_chars=HEAD_CHARS,
+        tail_chars=TAIL_CHARS,
+        kill=None,
+    ):
+        self.process = process
+        self.timeout = timeout
+        self.cancelled = cancelled
+        # Called to stop the process, e.g. to kill its whole process group
+        self.kill = kill or process.kill
+        self.buffers = {
+            "stdout": OutputBuffer(head_chars, tail_chars),
+            "stderr": OutputBuffer(head_chars, tail_chars),
+        }
+        self.reason = None
+        # Accounting of the process, cpu_time and peak_rss are None where the
+        # platform does not report the resource usage of a child
+        self.started_at = time.monotonic()
+        self.wall_time = None
+        self.cpu_time = None
+        self.peak_rss = None  # bytes
+        self._sampled_at = None
+        self._chunks = queue.Queue()
+        self._started = False
+
+    @property
+    def stdout(self):
+        return self.buffers["stdout"].text()
+
+    @property
+    def stderr(self):
+        return self.buffers["stderr"].text()
+
+    @property
+    def returncode(self):
+        return self.process.returncode
+
+    def read(self, stream_name, pipe):
+        # Read raw chunks rather than lines, so output without newlines such as
+        # progress bars streams too and a huge line is never held whole
+        raw = getattr(pipe, "buffer", pipe)
+        decoder = codecs.getincrementaldecoder(getattr(pipe, "encoding", "utf-8"))(
+            errors="replace"
+        )
+        try:
+            while True:
+                data = raw.read1(CHUNK_SIZE)
+                text = decoder.decode(data, final=not data)
+                if text:
+                    self._chunks.put((stream_name, text))
+                if not data:
+                    break
+        except (OSError, ValueError):
+            pass  # the pipe was closed under us
+        finally:
+            pipe.close()
+            self._chunks.put((stream_name, None))
+
+    def __iter__(self):
+        if self._started:
+            raise RuntimeError("The output of a process can only be streamed once.")
+        self._started = True
+        open_streams = set()
+        for stream_name in ("stdout", "stderr"):
+            pipe = getattr(self.process, stream_name)
+            if pipe is not None:
+                open_streams.add(stream_name)
+                threading.Thread(
+                    target=self.read, args=(stream_name, pipe), daemon=True
+                ).start()
+
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        finished_at = None
+        self.sample_memory()
+        while open_streams:
+            try:
+                stream_name, text = self._chunks.get(timeout=MEMORY_SAMPLE_INTERVAL)
+            except queue.Empty:
+                stream_name, text = None, None
+            if finished_at is None:
+                self.sample_memory()
+                if self.poll() is not None:
+                    finished_at = time.monotonic()
+                elif self.should_stop(deadline):
+                    try:
+                        self.kill()
+                    except ProcessLookupError:
+                        pass  # exited meanwhile
+                    finished_at = time.monotonic()
+            elif time.monotonic() - finished_at > PIPE_GRACE and (
+                stream_name is None or self.reason is not None
+            ):
+                # Children of the process may still hold the pipes open
+                break
+            if stream_name is None:
+                continue
+            if text is None:
+                open_streams.discard(stream_name)
+                continue
+            self.buffers[stream_name].append(text)
+            yield stream_name, text
+        self.poll(block=True)
+        self.wall_time = time.monotonic() - self.started_at
+        if self.reason is None:
+            self.reason = "exit"
+
+    def poll(self, block=False):
+        """Return the exit code or None, reaping the process with its usage."""
+        if self.process.returncode is not None or not hasattr(os, "wait4"):
+            return self.process.wait() if block else self.process.poll()
+        try:
+            pid, status, usage = os.wait4(self.process.pid, 0 if block else os.WNOHANG)
+        except ChildProcessError:
+            return self.process.poll()  # reaped elsewhere
+        if pid == 0:
+            return None
+        self.cpu_time = usage.ru_utime + usage.ru_stime
+        self.process.returncode = os.waitstatus_to_exitcode(status)
+        return self.process.returncode
+
+    def sample_memory(self):
+        """Raise peak_rss to the current peak of the process tree, if it grew."""
+        now = time.monotonic()
+        if (
+            self._sampled_at is not None
+            and now - self._sampled_at < MEMORY_SAMPLE_INTERVAL
+        ):
+            return
+        self._sampled_at = now
+        for pid in process_tree(self.process.pid):
+            peak = read_peak_rss(pid)
+            if peak is not None and (self.peak_rss is None or peak > self.peak_rss):
+                self.peak_rss = peak
+
+    def should_stop(self, deadline):
+        if deadline is not None and time.monotonic() >= deadline:
+            self.reason = "timeout"
+        elif self.cancelled is not None and self.cancelled():
+            self.reason = "cancelled"
+        return self.reason is not None
+
+    def wait(self, on_output=None):
+        """Consume the output, calling on_output(stream_name, text) per chunk."""
+        for stream_name, text in self:
+            if on_output is not None:
+                on_output(stream_name, text)
+        return self
+
+
+def collect_output(
+    process,
+    timeout=None,
+    on_output=None,
+    cancelled=None,
+    head_chars=HEAD_CHARS,
+    tail_chars=TAIL_CHARS,
+):
+    """Read the output of a process as it arrives until it exits.
+
+    on_output(stream_name, text) is called for every chunk of stdout or stderr.
+    The process is killed once timeout seconds pass or cancelled() returns True.
+    Returns (stdout, stderr, returncode, reason) where reason is "exit",
+    "timeout" or "cancelled".
+    """
+    output = ProcessOutput(process, timeout, cancelled, head_chars, tail_chars)
+    output.wait(on_output)
+    return output.stdout, output.stderr, output.returncode, output.reason
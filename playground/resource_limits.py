@@ -0,0 +1,111 @@
+import signal
+
+try:
+    import resource
+except ImportError:  # Windows, only the wall clock limit applies
+    resource = None
+
+# Exit reasons reported besides the "exit", "timeout" and "cancelled" of a run
+CPU_LIMIT = "cpu_limit"
+MEMORY_LIMIT = "memory_limit"
+SIGNAL = "signal"
+
+# ulimit flag and unit in bytes of each rlimit, for limits applied by a shell
+ULIMIT_FLAGS = {
+    "RLIMIT_CPU": ("-t", 1),
+    "RLIMIT_DATA": ("-d", 1024),
+    "RLIMIT_NOFILE": ("-n", 1),
+}
+
+
+class ResourceLimits:
+    """
+    Limits of a single code or shell execution, None leaves a limit unset.
+
+    cpu_seconds, memory_mb and open_files are rlimits of the process, so under a
+    shell they apply to every command it starts rather than to all of them
+    together. wall_seconds is enforced by killing the process.
+
+    memory_mb limits the data segment (RLIMIT_DATA) rather than the address
+    space, which node, the JVM and go reserve far beyond what they use. On
+    macOS the data segment limit does not cover mmap, so it barely applies.
+    """
+
+    def __init__(
+        self, cpu_seconds=None, memory_mb=None, open_files=None, wall_seconds=None
+    ):
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.open_files = open_files
+        self.wall_seconds = wall_seconds
+
+    def rlimits(self):
+        """Return {rlimit name: (soft, hard)}, empty where rlimits are missing."""
+        if resource is None:
+            return {}
+        rlimits = {}
+        if self.cpu_seconds:
+            # SIGXCPU at the soft limit, SIGKILL a second later if it is ignored
+            rlimits["RLIMIT_CPU"] = (self.cpu_seconds, self.cpu_seconds + 1)
+        if self.memory_mb:
+            memory = self.memory_mb * 1024 * 1024
+            rlimits["RLIMIT_DATA"] = (memory, memory)
+        if self.open_files:
+            rlimits["RLIMIT_NOFILE"] = (self.open_files, self.open_files)
+        return rlimits
+
+    def ulimit_command(self):
+        """Return a bash command applying the limits, e.g. before a command.
+
+        Limits are applied by the shell rather than in a preexec_fn, which is
+        not safe to run in the child of a process with threads.
+        """
+        commands = []
+        for name, (soft, hard) in clamp_rlimits(self.rlimits()).items():
+            flag, unit = ULIMIT_FLAGS[name]
+            # Without -S or -H both limits are set, then the soft one is lowered
+            commands.append(f"ulimit {flag} {hard // unit}")
+            if soft != hard:
+                commands.append(f"ulimit -S {flag} {soft // unit}")
+        return " && ".join(commands)
+
+    def exit_reason(self, output):
+        """Name why the process of a ProcessOutput ended, e.g. cpu_limit."""
+        if output.reason != "exit":
+            return output.reason
+        returncode = output.returncode
+        if returncode is not None and returncode < 0:
+            over_cpu = (
+                self.cpu_seconds is not None
+                and (output.cpu_time or 0) >= self.cpu_seconds
+            )
+            if -returncode == getattr(signal, "SIGXCPU", None) or over_cpu:
+                return CPU_LIMIT
+            return SIGNAL
+        if self.memory_mb and returncode and "MemoryError" in output.stderr:
+            return MEMORY_LIMIT
+        return "exit"
+
+
+def clamp_rlimits(rlimits):
+    """Lower rlimits to the hard limits of the current process they would exceed."""
+    clamped = {}
+    for name, (soft, hard) in rlimits.items():
+        _, current_hard = resource.getrlimit(getattr(resource, name))
+        if current_hard != resource.RLIM_INFINITY:
+            soft, hard = min(soft, current_hard), min(hard, current_hard)
+        clamped[name] = (soft, hard)
+    return clamped
+
+
+def execution_stats(output, limits=None):
+    """Measured cost of a finished ProcessOutput, reported with its output."""
+    return {
+        "exit_reason": (limits or ResourceLimits()).exit_reason(output),
+        "returncode": output.returncode,
+        "wall_time": round(output.wall_time, 3),
+        "cpu_time": None if output.cpu_time is None else round(output.cpu_time, 3),
+        "peak_rss_mb": (
+            None if output.peak_rss is None else round(output.peak_rss / 2**20, 1)
+        ),
+    }
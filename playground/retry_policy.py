@@ -0,0 +1,106 @@
+import random
+import time
+
+# HTTP status codes worth another attempt: timeouts, conflicts, rate limits
+RETRYABLE_STATUS_CODES = (408, 409, 429)
+# Error classes of the openai client that are transient, matched by name so this
+# module does not depend on the client
+RETRYABLE_ERROR_NAMES = (
+    "APIConnectionError",
+    "APITimeoutError",
+    "RateLimitError",
+    "InternalServerError",
+)
+# last_error codes of failed assistant runs that are transient
+RETRYABLE_RUN_ERROR_CODES = ("rate_limit_exceeded", "server_error")
+
+
+class TransientRunError(Exception):
+    """An assistant run failed for a reason that may go away on a retry."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_retryable_error(error):
+    """Classify an exception raised by an assistant call as transient or not."""
+    if isinstance(error, (TransientRunError, TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    status_code = getattr(error, "status_code", None)
+    if isinstance(status_code, int):
+        return status_code in RETRYABLE_STATUS_CODES or status_code >= 500
+    return False
+
+
+def retry_after_seconds(error):
+    """Return the server's requested wait in seconds, or None if it sent none."""
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        return float(retry_after)
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass  # e.g. an HTTP date, fall back to the backoff
+    return None
+
+
+class RetryPolicy:
+    """
+    Retries transient failures with exponential backoff and jitter.
+
+    The delay doubles from base_delay up to max_delay and a random half of it
+    is jittered away so concurrent callers do not retry in lockstep. A
+    retry-after sent by the server is respected instead, up to max_retry_after.
+    """
+
+    def __init__(
+        self,
+        max_attempts=4,
+        base_delay=1.0,
+        max_delay=30.0,
+        max_retry_after=60.0,
+        is_retryable=is_retryable_error,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.is_retryable = is_retryable
+
+    def should_retry(self, error, attempt):
+        return attempt < self.max_attempts and self.is_retryable(error)
+
+    def delay(self, attempt, error=None):
+        """Seconds to wait before the attempt after `attempt` (counting from 1)."""
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def call(self, function, *args, on_retry=None, **kwargs):
+        """Call function, retrying transient errors, and return its result.
+
+        on_retry(attempt, error, delay) is called before every wait.
+        """
+        attempt = 1
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                if not self.should_retry(e, attempt):
+                    raise
+                delay = self.delay(attempt, e)
+                if on_retry is not None:
+                    on_retry(attempt, e, delay)
+                print(f"Attempt {attempt} failed: {str(e)}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
@@ -0,0 +1,239 @@
+import contextvars
+import os
+import re
+import shutil
+import stat
+import threading
+import time
+from contextlib import contextmanager
+
+from playground.actions_manager import SingletonMeta
+from playground.environment_manager import EnvironmentManager
+from playground.global_values import GlobalValues
+from playground.interpreter_pool import InterpreterPool
+
+SANDBOX_PREFIX = "sandbox_"
+LAST_USED_MARKER = ".last_used"
+# Folders that make up a venv, user files in the base venv are not cloned
+VENV_FOLDERS = ("bin", "Scripts", "lib", "Lib", "lib64", "include", "Include")
+SCRIPT_FOLDERS = ("bin", "Scripts")
+
+# Name of the sandbox the environment actions of this context run in, None is the
+# shared base environment. Set per behavior tree run, or per chat session.
+current_sandbox = contextvars.ContextVar("current_sandbox", default=None)
+
+
+def clone_venv(source, target):
+    """
+    Clone a venv cheaply by hard linking its package files.
+
+    Launcher scripts and activate scripts embed the absolute venv path, so they
+    are copied with the path rewritten. Files are hard linked only where they are
+    replaced rather than edited in place (pip removes and rewrites files), and
+    copied when the file system does not support hard links.
+    """
+    source = os.path.abspath(source)
+    target = os.path.abspath(target)
+    staging = f"{target}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for root, dirs, files in os.walk(source):
+        relative = os.path.relpath(root, source)
+        target_root = os.path.join(staging, relative) if relative != "." else staging
+        top = relative.split(os.sep)[0]
+        if relative == ".":
+            dirs[:] = [name for name in dirs if name in VENV_FOLDERS]
+            files = [name for name in files if name == "pyvenv.cfg"]
+        for name in list(dirs):
+            source_dir = os.path.join(root, name)
+            if os.path.islink(source_dir):
+                os.symlink(os.readlink(source_dir), os.path.join(target_root, name))
+                dirs.remove(name)
+            else:
+                os.makedirs(os.path.join(target_root, name), exist_ok=True)
+        for name in files:
+            source_file = os.path.join(root, name)
+            target_file = os.path.join(target_root, name)
+            if os.path.islink(source_file):
+                os.symlink(os.readlink(source_file), target_file)
+            elif top in SCRIPT_FOLDERS or relative == ".":
+                copy_with_venv_path(source_file, target_file, source, target)
+            else:
+                try:
+                    os.link(source_file, target_file)
+                except OSError:
+                    shutil.copy2(source_file, target_file)
+    os.replace(staging, target)
+
+
+def copy_with_venv_path(source_file, target_file, source, target):
+    with open(source_file, "rb") as f:
+        contents = f.read()
+    # Binary launchers are copied as they are
+    if b"\0" not in contents:
+        contents = contents.replace(source.encode(), target.encode())
+    with open(target_file, "wb") as f:
+        f.write(contents)
+    shutil.copymode(source_file, target_file)
+
+
+def own_disk_usage(path):
+    """Bytes used by the files of a folder that are not hard linked elsewhere."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                info = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            if stat.S_ISREG(info.st_mode) and info.st_nlink == 1:
+                total += info.st_size
+    return total
+
+
+class SandboxManager(metaclass=SingletonMeta):
+    """
+    Isolated copies of the base code environment, one per session or tree run.
+
+    Sandboxes are cloned from the base venv on first use, so they start with its
+    packages without a venv build or pip install. Idle sandboxes are evicted
+    least recently used first once there are more than max_sandboxes of them or
+    they use more than disk_quota_mb of their own disk space.
+    """
+
+    def __init__(
+        self,
+        base_path="environments",
+        base_env="env",
+        max_sandboxes=8,
+        disk_quota_mb=2048,
+    ):
+        self.base_path = base_path
+        self.base_env = base_env
+        self.max_sandboxes = max_sandboxes
+        self.disk_quota_mb = disk_quota_mb
+        self._lock = threading.RLock()
+        self._in_use = {}  # sandbox name -> active users
+
+    def sandbox_path(self, name):
+        return os.path.join(self.base_path, self.env_name(name))
+
+    @staticmethod
+    def env_name(name):
+        return SANDBOX_PREFIX + re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+    def acquire(self, name):
+        """Return the EnvironmentManager of a sandbox, cloning it if needed."""
+        with self._lock:
+            path = self.sandbox_path(name)
+            created = not os.path.exists(path)
+            if created:
+                base = EnvironmentManager(self.base_path, self.base_env)
+                started = time.monotonic()
+                clone_venv(base.env_path, path)
+                print(
+                    f"Cloned sandbox {name} from {base.env_path} "
+                    f"in {time.monotonic() - started:.2f}s"
+                )
+            self._in_use[name] = self._in_use.get(name, 0) + 1
+            self.touch(name)
+            if created:
+                # Walking the sandboxes for their disk usage is not free
+                self.evict()
+        return EnvironmentManager(self.base_path, self.env_name(name))
+
+    def release(self, name):
+        with self._lock:
+            self._in_use[name] -= 1
+            if self._in_use[name] <= 0:
+                del self._in_use[name]
+            self.touch(name)
+
+    @contextmanager
+    def use(self, name):
+        env_manager = self.acquire(name)
+        try:
+            yield env_manager
+        finally:
+            self.release(name)
+
+    def touch(self, name):
+        marker = os.path.join(self.sandbox_path(name), LAST_USED_MARKER)
+        with open(marker, "a"):
+            pass
+        os.utime(marker)
+
+    def list_sandboxes(self, with_usage=True):
+        """Return the sandboxes as dicts, least recently used first."""
+        sandboxes = []
+        if not os.path.isdir(self.base_path):
+            return sandboxes
+        for env_name in os.listdir(self.base_path):
+            path = os.path.join(self.base_path, env_name)
+            if not env_name.startswith(SANDBOX_PREFIX) or env_name.endswith(".tmp"):
+                continue
+            name = env_name[len(SANDBOX_PREFIX) :]
+            marker = os.path.join(path, LAST_USED_MARKER)
+            try:
+                last_used = os.path.getmtime(marker)
+            except OSError:
+                last_used = 0
+            sandboxes.append(
+                {
+                    "name": name,
+                    "path": path,
+                    "last_used": last_used,
+                    "disk_usage": own_disk_usage(path) if with_usage else None,
+                    "in_use": self._in_use.get(name, 0),
+                }
+            )
+        return sorted(sandboxes, key=lambda sandbox: sandbox["last_used"])
+
+    def evict(self):
+        """Remove idle sandboxes, oldest first, until the limits are met."""
+        with self._lock:
+            quota = self.disk_quota_mb * 1024 * 1024 if self.disk_quota_mb else None
+            sandboxes = self.list_sandboxes(with_usage=quota is not None)
+            count = len(sandboxes)
+            usage = sum(sandbox["disk_usage"] or 0 for sandbox in sandboxes)
+            for sandbox in sandboxes:
+                over_count = self.max_sandboxes and count > self.max_sandboxes
+                over_quota = quota is not None and usage > quota
+                if not over_count and not over_quota:
+                    break
+                if sandbox["in_use"]:
+                    continue
+                self.remove(sandbox["name"])
+                count -= 1
+                usage -= sandbox["disk_usage"] or 0
+
+    def remove(self, name):
+        with self._lock:
+            if self._in_use.get(name):
+                raise RuntimeError(f"Sandbox {name} is in use.")
+            path = self.sandbox_path(name)
+            InterpreterPool.close_for(EnvironmentManager.python_executable_of(path))
+            shutil.rmtree(path, ignore_errors=True)
+            print(f"Removed sandbox {name}")
+
+
+@contextmanager
+def current_environment():
+    """Yield the EnvironmentManager of the current sandbox, or the base one."""
+    name = current_sandbox.get()
+    if name is None:
+        yield EnvironmentManager()
+        return
+    with SandboxManager().use(name) as env_manager:
+        yield env_manager
+
+
+@contextmanager
+def current_code_folder():
+    """Yield the folder code files go to, the current sandbox if there is one."""
+    name = current_sandbox.get()
+    if name is None:
+        yield GlobalValues.CODING_ENVIRONMENT_FOLDER
+        return
+    with SandboxManager().use(name) as env_manager:
+        yield env_manager.env_path
@@ -0,0 +1,104 @@
+import threading
+
+# Thread policies of behavior tree action nodes
+FRESH = "fresh"  # a new thread for every run
+SHARED = "shared"  # one thread, history grows without bound
+TRUNCATE = "truncate"  # shared, only the last messages are sent once over budget
+SUMMARIZE = "summarize"  # shared, replaced by a summary thread once over budget
+THREAD_POLICIES = (FRESH, SHARED, TRUNCATE, SUMMARIZE)
+
+SUMMARY_PROMPT = (
+    "Summarize this conversation so far for your own future reference. Keep all "
+    "facts, decisions, file names and open tasks, drop everything else."
+)
+
+
+class ThreadLifecycle:
+    """
+    Decides which assistant thread the runs of behavior tree actions go to.
+
+    With a shared policy, runs are serialized because a thread only accepts one
+    run at a time. The prompt tokens of the last run are compared against
+    token_budget: past it, TRUNCATE sends only the last keep_messages messages
+    and SUMMARIZE moves on to a new thread seeded with a summary of the old one.
+    Truncated runs report the truncated prompt, so once a thread went over
+    budget TRUNCATE keeps truncating its runs.
+    """
+
+    def __init__(
+        self, api, policy=FRESH, token_budget=8000, keep_messages=10, thread=None
+    ):
+        if policy not in THREAD_POLICIES:
+            raise ValueError(
+                f"Unknown thread policy {policy!r}, use one of {THREAD_POLICIES}"
+            )
+        self.api = api
+        self.policy = policy
+        self.token_budget = token_budget
+        self.keep_messages = keep_messages
+        self.thread = thread
+        self.prompt_tokens = 0  # prompt size of the last run on the thread
+        self.truncating = False  # the thread went over budget, keep truncating
+        self.summaries = 0
+        self._lock = threading.Lock()
+
+    def call(self, assistant_id, message):
+        """Run the assistant on the thread chosen by the policy."""
+        if self.policy == FRESH:
+            return self.api.call_assistant(assistant_id, message)
+        with self._lock:
+            if self.thread is None:
+                self.thread = self.api.create_thread()
+            if self.over_budget() and self.policy == SUMMARIZE:
+                self.summarize(assistant_id)
+            run_options = {}
+            if self.policy == TRUNCATE and (self.truncating or self.over_budget()):
+                self.truncating = True
+                run_options["truncation_strategy"] = {
+                    "type": "last_messages",
+                    "last_messages": self.keep_messages,
+                }
+            result = self.api.call_assistant_with_thread(
+                self.thread, assistant_id, message, **run_options
+            )
+            self.track_usage(result)
+            return result
+
+    def restore(self, thread_id):
+        """Continue on an existing thread, e.g. of a resumed run."""
+        try:
+            thread = self.api.retrieve_thread(thread_id)
+        except Exception as e:
+            print(f"Unable to restore thread {thread_id}: {str(e)}")
+            return False
+        with self._lock:
+            self.thread = thread
+            self.prompt_tokens = 0
+            self.truncating = False
+        return True
+
+    def over_budget(self):
+        return bool(self.token_budget) and self.prompt_tokens > self.token_budget
+
+    def track_usage(self, result):
+        usage = result.get("usage") if isinstance(result, dict) else None
+        if usage and usage.get("prompt_tokens") is not None:
+            self.prompt_tokens = usage["prompt_tokens"]
+
+    def summarize(self, assistant_id):
+        """Replace the thread with a new one that starts from a summary of it."""
+        result = self.api.call_assistant_with_thread(
+            self.thread, assistant_id, SUMMARY_PROMPT
+        )
+        summary = result.get("text") if isinstance(result, dict) else None
+        if not summary:
+            print("Unable to summarize the thread, keeping it.")
+            return
+        thread = self.api.create_thread()
+        self.api.create_thread_message(
+            thread.id, "user", f"Summary of the conversation so far:\n{summary}"
+        )
+        print(f"Thread {self.thread.id} summarized into {thread.id}.")
+        self.thread = thread
+        self.prompt_tokens = 0
+        self.summaries += 1
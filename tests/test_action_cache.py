@@ -0,0 +1,119 @@
+import os
+
+import pytest
+
+from playground.action_cache import ActionResultCache, qualified_name
+from playground.actions_manager import ActionsManager, SingletonMeta, agent_action
+
+
+@pytest.fixture
+def action_cache(tmp_path):
+    SingletonMeta._instances.pop(ActionResultCache, None)
+    cache = ActionResultCache(db_path=str(tmp_path / "action_cache.db"), max_entries=2)
+    yield cache
+    SingletonMeta._instances.pop(ActionResultCache, None)
+
+
+def test_cache_hits_and_misses(action_cache):
+    calls = []
+
+    def lookup(query, limit=5):
+        calls.append(query)
+        return {"query": query, "limit": limit}
+
+    first = action_cache.call("lookup", lookup, ("gpt",), {"limit": 5})
+    second = action_cache.call("lookup", lookup, ("gpt",), {"limit": 5})
+    assert first == second
+    assert calls == ["gpt"]
+    assert action_cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_cache_ttl_expires(action_cache):
+    key = action_cache.make_key("lookup", (), {"query": "gpt"})
+    action_cache.set(key, "lookup", "result", ttl=-1)
+    assert action_cache.get(key) == (False, None)
+
+
+def test_cache_evicts_least_recently_used(action_cache):
+    keys = [action_cache.make_key("lookup", (i,), {}) for i in range(3)]
+    action_cache.set(keys[0], "lookup", 0)
+    action_cache.set(keys[1], "lookup", 1)
+    action_cache.get(keys[0])
+    action_cache.set(keys[2], "lookup", 2)
+
+    assert action_cache.get(keys[0]) == (True, 0)
+    assert action_cache.get(keys[1]) == (False, None)
+    assert action_cache.get(keys[2]) == (True, 2)
+
+
+def test_cache_keys_bind_arguments_to_the_signature(action_cache):
+    def lookup(query, limit=5):
+        return {"query": query, "limit": limit}
+
+    key = action_cache.make_key("lookup", ("gpt",), {}, lookup)
+    assert action_cache.make_key("lookup", ("gpt", 5), {}, lookup) == key
+    assert action_cache.make_key("lookup", (), {"query": "gpt"}, lookup) == key
+    assert action_cache.make_key("lookup", ("gpt", 6), {}, lookup) != key
+
+
+def test_results_failing_cache_if_are_not_stored(action_cache):
+    results = iter(["Failed to fetch", "readme"])
+
+    def download(url):
+        return next(results)
+
+    def call():
+        return action_cache.call(
+            "download",
+            download,
+            ("url",),
+            {},
+            cache_if=lambda result: not result.startswith("Failed"),
+        )
+
+    assert call() == "Failed to fetch"
+    assert call() == "readme"
+    assert call() == "readme"
+    assert action_cache.stats()["entries"] == 1
+
+
+def test_actions_are_cached_under_their_qualified_name(action_cache):
+    calls = []
+
+    @agent_action(cache=True)
+    def lookup(query, limit=5):
+        """Looks up the query."""
+        calls.append(query)
+        return query
+
+    assert lookup("gpt") == lookup(query="gpt", limit=5) == "gpt"
+    assert calls == ["gpt"]
+    key = action_cache.make_key(qualified_name(lookup), ("gpt",), {}, lookup)
+    assert key.startswith(f"{os.path.abspath(__file__)}:")
+    assert action_cache.get(key) == (True, "gpt")
+
+
+def test_actions_of_different_files_do_not_share_results(action_cache, tmp_path):
+    actions_folder = tmp_path / "assistant_actions"
+    (actions_folder / "news").mkdir(parents=True)
+    for group in ["weather", "news/weather"]:
+        path = actions_folder / f"{group}.py"
+        path.write_text(
+            "from playground.actions_manager import agent_action\n\n\n"
+            "@agent_action(cache=True)\n"
+            "def lookup(query):\n"
+            '    """Looks up the query."""\n'
+            f"    return '{group} ' + query\n",
+            encoding="utf-8",
+        )
+
+    SingletonMeta._instances.pop(ActionsManager, None)
+    manager = ActionsManager(
+        actions_folder=str(actions_folder),
+        cache_path=str(tmp_path / "actions_registry.json"),
+    )
+    SingletonMeta._instances.pop(ActionsManager, None)
+    actions = [action for action in manager.get_actions() if action["name"] == "lookup"]
+    results = sorted(action["pointer"]("today") for action in actions)
+    assert results == ["news/weather today", "weather today"]
+    assert action_cache.stats()["entries"] == 2
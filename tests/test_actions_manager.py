@@ -0,0 +1,178 @@
+import os
+import textwrap
+import threading
+
+import pytest
+
+from playground.actions_manager import (
+    ActionsManager,
+    SingletonMeta,
+    action_cancelled,
+    agent_action,
+    run_cancellable,
+)
+
+ACTION_FILE = textwrap.dedent('''
+    from playground.actions_manager import agent_action
+
+
+    @agent_action
+    def add_numbers(a, b):
+        """Add two numbers."""
+        return str(int(a) + int(b))
+
+
+    @agent_action
+    def shout(text):
+        """Shout the text."""
+        return text.upper()
+''')
+
+
+def create_manager(actions_folder, cache_path):
+    # ActionsManager is a singleton, so drop any previous instance first
+    SingletonMeta._instances.pop(ActionsManager, None)
+    return ActionsManager(actions_folder=actions_folder, cache_path=cache_path)
+
+
+@pytest.fixture
+def actions_folder(tmp_path):
+    folder = tmp_path / "assistant_actions"
+    folder.mkdir()
+    (folder / "math_actions.py").write_text(ACTION_FILE, encoding="utf-8")
+    return folder
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "actions_registry.json")
+
+
+def test_collect_actions(actions_folder, cache_path):
+    manager = create_manager(str(actions_folder), cache_path)
+    assert sorted(manager.get_action_names()) == ["add_numbers", "shout"]
+    action = manager.get_action("add_numbers")
+    assert action["group"] == "math_actions"
+    assert action["agent_action"]["function"]["name"] == "add_numbers"
+    assert action["pointer"](a="1", b="2") == "3"
+    assert os.path.exists(cache_path)
+
+
+def test_cached_actions_are_not_imported(actions_folder, cache_path, monkeypatch):
+    create_manager(str(actions_folder), cache_path)
+
+    def fail_load(*args, **kwargs):
+        raise AssertionError("module should not be imported on a cache hit")
+
+    monkeypatch.setattr(ActionsManager, "inspect_file_for_decorated_actions", fail_load)
+    manager = create_manager(str(actions_folder), cache_path)
+    assert sorted(manager.get_action_names()) == ["add_numbers", "shout"]
+    assert manager.get_action("shout")["agent_action"]["function"]["name"] == "shout"
+
+
+def test_edited_file_is_rescanned(actions_folder, cache_path):
+    create_manager(str(actions_folder), cache_path)
+    action_file = actions_folder / "math_actions.py"
+    action_file.write_text(
+        ACTION_FILE.replace("def shout", "def whisper"), encoding="utf-8"
+    )
+    stat = os.stat(action_file)
+    os.utime(action_file, (stat.st_atime, stat.st_mtime + 10))
+
+    manager = create_manager(str(actions_folder), cache_path)
+    assert sorted(manager.get_action_names()) == ["add_numbers", "whisper"]
+
+
+def test_actions_share_lazily_loaded_module(actions_folder, cache_path):
+    create_manager(str(actions_folder), cache_path)
+    manager = create_manager(str(actions_folder), cache_path)
+    assert manager.modules == {}
+
+    add_numbers = manager.get_action("add_numbers")["pointer"]
+    shout = manager.get_action("shout")["pointer"]
+    assert shout(text="hi") == "HI"
+    assert add_numbers(a="2", b="2") == "4"
+    assert len(manager.modules) == 1
+    assert add_numbers.load().__globals__ is shout.load().__globals__
+
+
+def test_action_indexes(actions_folder, cache_path):
+    manager = create_manager(str(actions_folder), cache_path)
+    assert manager.get_action("missing") is None
+    assert [a["name"] for a in manager.get_actions_by_names(["shout", "missing"])] == [
+        "shout"
+    ]
+    assert manager.get_action_names_by_group("math_actions") == [
+        "add_numbers",
+        "shout",
+    ]
+
+    manager.add_action({"name": "custom", "group": "manual", "pointer": print})
+    assert manager.get_action("custom")["group"] == "manual"
+    assert manager.get_action_names_by_group("manual") == ["custom"]
+
+
+def test_reload_changed_actions(actions_folder, cache_path):
+    manager = create_manager(str(actions_folder), cache_path)
+    events = []
+    manager.add_change_listener(events.append)
+    assert manager.reload_changed_actions() is None
+
+    (actions_folder / "echo_actions.py").write_text(
+        ACTION_FILE.replace("add_numbers", "echo_numbers").replace("shout", "echo"),
+        encoding="utf-8",
+    )
+    (actions_folder / "math_actions.py").unlink()
+    event = manager.reload_changed_actions()
+
+    assert event["added"] == ["echo", "echo_numbers"]
+    assert event["removed"] == ["add_numbers", "shout"]
+    assert events == [event]
+    assert sorted(manager.get_action_names()) == ["echo", "echo_numbers"]
+    assert manager.get_action("echo")["pointer"](text="hey") == "HEY"
+
+
+def test_concurrent_opt_out_is_registered_and_cached(actions_folder, cache_path):
+    (actions_folder / "writer_actions.py").write_text(
+        textwrap.dedent('''
+            from playground.actions_manager import agent_action
+
+
+            @agent_action(concurrent=False)
+            def write_note(note):
+                """Write a note."""
+                return note
+        '''),
+        encoding="utf-8",
+    )
+    for _ in range(2):  # the second manager reads the specs from the cache
+        manager = create_manager(str(actions_folder), cache_path)
+        assert manager.get_action("write_note")["concurrent"] is False
+        assert manager.get_action("shout")["concurrent"] is True
+        assert manager.get_action("write_note")["pointer"](note="hi") == "hi"
+
+
+def test_action_timeout_options():
+    @agent_action(timeout=5, on_timeout="cancel")
+    def slow_action(seconds):
+        """Wait for a while."""
+        return seconds
+
+    assert slow_action._timeout == 5
+    assert slow_action._on_timeout == "cancel"
+    with pytest.raises(ValueError):
+        agent_action(on_timeout="ignore")(slow_action)
+
+
+def test_run_cancellable():
+    cancel_event = threading.Event()
+    assert run_cancellable(action_cancelled, cancel_event) is False
+    cancel_event.set()
+    assert run_cancellable(action_cancelled, cancel_event) is True
+    assert action_cancelled() is False
+
+
+def test_cache_path_may_be_a_bare_filename(actions_folder, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    create_manager(str(actions_folder), "actions_registry.json")
+    assert (tmp_path / "actions_registry.json").exists()
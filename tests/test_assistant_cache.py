@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+from playground import assistants_api
+from playground.assistant_cache import AssistantCache
+
+
+def make_assistant(assistant_id, name):
+    return SimpleNamespace(id=assistant_id, name=name)
+
+
+def test_listing_and_lookup_by_name():
+    cache = AssistantCache(ttl=60)
+    assert cache.all() is None
+    cache.put_all(
+        [
+            make_assistant("asst_2", "Writer v2"),
+            make_assistant("asst_1", "Writer"),
+        ]
+    )
+    assert cache.find_by_name("writer").id == "asst_1"
+    assert cache.find_by_name("WRITER V").id == "asst_2"
+    assert cache.find_by_name("Reader") is None
+
+
+def test_create_update_and_delete_keep_cache_in_sync():
+    cache = AssistantCache(ttl=60)
+    cache.put_all([make_assistant("asst_1", "Writer")])
+
+    cache.put(make_assistant("asst_2", "Researcher"))
+    assert [a.id for a in cache.all()] == ["asst_2", "asst_1"]
+
+    cache.put(make_assistant("asst_1", "Editor"))
+    assert cache.get("asst_1").name == "Editor"
+    assert cache.find_by_name("editor").id == "asst_1"
+
+    cache.invalidate("asst_2")
+    assert cache.get("asst_2") is None
+    assert [a.id for a in cache.all()] == ["asst_1"]
+
+
+def test_stale_entries_are_not_returned():
+    cache = AssistantCache(ttl=0)
+    cache.put_all([make_assistant("asst_1", "Writer")])
+    assert cache.get("asst_1") is None
+    assert cache.all() is None
+    assert [a.id for a in cache.all(allow_stale=True)] == ["asst_1"]
+
+
+def test_name_misses_refresh_the_listing_once(monkeypatch):
+    listings = [
+        [make_assistant("asst_1", "Writer")],
+        [make_assistant("asst_2", "Reader"), make_assistant("asst_1", "Writer")],
+    ]
+    calls = []
+
+    def list_assistants(limit):
+        calls.append(limit)
+        return SimpleNamespace(data=listings[min(len(calls), 2) - 1])
+
+    client = SimpleNamespace(
+        beta=SimpleNamespace(assistants=SimpleNamespace(list=list_assistants))
+    )
+    monkeypatch.setattr(assistants_api, "get_llm_client", lambda: client)
+    api = assistants_api.AssistantsAPI()
+
+    assert api.get_assistant_by_name("Writer").id == "asst_1"
+    assert len(calls) == 1
+    # Created elsewhere after the listing was cached
+    assert api.get_assistant_by_name("Reader").id == "asst_2"
+    assert len(calls) == 2
+    assert api.resolve_assistant_ids(["Reader", "Editor"]) == {
+        "Reader": "asst_2",
+        "Editor": None,
+    }
+    assert len(calls) == 3
+
+
+def test_async_lookup_by_name_prefers_exact_matches(monkeypatch):
+    async def list_assistants(limit):
+        return SimpleNamespace(
+            data=[
+                make_assistant("asst_2", "Writer v2"),
+                make_assistant("asst_1", "Writer"),
+            ]
+        )
+
+    client = SimpleNamespace(
+        beta=SimpleNamespace(assistants=SimpleNamespace(list=list_assistants))
+    )
+    monkeypatch.setattr(assistants_api, "get_async_llm_client", lambda: client)
+    api = assistants_api.AsyncAssistantsAPI()
+
+    assert asyncio.run(api.get_assistant_by_name("writer")).id == "asst_1"
+    assert asyncio.run(api.get_assistant_by_name("Writer v")).id == "asst_2"
+    assert asyncio.run(api.get_assistant_by_name("Reader")) is None
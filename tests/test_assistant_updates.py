@@ -0,0 +1,35 @@
+from playground.assistant_updates import (
+    SAVE_DONE,
+    SAVE_PENDING,
+    AssistantUpdateDebouncer,
+)
+
+
+def test_edits_are_coalesced_and_diffed():
+    pushes = []
+    debouncer = AssistantUpdateDebouncer(
+        lambda assistant_id, fields: pushes.append((assistant_id, fields)),
+        idle_seconds=60,
+    )
+    debouncer.seed("asst_1", {"name": "Writer", "instructions": "Be brief."})
+
+    for text in ["B", "Be", "Be verbose."]:
+        assert debouncer.submit("asst_1", {"instructions": text}) == SAVE_PENDING
+    debouncer.submit("asst_1", {"name": "Writer"})
+    debouncer.flush("asst_1")
+
+    assert pushes == [("asst_1", {"instructions": "Be verbose."})]
+    assert debouncer.status("asst_1") == SAVE_DONE
+
+
+def test_unchanged_edits_are_not_pushed():
+    pushes = []
+    debouncer = AssistantUpdateDebouncer(
+        lambda assistant_id, fields: pushes.append(fields), idle_seconds=60
+    )
+    debouncer.seed("asst_1", {"temperature": 1})
+    debouncer.submit("asst_1", {"temperature": 0.5})
+    debouncer.submit("asst_1", {"temperature": 1})
+    debouncer.flush_all()
+
+    assert pushes == []
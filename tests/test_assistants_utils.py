@@ -0,0 +1,387 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from playground import assistants_api, assistants_utils
+from playground.actions_manager import (
+    ActionTimeoutError,
+    SingletonMeta,
+    action_cancelled,
+)
+from playground.assistants_api import AssistantsAPI, AsyncAssistantsAPI
+from playground.assistants_utils import (
+    STREAM_DONE,
+    AsyncEventHandler,
+    EventHandler,
+    iter_stream_text,
+)
+from playground.retry_policy import RetryPolicy
+from playground.sandbox_manager import (
+    SandboxManager,
+    current_environment,
+    current_sandbox,
+)
+
+
+def test_iter_stream_text_batches_until_done():
+    output_queue = queue.Queue()
+    for text in ["Hel", "lo", ", ", "world"]:
+        output_queue.put(("text", text))
+    output_queue.put(STREAM_DONE)
+
+    batches = list(iter_stream_text(output_queue, batch_interval=1))
+    assert batches == ["Hello, world"]
+
+
+def test_iter_stream_text_blocks_for_slow_producer():
+    output_queue = queue.Queue()
+
+    def producer():
+        for text in ["a", "b"]:
+            time.sleep(0.05)
+            output_queue.put(("text", text))
+        output_queue.put(STREAM_DONE)
+
+    threading.Thread(target=producer).start()
+    assert "".join(iter_stream_text(output_queue, batch_interval=0)) == "ab"
+
+
+class FakeActions:
+    """Stands in for the ActionsManager singleton of the event handlers."""
+
+    def __init__(self, **actions):
+        self.actions = actions
+
+    def get_action(self, action_name):
+        return self.actions.get(action_name)
+
+
+def action(pointer, **options):
+    return {"pointer": pointer, **options}
+
+
+def tool_call(call_id, name, arguments="{}"):
+    return SimpleNamespace(
+        id=call_id, function=SimpleNamespace(name=name, arguments=arguments)
+    )
+
+
+def requires_action(*tool_calls):
+    data = SimpleNamespace(
+        id="run_1",
+        usage=None,
+        required_action=SimpleNamespace(
+            submit_tool_outputs=SimpleNamespace(tool_calls=list(tool_calls))
+        ),
+    )
+    return SimpleNamespace(event="thread.run.requires_action", data=data)
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    """Tool outputs the event handlers would submit to the run."""
+    submitted = []
+    monkeypatch.setattr(
+        EventHandler,
+        "submit_tool_outputs",
+        lambda self, tool_outputs, run_id: submitted.append(tool_outputs),
+    )
+    return submitted
+
+
+def use_actions(monkeypatch, **actions):
+    fake = FakeActions(**actions)
+    monkeypatch.setattr(assistants_utils, "ActionsManager", lambda: fake)
+
+
+def test_tool_calls_of_a_run_use_its_sandbox(tmp_path, monkeypatch, submitted):
+    (tmp_path / "env").mkdir()
+    (tmp_path / "env" / "pyvenv.cfg").write_text("home = /usr/bin\n")
+    SingletonMeta._instances.pop(SandboxManager, None)
+    sandboxes = SandboxManager(base_path=str(tmp_path))
+
+    def env_path():
+        with current_environment() as env_manager:
+            return env_manager.env_path
+
+    use_actions(monkeypatch, env_path=action(env_path))
+
+    @contextmanager
+    def run_stream(thread_id, assistant_id, event_handler, **run_options):
+        # Two calls, so they run on the tool call pool
+        event_handler.on_event(
+            requires_action(tool_call("a", "env_path"), tool_call("b", "env_path"))
+        )
+        yield SimpleNamespace(text_deltas=[])
+
+    api = AssistantsAPI()
+    monkeypatch.setattr(api, "run_stream", run_stream)
+    token = current_sandbox.set("tree run")
+    try:
+        api.stream_run("thread_1", "assistant_1", {})
+    finally:
+        current_sandbox.reset(token)
+        SingletonMeta._instances.pop(SandboxManager, None)
+
+    sandbox_path = sandboxes.sandbox_path("tree run")
+    assert submitted == [
+        [
+            {"tool_call_id": "a", "output": sandbox_path},
+            {"tool_call_id": "b", "output": sandbox_path},
+        ]
+    ]
+
+
+def test_non_concurrent_actions_are_barriers(monkeypatch):
+    use_actions(
+        monkeypatch,
+        read=action(print),
+        write=action(print, concurrent=False),
+    )
+    handler = EventHandler(queue.Queue())
+    tool_calls = [
+        tool_call("a", "read"),
+        tool_call("b", "read"),
+        tool_call("c", "write"),
+        tool_call("d", "read"),
+        tool_call("e", "unknown"),
+    ]
+    batches = handler.plan_tool_batches(tool_calls)
+    assert [[index for index, _, _ in batch] for batch in batches] == [
+        [0, 1],
+        [2],
+        [3, 4],
+    ]
+
+
+def test_tool_outputs_keep_the_tool_call_order(monkeypatch, submitted):
+    events = []
+    lock = threading.Lock()
+
+    def read(delay):
+        with lock:
+            events.append(("start", delay))
+        time.sleep(float(delay))
+        with lock:
+            events.append(("end", delay))
+        return delay
+
+    def write(delay):
+        with lock:
+            events.append(("write", delay))
+        return delay
+
+    use_actions(monkeypatch, read=action(read), write=action(write, concurrent=False))
+    handler = EventHandler(queue.Queue())
+    handler.on_event(
+        requires_action(
+            tool_call("a", "read", '{"delay": "0.2"}'),
+            tool_call("b", "read", '{"delay": "0"}'),
+            tool_call("c", "write", '{"delay": "w"}'),
+            tool_call("d", "unknown"),
+            tool_call("e", "read", '{"delay": "0.1"}'),
+        )
+    )
+
+    assert submitted == [
+        [
+            {"tool_call_id": "a", "output": "0.2"},
+            {"tool_call_id": "b", "output": "0"},
+            {"tool_call_id": "c", "output": "w"},
+            {"tool_call_id": "e", "output": "0.1"},
+        ]
+    ]
+    # The first two reads overlap, the write waits for both and runs alone
+    assert sorted(events[:2]) == [("start", "0"), ("start", "0.2")]
+    assert events[2:] == [
+        ("end", "0"),
+        ("end", "0.2"),
+        ("write", "w"),
+        ("start", "0.1"),
+        ("end", "0.1"),
+    ]
+
+
+def test_context_and_images_of_concurrent_calls_are_kept(monkeypatch, submitted):
+    def render(name):
+        time.sleep(0.01)
+        return f"{name}.png"
+
+    use_actions(monkeypatch, render=action(render))
+    handler = EventHandler(queue.Queue())
+    names = [f"chart_{index}" for index in range(32)]
+    handler.on_event(
+        requires_action(
+            *[tool_call(name, "render", f'{{"name": "{name}"}}') for name in names]
+        )
+    )
+
+    assert [output["tool_call_id"] for output in submitted[0]] == names
+    assert sorted(handler.images) == sorted(f"{name}.png" for name in names)
+    for name in names:
+        assert f"{name}.png" in handler.internal_context
+    assert len(handler.internal_context) == sum(len(f"{n}.png") for n in names)
+
+
+def test_timed_out_actions_return_a_json_error(monkeypatch, submitted):
+    release = threading.Event()
+    use_actions(
+        monkeypatch,
+        slow=action(lambda: release.wait(5), timeout=0.2),
+        fast=action(lambda: "done", timeout=5),
+    )
+    handler = EventHandler(queue.Queue())
+    handler.on_event(requires_action(tool_call("a", "slow"), tool_call("b", "fast")))
+    release.set()
+
+    timeout_output = json.loads(submitted[0][0]["output"])
+    assert timeout_output == {
+        "error": "timeout",
+        "action": "slow",
+        "timeout": 0.2,
+        "on_timeout": "abandon",
+        "message": "Action slow timed out after 0.2 seconds.",
+    }
+    assert submitted[0][1] == {"tool_call_id": "b", "output": "done"}
+
+
+@pytest.mark.parametrize("on_timeout", ["cancel", "abandon"])
+def test_cancel_policy_signals_the_worker(monkeypatch, on_timeout):
+    stopped = threading.Event()
+    finished = threading.Event()
+
+    def poll():
+        deadline = time.monotonic() + 1
+        while time.monotonic() < deadline:
+            if action_cancelled():
+                stopped.set()
+                break
+            time.sleep(0.01)
+        finished.set()
+
+    use_actions(monkeypatch)
+    handler = EventHandler(queue.Queue())
+    with pytest.raises(ActionTimeoutError) as error:
+        handler.call_action(
+            "poll", action(poll, timeout=0.1, on_timeout=on_timeout), {}
+        )
+    assert error.value.on_timeout == on_timeout
+    assert finished.wait(5)
+    assert stopped.is_set() == (on_timeout == "cancel")
+
+
+def test_default_action_timeout_applies_to_actions_without_one(monkeypatch):
+    use_actions(monkeypatch)
+    handler = EventHandler(queue.Queue())
+
+    def nap():
+        time.sleep(0.3)
+        return "rested"
+
+    assert handler.call_action("nap", action(nap), {}) == "rested"
+    handler.default_action_timeout = 0.1
+    with pytest.raises(ActionTimeoutError) as error:
+        handler.call_action("nap", action(nap), {})
+    assert error.value.timeout == 0.1
+    # The timeout of the action itself takes precedence
+    assert handler.call_action("nap", action(nap, timeout=5), {}) == "rested"
+
+
+async def async_iter(items):
+    for item in items:
+        yield item
+
+
+def async_api(monkeypatch, run_streams):
+    """AsyncAssistantsAPI whose runs are the given run_stream functions in turn."""
+    messages = []
+
+    async def create_message(**message):
+        messages.append(message)
+
+    client = SimpleNamespace(
+        beta=SimpleNamespace(
+            threads=SimpleNamespace(messages=SimpleNamespace(create=create_message))
+        )
+    )
+    monkeypatch.setattr(assistants_api, "get_async_llm_client", lambda: client)
+    api = AsyncAssistantsAPI(retry_policy=RetryPolicy(base_delay=0))
+    api.assistant_cache.put(SimpleNamespace(id="assistant_1", name="Writer"))
+    run_streams = iter(run_streams)
+    monkeypatch.setattr(
+        api, "run_stream", lambda **options: next(run_streams)(**options)
+    )
+    return api, messages
+
+
+def test_async_runs_dispatch_tool_calls(monkeypatch):
+    submitted = []
+
+    async def submit_tool_outputs(self, tool_outputs, run_id):
+        submitted.append(tool_outputs)
+        await self.output_queue.put(("text", " after tools"))
+
+    monkeypatch.setattr(AsyncEventHandler, "submit_tool_outputs", submit_tool_outputs)
+    use_actions(
+        monkeypatch,
+        upper=action(lambda text: text.upper()),
+        save=action(lambda text: f"saved {text}", concurrent=False),
+    )
+
+    @asynccontextmanager
+    async def run_stream(thread_id, assistant_id, event_handler):
+        await event_handler.on_event(
+            requires_action(
+                tool_call("a", "upper", '{"text": "draft"}'),
+                tool_call("b", "save", '{"text": "draft"}'),
+                tool_call("c", "upper", '{"text": "notes"}'),
+            )
+        )
+        yield SimpleNamespace(text_deltas=async_iter(["Done"]))
+
+    api, messages = async_api(monkeypatch, [run_stream])
+    thread = SimpleNamespace(id="thread_1")
+    reply = asyncio.run(api.call_assistant_with_thread(thread, "assistant_1", "Go"))
+
+    assert messages == [
+        {"thread_id": "thread_1", "role": "user", "content": "Go", "attachments": None}
+    ]
+    assert submitted == [
+        [
+            {"tool_call_id": "a", "output": "DRAFT"},
+            {"tool_call_id": "b", "output": "saved draft"},
+            {"tool_call_id": "c", "output": "NOTES"},
+        ]
+    ]
+    assert reply["text"] == " after toolsDone"
+    assert (reply["tool_calls"], reply["attempts"]) == (3, 1)
+
+
+def test_async_runs_retry_transient_errors(monkeypatch):
+    use_actions(monkeypatch)
+
+    @asynccontextmanager
+    async def failing_stream(thread_id, assistant_id, event_handler):
+        raise ConnectionError("connection reset")
+        yield
+
+    @asynccontextmanager
+    async def run_stream(thread_id, assistant_id, event_handler):
+        yield SimpleNamespace(text_deltas=async_iter(["Hello"]))
+
+    api, _ = async_api(monkeypatch, [failing_stream, run_stream])
+    thread = SimpleNamespace(id="thread_1")
+    reply = asyncio.run(api.call_assistant_with_thread(thread, "assistant_1", "Hi"))
+    assert (reply["text"], reply["attempts"]) == ("Hello", 2)
+
+    api, _ = async_api(monkeypatch, [failing_stream] * 4)
+    api.retry_policy.max_attempts = 2
+    reply = asyncio.run(api.call_assistant_with_thread(thread, "assistant_1", "Hi"))
+    assert reply["text"] == "Run cancelled with error: connection reset"
+    assert reply["attempts"] == 2
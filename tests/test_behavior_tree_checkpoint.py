@@ -0,0 +1,139 @@
+from playground.behavior_tree_checkpoint import (
+    BehaviorTreeCheckpoint,
+    claim_checkpoint,
+    node_keys,
+)
+
+
+class FakeNode:
+    def __init__(self, name, children=(), thread_lifecycle=None):
+        self.name = name
+        self.children = list(children)
+        self.checkpoint = None
+        self.checkpoint_key = None
+        self.thread_lifecycle = thread_lifecycle
+
+    def iterate(self):
+        for child in self.children:
+            yield from child.iterate()
+        yield self
+
+
+class FakeLifecycle:
+    def __init__(self, policy="shared", restorable=True):
+        self.policy = policy
+        self.restorable = restorable
+        self.restored = []
+
+    def restore(self, thread_id):
+        self.restored.append(thread_id)
+        return self.restorable
+
+
+class FakeTree:
+    def __init__(self, root):
+        self.root = root
+
+
+def write_yaml(tmp_path, text="root: {}"):
+    yaml_path = tmp_path / "tree.yaml"
+    yaml_path.write_text(text, encoding="utf-8")
+    return str(yaml_path)
+
+
+def test_successful_nodes_are_resumed_once(tmp_path):
+    yaml_path = write_yaml(tmp_path)
+    checkpoint_dir = str(tmp_path / "checkpoints")
+    checkpoint = BehaviorTreeCheckpoint.for_yaml(yaml_path, checkpoint_dir)
+    checkpoint.record("0:Research", "SUCCESS", result={"text": "done"}, thread_id="t1")
+    checkpoint.record("1:Write", "FAILURE")
+
+    resumed = BehaviorTreeCheckpoint.for_yaml(yaml_path, checkpoint_dir)
+    entry = resumed.take_resumed("0:Research")
+    assert entry["result"] == {"text": "done"}
+    assert entry["thread_id"] == "t1"
+    assert resumed.take_resumed("0:Research") is None
+    assert resumed.take_resumed("1:Write") is None
+
+
+def test_changed_yaml_discards_checkpoint(tmp_path):
+    yaml_path = write_yaml(tmp_path)
+    checkpoint_dir = str(tmp_path / "checkpoints")
+    BehaviorTreeCheckpoint.for_yaml(yaml_path, checkpoint_dir).record(
+        "0:Research", "SUCCESS"
+    )
+
+    write_yaml(tmp_path, "root: {name: changed}")
+    checkpoint = BehaviorTreeCheckpoint.for_yaml(yaml_path, checkpoint_dir)
+    assert checkpoint.take_resumed("0:Research") is None
+
+
+def test_attach_and_clear(tmp_path):
+    research, write = FakeNode("Research"), FakeNode("Write")
+    tree = FakeTree(FakeNode("Root", [research, write]))
+    checkpoint = BehaviorTreeCheckpoint(str(tmp_path / "tree.json"))
+    checkpoint.attach(tree)
+
+    assert [key for key, _ in node_keys(tree)] == ["0:Research", "1:Write", "2:Root"]
+    assert research.checkpoint is checkpoint
+    assert write.checkpoint_key == "1:Write"
+
+    checkpoint.record(research.checkpoint_key, "SUCCESS")
+    checkpoint.clear()
+    assert not (tmp_path / "tree.json").exists()
+    assert BehaviorTreeCheckpoint(str(tmp_path / "tree.json")).nodes == {}
+
+
+def test_concurrent_runs_do_not_share_a_checkpoint(tmp_path):
+    yaml_path = write_yaml(tmp_path)
+    checkpoint_dir = str(tmp_path / "checkpoints")
+    BehaviorTreeCheckpoint.for_yaml(yaml_path, checkpoint_dir).record(
+        "0:Research", "SUCCESS"
+    )
+    first = BehaviorTreeCheckpoint.for_yaml(yaml_path, checkpoint_dir)
+    second = BehaviorTreeCheckpoint.for_yaml(yaml_path, checkpoint_dir)
+    research = FakeNode("Research")
+    tree = FakeTree(FakeNode("Root", [research]))
+
+    with claim_checkpoint(first, tree) as claimed:
+        assert claimed is first
+        assert research.checkpoint is first
+        with claim_checkpoint(second, FakeTree(FakeNode("Root"))) as claimed:
+            assert claimed is None
+    with claim_checkpoint(second, tree) as claimed:
+        assert claimed is second
+    with claim_checkpoint(None, tree) as claimed:
+        assert claimed is None
+
+
+def shared_thread_tree(tmp_path, threads):
+    checkpoint = BehaviorTreeCheckpoint(str(tmp_path / "tree.json"))
+    checkpoint.record("0:Research", "SUCCESS", thread_id="t1")
+    checkpoint.record("1:Outline", "SUCCESS", thread_id="t2")
+    checkpoint = BehaviorTreeCheckpoint(str(tmp_path / "tree.json"))
+    children = [
+        FakeNode("Research", thread_lifecycle=threads),
+        FakeNode("Outline", thread_lifecycle=threads),
+        FakeNode("Write", thread_lifecycle=threads),
+    ]
+    checkpoint.attach(FakeTree(FakeNode("Root", children)))
+    return checkpoint
+
+
+def test_resume_restores_the_shared_thread(tmp_path):
+    threads = FakeLifecycle()
+    checkpoint = shared_thread_tree(tmp_path, threads)
+    assert threads.restored == ["t2"]
+    assert checkpoint.take_resumed("0:Research") is not None
+
+
+def test_nodes_run_again_without_their_shared_thread(tmp_path):
+    threads = FakeLifecycle(restorable=False)
+    checkpoint = shared_thread_tree(tmp_path, threads)
+    assert checkpoint.take_resumed("0:Research") is None
+    assert checkpoint.take_resumed("1:Outline") is None
+
+    fresh = FakeLifecycle(policy="fresh")
+    checkpoint = shared_thread_tree(tmp_path, fresh)
+    assert fresh.restored == []
+    assert checkpoint.take_resumed("0:Research") is not None
@@ -0,0 +1,41 @@
+import pytest
+
+from playground.actions_manager import SingletonMeta
+from playground.behavior_tree_metrics import NodeMetricsStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    SingletonMeta._instances.pop(NodeMetricsStore, None)
+    yield NodeMetricsStore(db_path=str(tmp_path / "metrics.db"), max_rows=3)
+    SingletonMeta._instances.pop(NodeMetricsStore, None)
+
+
+def test_summary_aggregates_node_runs(store):
+    store.record("Blogger", "Research", "SUCCESS", wall_time=4, total_tokens=100)
+    store.record(
+        "Blogger", "Research", "FAILURE", wall_time=2, total_tokens=50, retries=1
+    )
+    store.record("Other", "Research", "SUCCESS", wall_time=60)
+
+    summary = store.summary("Blogger")
+    assert list(summary) == ["Research"]
+    research = summary["Research"]
+    assert research["runs"] == 2
+    assert research["failures"] == 1
+    assert research["avg_wall_time"] == 3
+    assert research["max_wall_time"] == 4
+    assert research["total_tokens"] == 150
+    assert research["retries"] == 1
+
+
+def test_old_rows_are_pruned(store):
+    for wall_time in range(5):
+        store.record("Blogger", "Write", "SUCCESS", wall_time=wall_time)
+    assert store.summary("Blogger")["Write"]["runs"] == 3
+    assert store.summary("Blogger")["Write"]["avg_wall_time"] == 3
+
+
+def test_unknown_metric(store):
+    with pytest.raises(ValueError):
+        store.record("Blogger", "Write", "SUCCESS", cost=1)
@@ -0,0 +1,106 @@
+import threading
+import time
+
+from playground.behavior_tree_pool import (
+    CANCELLED,
+    DEPLOYED,
+    QUEUED,
+    RUNNING,
+    AssistantCallLimiter,
+    BehaviorTreePool,
+)
+
+
+class FakeRunner:
+    def __init__(self, status="SUCCESS"):
+        self.status = status
+        self.started = threading.Event()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        self.started.set()
+        self._stop_event.wait(5)
+        return "INVALID" if self._stop_event.is_set() else self.status
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class QuickRunner(FakeRunner):
+    def run(self):
+        return self.status
+
+
+def test_runs_report_their_status():
+    pool = BehaviorTreePool(max_running=2)
+    success = pool.submit("ok", QuickRunner())
+    failure = pool.submit("fails", QuickRunner("FAILURE"))
+    assert pool.wait(success, 5)["status"] == "SUCCESS"
+    assert pool.wait(failure, 5)["status"] == "FAILURE"
+    assert [run["name"] for run in pool.list_runs()] == ["ok", "fails"]
+
+
+def test_max_running_queues_and_cancel():
+    pool = BehaviorTreePool(max_running=1)
+    first_runner = FakeRunner()
+    first = pool.submit("first", first_runner)
+    assert first_runner.started.wait(5)
+    second = pool.submit("second", FakeRunner())
+    assert pool.get(first)["status"] == RUNNING
+    assert pool.get(second)["status"] == QUEUED
+
+    assert pool.cancel(second)
+    assert pool.get(second)["status"] == CANCELLED
+    assert pool.cancel(first)
+    assert pool.wait(first, 5)["status"] == CANCELLED
+    assert pool.wait(second, 5)["status"] == CANCELLED
+    assert not pool.cancel(first)
+    assert pool.list_runs(active_only=True) == []
+
+
+def test_deployments_are_tracked_once():
+    pool = BehaviorTreePool()
+    stop = threading.Event()
+    run_id = pool.track_deployment("blogger", lambda: stop.wait(5))
+    assert pool.track_deployment("blogger", lambda: None) == run_id
+    assert pool.get(run_id)["status"] == DEPLOYED
+    assert not pool.cancel(run_id)
+    stop.set()
+
+
+def test_call_limiter_caps_concurrent_calls():
+    limiter = AssistantCallLimiter(max_concurrent=2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def call():
+        with limiter:
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+
+
+def test_call_limiter_rate():
+    limiter = AssistantCallLimiter(calls_per_minute=2)
+    limiter.acquire()
+    limiter.release()
+    limiter.acquire()
+    limiter.release()
+    blocked = threading.Thread(target=limiter.acquire, daemon=True)
+    blocked.start()
+    blocked.join(0.2)
+    assert blocked.is_alive()
+    limiter.configure(calls_per_minute=None)
+    blocked.join(5)
+    assert not blocked.is_alive()
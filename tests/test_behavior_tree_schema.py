@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from playground.behavior_tree_schema import (
+    BehaviorTreeSchemaError,
+    CompiledTreeCache,
+    validate_behavior_tree,
+)
+
+TREE_YAML = """
+behavior_tree:
+  name: "Blogger"
+  root:
+    type: "Sequence"
+    children:
+      - type: "Action"
+        name: "Research"
+        agent: "Researcher"
+        instructions: "Find a topic."
+      - type: "Parallel"
+        policy: "SuccessOnOne"
+        children:
+          - type: "Action"
+            name: "Write"
+            agent: "Writer"
+            instructions: "Write a post."
+          - type: "Action"
+            name: "Draft"
+            agent: "Researcher"
+            instructions: "Draft a post."
+"""
+
+
+def test_compiled_tree(tmp_path):
+    yaml_path = tmp_path / "blogger.yaml"
+    yaml_path.write_text(TREE_YAML, encoding="utf-8")
+    cache = CompiledTreeCache()
+    compiled = cache.load(str(yaml_path))
+    assert compiled.name == "Blogger"
+    assert compiled.agent_names == ["Researcher", "Writer"]
+    assert cache.load(str(yaml_path)) is compiled
+    assert cache.tree_name(str(yaml_path)) == "Blogger"
+
+    yaml_path.write_text(TREE_YAML.replace("Blogger", "Writer"), encoding="utf-8")
+    stat = os.stat(yaml_path)
+    os.utime(yaml_path, (stat.st_atime, stat.st_mtime + 10))
+    assert cache.tree_name(str(yaml_path)) == "Writer"
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        ({}, "behavior_tree"),
+        ({"behavior_tree": {"name": "Tree"}}, "root"),
+        ({"behavior_tree": {"name": "Tree", "root": {"type": "Loop"}}}, "Loop"),
+        (
+            {
+                "behavior_tree": {
+                    "name": "Tree",
+                    "root": {
+                        "type": "Sequence",
+                        "children": [{"type": "Action", "name": "Write"}],
+                    },
+                }
+            },
+            "root.children[0]: Action node needs a 'agent'",
+        ),
+        (
+            {
+                "behavior_tree": {
+                    "name": "Tree",
+                    "root": {"type": "Parallel", "policy": "SuccessOnSome"},
+                }
+            },
+            "SuccessOnSome",
+        ),
+    ],
+)
+def test_invalid_trees(data, message):
+    with pytest.raises(BehaviorTreeSchemaError, match=message.replace("[", r"\[")):
+        validate_behavior_tree(data)
+
+
+def test_invalid_yaml(tmp_path):
+    yaml_path = tmp_path / "broken.yaml"
+    yaml_path.write_text("behavior_tree: [", encoding="utf-8")
+    with pytest.raises(BehaviorTreeSchemaError):
+        CompiledTreeCache().load(str(yaml_path))
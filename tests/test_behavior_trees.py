@@ -0,0 +1,199 @@
+import queue
+import threading
+import time
+from types import SimpleNamespace
+
+import py_trees
+import pytest
+
+from playground import behavior_trees
+from playground.actions_manager import SingletonMeta
+from playground.behavior_tree_metrics import NodeMetricsStore
+from playground.behavior_trees import (
+    ActionCompletionSignal,
+    ActionWrapper,
+    TickScheduler,
+    action_completed,
+)
+from playground.retry_policy import RetryPolicy
+
+Status = py_trees.common.Status
+
+
+@pytest.fixture
+def metrics(tmp_path):
+    SingletonMeta._instances.pop(NodeMetricsStore, None)
+    yield NodeMetricsStore(db_path=str(tmp_path / "metrics.db"))
+    SingletonMeta._instances.pop(NodeMetricsStore, None)
+
+
+@pytest.fixture(autouse=True)
+def direct_tasks(monkeypatch):
+    # Run the node's call on the action workers without a prefect flow around it
+    monkeypatch.setattr(
+        behavior_trees,
+        "create_task",
+        lambda action, run_count: lambda: action.long_running_process(run_count),
+    )
+
+
+def in_thread(function):
+    """Run a function on a new thread and return its result."""
+    results = queue.Queue()
+    thread = threading.Thread(target=lambda: results.put(function()))
+    thread.start()
+    thread.join(10)
+    return results.get_nowait()
+
+
+def test_first_wait_sees_completions_of_the_first_tick():
+    signal = ActionCompletionSignal()
+
+    def tick_then_wait():
+        signal.notify()  # an action completing during the first tick
+        started = time.monotonic()
+        first = signal.wait_next(5)
+        second = signal.wait_next(0.1)
+        return first, second, time.monotonic() - started
+
+    first, second, elapsed = in_thread(tick_then_wait)
+    assert (first, second) == (True, False)
+    assert elapsed < 1
+
+
+class FakeTree:
+    """Succeeds on the tick after a background action completed."""
+
+    def __init__(self, action_seconds):
+        self.action_seconds = action_seconds
+        self.done = threading.Event()
+        self.ticks = 0
+        self.root = SimpleNamespace(status=Status.RUNNING)
+
+    def tick(self):
+        self.ticks += 1
+        if self.done.is_set():
+            self.root.status = Status.SUCCESS
+        elif self.ticks == 1:
+            threading.Thread(target=self.action).start()
+
+    def action(self):
+        time.sleep(self.action_seconds)
+        self.done.set()
+        action_completed.notify()
+
+
+def test_scheduler_ticks_when_an_action_completes():
+    tree = FakeTree(action_seconds=0.2)
+    started = time.monotonic()
+    status = TickScheduler(max_interval=30, min_interval=10).run(tree)
+    assert status == Status.SUCCESS
+    assert tree.ticks == 2
+    assert time.monotonic() - started < 5
+
+
+def test_scheduler_backs_off_while_idle_and_stops():
+    tree = FakeTree(action_seconds=60)
+    stop_event = threading.Event()
+    threading.Timer(0.5, stop_event.set).start()
+    started = time.monotonic()
+    status = TickScheduler(max_interval=0.2, min_interval=0.05).run(tree, stop_event)
+    assert status == Status.RUNNING
+    # 0.05 + 0.1 then every 0.2 seconds
+    assert 3 <= tree.ticks <= 5
+    assert time.monotonic() - started < 2
+
+
+class BlockingCalls:
+    """Assistant calls that finish when the test releases them, in order."""
+
+    def __init__(self):
+        self.calls = queue.Queue()
+
+    def __call__(self):
+        release = threading.Event()
+        outcome = {}
+        self.calls.put((release, outcome))
+        release.wait(10)
+        return outcome["result"]
+
+    def finish(self, text):
+        release, outcome = self.calls.get(timeout=10)
+        outcome["result"] = {"text": text, "thread_id": "thread_1"}
+        release.set()
+
+
+def make_node(calls):
+    node = ActionWrapper("Research", "Researcher", calls)
+    node.tree_name = "Blogger"
+    node.retry_policy = RetryPolicy(max_attempts=1)
+    return node
+
+
+def wait_until(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_action_runs_in_the_background(metrics):
+    calls = BlockingCalls()
+    node = make_node(calls)
+
+    node.tick_once()
+    assert node.status == Status.RUNNING
+    node.tick_once()
+    assert node.status == Status.RUNNING
+
+    calls.finish("SUCCESS")
+    wait_until(lambda: not node.thread_running)
+    node.tick_once()
+    assert node.status == Status.SUCCESS
+    assert node.result["text"] == "SUCCESS"
+    assert metrics.summary("Blogger")["Research"]["runs"] == 1
+
+
+class DeferredExecutor:
+    """Holds submitted calls until the test starts them, e.g. out of order."""
+
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, task):
+        self.tasks.append(task)
+
+    def run(self, index, calls, text):
+        thread = threading.Thread(target=self.tasks[index])
+        thread.start()
+        calls.finish(text)
+        thread.join(10)
+
+
+def test_results_of_interrupted_runs_are_ignored(metrics, monkeypatch):
+    executor = DeferredExecutor()
+    monkeypatch.setattr(behavior_trees, "action_executor", executor)
+    calls = BlockingCalls()
+    node = make_node(calls)
+
+    node.tick_once()
+    node.stop(Status.INVALID)  # interrupted by a parent
+    node.tick_once()  # restarted before the first call even started
+
+    executor.run(0, calls, "SUCCESS")
+    assert node.thread_running
+    assert node.result is None
+    assert metrics.summary("Blogger") == {}
+
+    executor.run(1, calls, "FAILURE")
+    node.tick_once()
+    assert node.status == Status.FAILURE
+    assert metrics.summary("Blogger")["Research"]["retries"] == 1
+
+    # The restart was counted for the run it interrupted only
+    node.tick_once()
+    executor.run(2, calls, "SUCCESS")
+    node.tick_once()
+    assert node.status == Status.SUCCESS
+    research = metrics.summary("Blogger")["Research"]
+    assert (research["runs"], research["retries"]) == (2, 1)
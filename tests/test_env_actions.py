@@ -0,0 +1,36 @@
+from contextlib import contextmanager
+
+import pytest
+
+from playground.assistant_actions import env_actions
+
+
+class FakeEnvironment:
+    def __init__(self):
+        self.calls = []
+
+    def run_code(self, code, **kwargs):
+        self.calls.append(kwargs)
+        return "", "", {}
+
+
+@pytest.fixture
+def environment(monkeypatch):
+    environment = FakeEnvironment()
+
+    @contextmanager
+    def current_environment():
+        yield environment
+
+    monkeypatch.setattr(env_actions, "current_environment", current_environment)
+    return environment
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("false", False), ("False", False), ("", False), (False, False), ("0", False)]
+    + [("true", True), (" True ", True), ("1", True), ("yes", True), (True, True)],
+)
+def test_screenshots_flag_is_parsed(environment, value, expected):
+    env_actions.run_python_code("print(1)", screenshots=value)
+    assert environment.calls[-1]["screenshots"] is expected
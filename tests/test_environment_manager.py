@@ -0,0 +1,123 @@
+import os
+import sys
+
+import pytest
+
+from playground import environment_manager
+from playground.environment_manager import EnvironmentManager
+from playground.interpreter_pool import InterpreterPool
+from playground.resource_limits import ResourceLimits
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    site_packages = tmp_path / "env" / "lib" / "python3.11" / "site-packages"
+    site_packages.mkdir(parents=True)
+    commands = []
+
+    def check_call(command):
+        commands.append(command)
+        if "install" in command:
+            (site_packages / "requests-2.32.0.dist-info").mkdir(exist_ok=True)
+
+    monkeypatch.setattr(environment_manager.subprocess, "check_call", check_call)
+    monkeypatch.delenv("CODE_ENV_WHEELHOUSE", raising=False)
+    manager = EnvironmentManager(base_path=str(tmp_path), env_name="env")
+    manager.commands = commands
+    manager.site_packages = site_packages
+    return manager
+
+
+@pytest.fixture
+def requirements_file(tmp_path):
+    path = tmp_path / "requirements.txt"
+    path.write_text("requests\n", encoding="utf-8")
+    return str(path)
+
+
+def test_unchanged_requirements_skip_pip(manager, requirements_file):
+    assert manager.install_requirements(requirements_file) is True
+    assert manager.install_requirements(requirements_file) is False
+    assert len(manager.commands) == 1
+    assert manager.install_requirements(requirements_file, force=True) is True
+
+
+def test_changed_requirements_or_packages_run_pip(manager, requirements_file, tmp_path):
+    manager.install_requirements(requirements_file)
+    (tmp_path / "requirements.txt").write_text("requests\nnumpy\n", encoding="utf-8")
+    assert manager.install_requirements(requirements_file) is True
+
+    (manager.site_packages / "requests-2.32.0.dist-info").rmdir()
+    assert manager.install_requirements(requirements_file) is True
+
+
+def test_install_package_keeps_fingerprint(manager, requirements_file):
+    manager.install_requirements(requirements_file)
+    manager.install_package("numpy")
+    (manager.site_packages / "numpy-2.0.0.dist-info").mkdir()
+    manager.install_package("numpy")
+    assert manager.install_requirements(requirements_file) is False
+
+
+def test_wheelhouse_installs_offline(manager, requirements_file, monkeypatch):
+    monkeypatch.setenv("CODE_ENV_WHEELHOUSE", "/wheels")
+    manager.install_requirements(requirements_file)
+    assert manager.commands[-1][-3:] == ["--no-index", "--find-links", "/wheels"]
+
+
+@pytest.mark.skipif(os.name == "nt", reason="uses bash")
+def test_shell_command_streams_and_times_out(manager):
+    (manager.site_packages.parents[2] / "bin").mkdir()
+    (manager.site_packages.parents[2] / "bin" / "activate").write_text("")
+    chunks = []
+    stdout, stderr = manager.run_shell_command(
+        "echo started; sleep 30 & wait",
+        timeout=1,
+        on_output=lambda stream_name, text: chunks.append(text),
+    )
+    assert chunks == ["started\n"]
+    assert stdout == "started\n"
+    assert "killed after the 1s timeout" in stderr
+
+
+@pytest.mark.skipif(os.name == "nt", reason="uses bash and rlimits")
+def test_shell_command_limits_and_stats(manager):
+    (manager.site_packages.parents[2] / "bin").mkdir()
+    (manager.site_packages.parents[2] / "bin" / "activate").write_text("")
+    stdout, stderr, stats = manager.run_shell_command(
+        "ulimit -n",
+        limits=ResourceLimits(open_files=64),
+        return_stats=True,
+    )
+    assert (stdout, stderr) == ("64\n", "")
+    assert stats["exit_reason"] == "exit"
+    assert stats["returncode"] == 0
+    assert stats["cpu_time"] is not None
+
+
+@pytest.mark.skipif(os.name == "nt", reason="uses bash")
+def test_code_and_shell_commands_run_in_the_venv_folder(manager):
+    bin_folder = manager.site_packages.parents[2] / "bin"
+    bin_folder.mkdir()
+    (bin_folder / "activate").write_text("")
+    os.symlink(sys.executable, bin_folder / "python")
+    env_path = os.path.abspath(manager.env_path)
+
+    stdout, _ = manager.run_code("import os\nprint(os.getcwd())\n")
+    assert stdout == f"{env_path}\n"
+    stdout, _ = manager.run_shell_command("pwd")
+    assert stdout == f"{env_path}\n"
+    InterpreterPool.close_for(manager.python_executable)
+
+
+def test_app_crashing_on_startup_reports_its_output(manager):
+    bin_folder = manager.site_packages.parents[2] / "bin"
+    bin_folder.mkdir()
+    os.symlink(sys.executable, bin_folder / "python")
+    manager.write_code_file(
+        "import sys\nprint('boot')\nsys.exit('crash on start')\n", "app.py"
+    )
+
+    output, errors = manager.run_app_file("app.py", startup_wait=10)
+    assert (output, errors) == ("boot\n", "crash on start\n")
+    InterpreterPool.close_for(manager.python_executable)
@@ -0,0 +1,57 @@
+import sys
+
+import pytest
+
+from playground.interpreter_pool import InterpreterPool
+from playground.process_output import collect_output
+
+
+@pytest.fixture
+def pool():
+    pool = InterpreterPool(sys.executable, size=1)
+    yield pool
+    pool.close()
+
+
+def write_script(tmp_path, code):
+    path = tmp_path / "snippet.py"
+    path.write_text(code, encoding="utf-8")
+    return str(path)
+
+
+def test_runs_script_as_main(pool, tmp_path):
+    path = write_script(tmp_path, "import sys\nprint(__name__, sys.argv[0])\n")
+    stdout, stderr, returncode, reason = collect_output(pool.start(path))
+    assert stdout == f"__main__ {path}\n"
+    assert (stderr, returncode, reason) == ("", 0, "exit")
+
+
+def test_traceback_and_exit_code(pool, tmp_path):
+    path = write_script(tmp_path, "raise ValueError('broken')\n")
+    _, stderr, returncode, _ = collect_output(pool.start(path))
+    assert returncode == 1
+    assert "runpy" not in stderr
+    assert stderr.strip().endswith("ValueError: broken")
+
+
+def test_output_is_streamed_and_timeout_kills(pool, tmp_path):
+    path = write_script(
+        tmp_path, "import time\nprint('started')\nwhile True:\n    time.sleep(1)\n"
+    )
+    chunks = []
+    stdout, _, _, reason = collect_output(
+        pool.start(path),
+        timeout=1,
+        on_output=lambda stream_name, text: chunks.append((stream_name, text)),
+    )
+    # -u writes the line and its newline separately
+    assert "".join(text for _, text in chunks) == "started\n"
+    assert {stream_name for stream_name, _ in chunks} == {"stdout"}
+    assert stdout == "started\n"
+    assert reason == "timeout"
+
+
+def test_runs_in_working_folder(pool, tmp_path):
+    path = write_script(tmp_path, "import os\nprint(os.getcwd())\n")
+    stdout, _, _, _ = collect_output(pool.start(path, cwd=str(tmp_path)))
+    assert stdout.strip() == str(tmp_path)
@@ -0,0 +1,67 @@
+import subprocess
+import sys
+
+from playground.process_output import OutputBuffer, ProcessOutput, collect_output
+
+
+def start(code):
+    return subprocess.Popen(
+        [sys.executable, "-u", "-c", code],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+
+def test_buffer_keeps_head_and_tail():
+    buffer = OutputBuffer(head_chars=5, tail_chars=5)
+    for chunk in ["abc", "defgh", "ijklmnop", "qr"]:
+        buffer.append(chunk)
+    assert buffer.truncated
+    assert buffer.dropped == 8
+    assert buffer.text() == "abcde\n... [8 characters truncated] ...\nnopqr"
+
+    small = OutputBuffer(head_chars=5, tail_chars=5)
+    small.append("abcdefg")
+    assert small.text() == "abcdefg"
+    assert not small.truncated
+
+
+def test_chunks_stream_before_the_process_exits():
+    output = ProcessOutput(
+        start(
+            "import sys, time\n"
+            "sys.stdout.write('50%')\n"
+            "sys.stdout.flush()\n"
+            "time.sleep(2)\n"
+            "sys.stdout.write(' done\\n')\n"
+        )
+    )
+    chunks = iter(output)
+    assert next(chunks) == ("stdout", "50%")
+    assert output.process.poll() is None
+    assert list(chunks) == [("stdout", " done\n")]
+    assert output.stdout == "50% done\n"
+    assert (output.returncode, output.reason) == (0, "exit")
+
+
+def test_noisy_output_is_capped():
+    stdout, stderr, returncode, reason = collect_output(
+        start("for i in range(100000):\n    print(i)\n"),
+        head_chars=100,
+        tail_chars=100,
+    )
+    assert stdout.startswith("0\n1\n2\n")
+    assert stdout.endswith("99998\n99999\n")
+    assert "characters truncated" in stdout
+    assert len(stdout) < 300
+    assert (stderr, returncode, reason) == ("", 0, "exit")
+
+
+def test_timeout_applies_to_chatty_processes():
+    output = ProcessOutput(
+        start("while True:\n    print('spam')\n"), timeout=1, tail_chars=10
+    ).wait()
+    assert output.reason == "timeout"
+    assert output.returncode != 0
+    assert output.stdout.rstrip().endswith("spam")
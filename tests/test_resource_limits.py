@@ -0,0 +1,113 @@
+import subprocess
+import sys
+
+import pytest
+
+from playground.interpreter_pool import InterpreterPool
+from playground.process_output import ProcessOutput
+from playground.resource_limits import (
+    CPU_LIMIT,
+    MEMORY_LIMIT,
+    ResourceLimits,
+    execution_stats,
+    resource,
+)
+
+pytestmark = pytest.mark.skipif(resource is None, reason="needs rlimits")
+
+
+@pytest.fixture
+def pool():
+    pool = InterpreterPool(sys.executable, size=1)
+    yield pool
+    pool.close()
+
+
+def run(pool, tmp_path, code, limits):
+    path = tmp_path / "snippet.py"
+    path.write_text(code, encoding="utf-8")
+    process = pool.start(str(path), rlimits=limits.rlimits())
+    output = ProcessOutput(process, timeout=limits.wall_seconds).wait()
+    return output, execution_stats(output, limits)
+
+
+def test_stats_are_measured(pool, tmp_path):
+    # Touched memory, held long enough to be sampled
+    code = (
+        "import time\n"
+        "data = b'x' * (64 * 1024 * 1024)\n"
+        "sum(range(10 ** 6))\n"
+        "time.sleep(0.3)\n"
+    )
+    output, stats = run(pool, tmp_path, code, ResourceLimits())
+    assert stats["exit_reason"] == "exit"
+    assert stats["returncode"] == 0
+    assert stats["peak_rss_mb"] >= 64
+    assert stats["cpu_time"] > 0
+    assert stats["wall_time"] >= stats["cpu_time"] / 2
+    assert output.stderr == ""
+
+
+def test_peak_rss_is_not_inherited_from_the_parent(tmp_path):
+    # Workers and shells are spawned from the server, which may be large
+    ballast = b"x" * (512 * 1024 * 1024)
+    pool = InterpreterPool(sys.executable, size=1)
+    try:
+        _, stats = run(pool, tmp_path, "print(1)\n", ResourceLimits())
+    finally:
+        pool.close()
+    shell = subprocess.Popen(["bash", "-c", "sleep 0.2"], stdout=subprocess.PIPE)
+    shell_stats = execution_stats(ProcessOutput(shell).wait())
+    del ballast
+    assert stats["peak_rss_mb"] is not None
+    assert stats["peak_rss_mb"] < 128
+    assert shell_stats["peak_rss_mb"] is not None
+    assert shell_stats["peak_rss_mb"] < 128
+
+
+def test_cpu_limit_stops_busy_loops(pool, tmp_path):
+    limits = ResourceLimits(cpu_seconds=1, wall_seconds=20)
+    _, stats = run(pool, tmp_path, "while True:\n    pass\n", limits)
+    assert stats["exit_reason"] == CPU_LIMIT
+    assert stats["returncode"] < 0
+    assert 1 <= stats["cpu_time"] < 5
+
+
+def test_memory_limit(pool, tmp_path):
+    limits = ResourceLimits(memory_mb=512)
+    output, stats = run(pool, tmp_path, "data = bytearray(2 * 1024 ** 3)\n", limits)
+    assert stats["exit_reason"] == MEMORY_LIMIT
+    assert "MemoryError" in output.stderr
+
+
+def test_open_files_and_wall_clock(pool, tmp_path):
+    limits = ResourceLimits(open_files=32, wall_seconds=1)
+    code = (
+        "import resource, time\n"
+        "print(resource.getrlimit(resource.RLIMIT_NOFILE)[0], flush=True)\n"
+        "time.sleep(30)\n"
+    )
+    output, stats = run(pool, tmp_path, code, limits)
+    assert output.stdout == "32\n"
+    assert stats["exit_reason"] == "timeout"
+
+
+def test_memory_limit_allows_reserving_address_space(pool, tmp_path):
+    # Runtimes such as the JVM and go reserve far more than the limit up front
+    code = (
+        "import mmap\n"
+        "flags = mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS\n"
+        "reserved = mmap.mmap(-1, 8 * 1024 ** 3, flags=flags, prot=mmap.PROT_READ)\n"
+        "print(len(reserved))\n"
+    )
+    output, stats = run(pool, tmp_path, code, ResourceLimits(memory_mb=512))
+    assert output.stdout == f"{8 * 1024**3}\n"
+    assert stats["exit_reason"] == "exit"
+
+
+def test_ulimit_command():
+    limits = ResourceLimits(cpu_seconds=5, memory_mb=64, open_files=32)
+    assert limits.ulimit_command() == (
+        "ulimit -t 6 && ulimit -S -t 5 && ulimit -d 65536 && ulimit -n 32"
+    )
+    assert ResourceLimits(wall_seconds=5).ulimit_command() == ""
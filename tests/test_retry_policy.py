@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import pytest
+
+from playground import retry_policy
+from playground.retry_policy import (
+    RetryPolicy,
+    TransientRunError,
+    is_retryable_error,
+    retry_after_seconds,
+)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+class RateLimitError(Exception):
+    pass
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(retry_policy.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def test_error_classification():
+    assert is_retryable_error(RateLimitError())
+    assert is_retryable_error(TimeoutError())
+    assert is_retryable_error(TransientRunError("server_error"))
+    assert is_retryable_error(StatusError(429))
+    assert is_retryable_error(StatusError(503))
+    assert not is_retryable_error(StatusError(400))
+    assert not is_retryable_error(ValueError("bad arguments"))
+
+
+def test_retry_after_headers():
+    assert retry_after_seconds(StatusError(429, {"retry-after": "7"})) == 7
+    assert retry_after_seconds(StatusError(429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after_seconds(TransientRunError("slow down", retry_after=3)) == 3
+    assert retry_after_seconds(StatusError(429)) is None
+
+
+def test_backoff_is_exponential_with_jitter():
+    policy = RetryPolicy(base_delay=1, max_delay=8)
+    for attempt, ceiling in [(1, 1), (2, 2), (3, 4), (4, 8), (5, 8)]:
+        delay = policy.delay(attempt)
+        assert ceiling / 2 <= delay <= ceiling
+    assert policy.delay(1, StatusError(429, {"retry-after": "5"})) == 5
+
+
+def test_call_retries_transient_errors(sleeps):
+    outcomes = [RateLimitError(), StatusError(502), "done"]
+    retried = []
+
+    def flaky():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    policy = RetryPolicy(max_attempts=3, base_delay=0.1)
+    assert policy.call(flaky, on_retry=lambda *args: retried.append(args[0])) == "done"
+    assert retried == [1, 2]
+    assert len(sleeps) == 2
+
+
+def test_call_gives_up(sleeps):
+    def broken():
+        raise StatusError(500)
+
+    with pytest.raises(StatusError):
+        RetryPolicy(max_attempts=2, base_delay=0.1).call(broken)
+    assert len(sleeps) == 1
+
+    def invalid():
+        raise ValueError("not transient")
+
+    with pytest.raises(ValueError):
+        RetryPolicy().call(invalid)
+    assert len(sleeps) == 1
@@ -0,0 +1,110 @@
+import os
+import sys
+
+import pytest
+
+from playground.actions_manager import SingletonMeta
+from playground.sandbox_manager import (
+    LAST_USED_MARKER,
+    SandboxManager,
+    clone_venv,
+    current_code_folder,
+    current_sandbox,
+    own_disk_usage,
+)
+
+
+def make_venv(path):
+    site_packages = path / "lib" / "python3.11" / "site-packages"
+    (site_packages / "requests").mkdir(parents=True)
+    (site_packages / "requests" / "__init__.py").write_text("VERSION = 1\n")
+    (path / "bin").mkdir()
+    os.symlink(sys.executable, path / "bin" / "python")
+    (path / "bin" / "activate").write_text(f'VIRTUAL_ENV="{path}"\n')
+    (path / "bin" / "pip").write_text(f"#!{path}/bin/python\n")
+    (path / "pyvenv.cfg").write_text("home = /usr/bin\n")
+    (path / "solution.py").write_text("print('user file')\n")
+    return site_packages
+
+
+@pytest.fixture
+def sandboxes(tmp_path):
+    make_venv(tmp_path / "env")
+    SingletonMeta._instances.pop(SandboxManager, None)
+    yield SandboxManager(base_path=str(tmp_path), max_sandboxes=2, disk_quota_mb=None)
+    SingletonMeta._instances.pop(SandboxManager, None)
+
+
+def set_last_used(sandboxes, name, timestamp):
+    marker = os.path.join(sandboxes.sandbox_path(name), LAST_USED_MARKER)
+    os.utime(marker, (timestamp, timestamp))
+
+
+def test_clone_links_packages_and_rewrites_scripts(tmp_path):
+    site_packages = make_venv(tmp_path / "env")
+    target = tmp_path / "clone"
+    clone_venv(str(tmp_path / "env"), str(target))
+
+    cloned_package = target / "lib" / "python3.11" / "site-packages" / "requests"
+    assert os.path.samefile(
+        cloned_package / "__init__.py", site_packages / "requests" / "__init__.py"
+    )
+    assert os.readlink(target / "bin" / "python") == sys.executable
+    assert str(target) in (target / "bin" / "activate").read_text()
+    assert str(target) in (target / "bin" / "pip").read_text()
+    assert os.access(target / "bin" / "pip", os.X_OK) == os.access(
+        tmp_path / "env" / "bin" / "pip", os.X_OK
+    )
+    assert (target / "pyvenv.cfg").exists()
+    assert not (target / "solution.py").exists()
+    assert not os.path.exists(f"{target}.tmp")
+    # Only the copied scripts take space of their own, not the linked packages
+    copied = ["bin/activate", "bin/pip", "pyvenv.cfg"]
+    assert own_disk_usage(str(target)) == sum(
+        os.path.getsize(target / name) for name in copied
+    )
+
+
+def test_idle_sandboxes_are_evicted_least_recently_used_first(sandboxes):
+    for index, name in enumerate(["a", "b"]):
+        sandboxes.acquire(name)
+        sandboxes.release(name)
+        set_last_used(sandboxes, name, 1000 + index)
+
+    sandboxes.acquire("c")
+    sandboxes.release("c")
+    names = [sandbox["name"] for sandbox in sandboxes.list_sandboxes()]
+    assert names == ["b", "c"]
+
+    # Sandboxes in use are skipped
+    sandboxes.acquire("b")
+    set_last_used(sandboxes, "b", 1000)
+    sandboxes.acquire("d")
+    names = sorted(sandbox["name"] for sandbox in sandboxes.list_sandboxes())
+    assert names == ["b", "d"]
+    with pytest.raises(RuntimeError):
+        sandboxes.remove("b")
+
+
+def test_disk_quota_evicts_sandboxes(sandboxes):
+    sandboxes.max_sandboxes = None
+    sandboxes.disk_quota_mb = 1
+    with sandboxes.use("big") as env_manager:
+        with open(os.path.join(env_manager.env_path, "data.bin"), "wb") as f:
+            f.write(b"0" * 2 * 1024 * 1024)
+    set_last_used(sandboxes, "big", 1000)
+
+    sandboxes.acquire("small")
+    names = [sandbox["name"] for sandbox in sandboxes.list_sandboxes()]
+    assert names == ["small"]
+
+
+def test_code_folder_follows_current_sandbox(sandboxes):
+    token = current_sandbox.set("tree run")
+    try:
+        with current_code_folder() as code_folder:
+            assert code_folder == sandboxes.sandbox_path("tree run")
+            assert os.path.isdir(code_folder)
+    finally:
+        current_sandbox.reset(token)
+    assert sandboxes.list_sandboxes()[0]["in_use"] == 0
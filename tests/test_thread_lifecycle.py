@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+
+import pytest
+
+from playground.thread_lifecycle import (
+    SHARED,
+    SUMMARIZE,
+    SUMMARY_PROMPT,
+    TRUNCATE,
+    ThreadLifecycle,
+)
+
+
+class FakeAPI:
+    """Reports a fixed prompt size, or one that grows with the thread history."""
+
+    def __init__(self, prompt_tokens=100, tokens_per_message=None):
+        self.prompt_tokens = prompt_tokens
+        self.tokens_per_message = tokens_per_message
+        self.history = {}  # thread id -> number of messages
+        self.threads = 0
+        self.calls = []
+        self.messages = []
+
+    def create_thread(self):
+        self.threads += 1
+        return SimpleNamespace(id=f"thread-{self.threads}")
+
+    def retrieve_thread(self, thread_id):
+        if thread_id == "deleted":
+            raise LookupError("No thread found")
+        return SimpleNamespace(id=thread_id)
+
+    def create_thread_message(self, thread_id, role, content):
+        self.messages.append((thread_id, role, content))
+
+    def call_assistant(self, assistant_id, message):
+        thread = self.create_thread()
+        return self.call_assistant_with_thread(thread, assistant_id, message)
+
+    def call_assistant_with_thread(self, thread, assistant_id, message, **run_options):
+        self.calls.append((thread.id, message, run_options))
+        prompt_tokens = self.prompt_tokens
+        history = self.history.get(thread.id, 0) + 1  # the new user message
+        if self.tokens_per_message:
+            sent = history
+            truncation = run_options.get("truncation_strategy")
+            if truncation:
+                sent = min(history, truncation["last_messages"])
+            prompt_tokens = sent * self.tokens_per_message
+        self.history[thread.id] = history + 1  # and the reply
+        return {
+            "text": f"reply to {message}",
+            "thread_id": thread.id,
+            "usage": {"prompt_tokens": prompt_tokens},
+        }
+
+
+def test_fresh_policy_uses_a_thread_per_run():
+    api = FakeAPI()
+    threads = ThreadLifecycle(api)
+    threads.call("asst", "one")
+    threads.call("asst", "two")
+    assert [call[0] for call in api.calls] == ["thread-1", "thread-2"]
+
+
+def test_shared_policy_reuses_the_thread():
+    api = FakeAPI(prompt_tokens=10**6)
+    threads = ThreadLifecycle(api, policy=SHARED, token_budget=10)
+    threads.call("asst", "one")
+    threads.call("asst", "two")
+    assert [call[0] for call in api.calls] == ["thread-1", "thread-1"]
+    assert api.calls[1][2] == {}
+
+
+def test_truncate_policy_past_budget():
+    api = FakeAPI(tokens_per_message=1000)
+    threads = ThreadLifecycle(api, policy=TRUNCATE, token_budget=8000, keep_messages=4)
+    prompts = [threads.call("asst", "step")["usage"]["prompt_tokens"] for _ in range(8)]
+    truncate = {"truncation_strategy": {"type": "last_messages", "last_messages": 4}}
+    assert [call[2] for call in api.calls] == [{}] * 5 + [truncate] * 3
+    # The history keeps growing, the prompt stays bounded once over budget
+    assert prompts == [1000, 3000, 5000, 7000, 9000, 4000, 4000, 4000]
+
+
+def test_summarize_policy_moves_to_a_summary_thread():
+    api = FakeAPI(prompt_tokens=50)
+    threads = ThreadLifecycle(api, policy=SUMMARIZE, token_budget=40)
+    threads.call("asst", "one")
+    result = threads.call("asst", "two")
+
+    assert [call[1] for call in api.calls] == ["one", SUMMARY_PROMPT, "two"]
+    assert result["thread_id"] == "thread-2"
+    summary = f"Summary of the conversation so far:\nreply to {SUMMARY_PROMPT}"
+    assert api.messages == [("thread-2", "user", summary)]
+    assert threads.summaries == 1
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        ThreadLifecycle(FakeAPI(), policy="forever")
+
+
+def test_restore_continues_an_existing_thread():
+    api = FakeAPI()
+    threads = ThreadLifecycle(api, policy=SHARED)
+    assert threads.restore("deleted") is False
+    assert threads.restore("thread-old") is True
+    threads.call("asst", "next step")
+    assert api.calls[0][0] == "thread-old"
+    assert api.threads == 0